@@ -0,0 +1,108 @@
+import collections
+import threading
+import time
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitBreaker:
+	"""Stop executing a tool that keeps failing and probe it again after a while.
+
+	The results of the last executions are kept in a sliding window. If enough of them failed,
+	the breaker opens and executions are rejected without starting the tool. After the open
+	period a limited number of probe executions is let through (half-open). A successful probe
+	closes the breaker again, a failed one opens it for another period.
+	"""
+
+	def __init__(
+		self, failure_rate, window=20, min_calls=5, open_seconds=30.0, probes=1, clock=None
+	):
+		self.failure_rate = failure_rate
+		self.min_calls = min_calls
+		self.open_seconds = open_seconds
+		self.probes = probes
+		self.clock = clock or time.monotonic
+		self.state = CLOSED
+		self._results = collections.deque(maxlen=window)
+		self._opened_at = None
+		self._probes_in_flight = 0
+		self._lock = threading.Lock()
+
+	def acquire(self):
+		"""Admit an execution, return None if admitted or the seconds until it can be retried."""
+		with self._lock:
+			if self.state == OPEN:
+				remaining = self._opened_at + self.open_seconds - self.clock()
+				if remaining > 0:
+					return remaining
+				self.state = HALF_OPEN
+			if self.state == HALF_OPEN:
+				if self._probes_in_flight >= self.probes:
+					return self.open_seconds
+				self._probes_in_flight += 1
+			return None
+
+	def record(self, success):
+		"""Record the result of an admitted execution."""
+		with self._lock:
+			if self.state == HALF_OPEN:
+				self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+				if success:
+					self.state = CLOSED
+					self._results.clear()
+				else:
+					self._open()
+				return
+			self._results.append(success)
+			failures = self._results.count(False)
+			if (
+				self.state == CLOSED
+				and len(self._results) >= self.min_calls
+				and failures / len(self._results) >= self.failure_rate
+			):
+				self._open()
+
+	def release(self):
+		"""Release an admitted execution which ended without a result of the tool."""
+		with self._lock:
+			if self.state == HALF_OPEN:
+				self._probes_in_flight = max(self._probes_in_flight - 1, 0)
+
+	def _open(self):
+		self.state = OPEN
+		self._opened_at = self.clock()
+		self._probes_in_flight = 0
+
+	def summary(self):
+		with self._lock:
+			return {
+				'state': self.state,
+				'calls': len(self._results),
+				'failures': self._results.count(False),
+			}
+
+
+class CircuitBreakers:
+	"""One circuit breaker per tool, created on first use. Disabled if no failure rate is set."""
+
+	def __init__(self, failure_rate=None, **options):
+		self.failure_rate = failure_rate
+		self.options = options
+		self._breakers = {}
+		self._lock = threading.Lock()
+
+	def get(self, tool_name):
+		"""Return the breaker of a tool, None if circuit breaking is disabled."""
+		if self.failure_rate is None:
+			return None
+		with self._lock:
+			if tool_name not in self._breakers:
+				self._breakers[tool_name] = CircuitBreaker(self.failure_rate, **self.options)
+			return self._breakers[tool_name]
+
+	def summary(self):
+		with self._lock:
+			breakers = dict(self._breakers)
+		return {tool_name: breaker.summary() for tool_name, breaker in breakers.items()}
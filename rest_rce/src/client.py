@@ -0,0 +1,248 @@
+import asyncio
+import concurrent.futures
+import email.utils
+import itertools
+import random
+import time
+from datetime import UTC, datetime
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+# Status codes of a server that did not admit the execution, the request is repeated later
+RETRY_STATUS_CODES = (429, 503)
+
+
+class ToolExecutionError(Exception):
+	"""An execution request that was answered with an error status code."""
+
+	def __init__(self, status_code, detail):
+		super().__init__(f'{status_code}: {detail}')
+		self.status_code = status_code
+		self.detail = detail
+
+
+def retry_delay(headers, attempt, backoff, max_backoff):
+	"""Seconds to wait before repeating a request that was not admitted.
+
+	The Retry-After header of the response is honoured (in seconds or as HTTP date), otherwise the
+	delay grows exponentially with full jitter.
+	"""
+	retry_after = headers.get('Retry-After')
+	if retry_after:
+		try:
+			return min(max(float(retry_after), 0.0), max_backoff)
+		except ValueError:
+			pass
+		try:
+			date = email.utils.parsedate_to_datetime(retry_after)
+			return min(max((date - datetime.now(UTC)).total_seconds(), 0.0), max_backoff)
+		except (TypeError, ValueError):
+			pass
+	return random.uniform(0, min(backoff * 2**attempt, max_backoff))
+
+
+def error_detail(response):
+	try:
+		return response.json().get('detail', response.text)
+	except (ValueError, AttributeError):
+		return response.text
+
+
+class RestRceClient:
+	"""Client submitting tool executions to a REST-RCE server from several threads.
+
+	All requests share one session with a pool of keep-alive connections. At most
+	'max_concurrency' executions are submitted at the same time, requests that are not admitted
+	(429 or 503) are repeated with backoff.
+	"""
+
+	def __init__(
+		self,
+		base_url,
+		max_concurrency=8,
+		max_retries=5,
+		backoff=0.5,
+		max_backoff=30.0,
+		timeout=None,
+		session=None,
+	):
+		self.base_url = base_url.rstrip('/')
+		self.max_concurrency = max_concurrency
+		self.max_retries = max_retries
+		self.backoff = backoff
+		self.max_backoff = max_backoff
+		# Executions can run for hours, so there is no timeout by default
+		self.timeout = timeout
+		if session is None:
+			session = requests.Session()
+			adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+			session.mount('http://', adapter)
+			session.mount('https://', adapter)
+		self.session = session
+		self._pool = concurrent.futures.ThreadPoolExecutor(
+			max_workers=max_concurrency, thread_name_prefix='rest_rce_client'
+		)
+
+	def execute(self, inputs, idempotency_key=None, fields=None):
+		"""Execute the tool with the given inputs and return the result of the execution.
+
+		'fields' selects a subset of the result, e.g. ['output_variables'] to skip the stdout.
+		"""
+		headers = {'Idempotency-Key': idempotency_key} if idempotency_key else None
+		params = {'fields': ','.join(fields)} if fields else None
+		for attempt in itertools.count():
+			response = self.session.post(
+				f'{self.base_url}/execute-tool/',
+				json={'inputs': inputs},
+				params=params,
+				headers=headers,
+				timeout=self.timeout,
+			)
+			if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+				break
+			time.sleep(retry_delay(response.headers, attempt, self.backoff, self.max_backoff))
+		if response.status_code >= 400:
+			raise ToolExecutionError(response.status_code, error_detail(response))
+		return response.json()
+
+	def submit(self, inputs, idempotency_key=None, fields=None):
+		"""Submit an execution in the background and return its future."""
+		return self._pool.submit(self.execute, inputs, idempotency_key, fields)
+
+	def execute_many(self, inputs_list, return_exceptions=False, fields=None):
+		"""Execute the tool for each of the inputs, yield (index, result) as executions complete.
+
+		The inputs are consumed lazily, so only 'max_concurrency' executions are in flight at any
+		time. Errors are raised unless 'return_exceptions' is set, then they are yielded as result.
+		"""
+		inputs_iter = enumerate(inputs_list)
+		in_flight = {}
+
+		def submit_next():
+			for index, inputs in itertools.islice(inputs_iter, 1):
+				in_flight[self.submit(inputs, fields=fields)] = index
+
+		for _ in range(self.max_concurrency):
+			submit_next()
+		try:
+			while in_flight:
+				done, _ = concurrent.futures.wait(
+					in_flight, return_when=concurrent.futures.FIRST_COMPLETED
+				)
+				for future in done:
+					index = in_flight.pop(future)
+					submit_next()
+					if future.exception() is None:
+						yield index, future.result()
+					elif return_exceptions:
+						yield index, future.exception()
+					else:
+						raise future.exception()
+		finally:
+			for future in in_flight:
+				future.cancel()
+
+	def close(self):
+		self._pool.shutdown(wait=False, cancel_futures=True)
+		self.session.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc_info):
+		self.close()
+
+
+class AsyncRestRceClient:
+	"""Asyncio client submitting tool executions to a REST-RCE server.
+
+	Works like RestRceClient on an httpx connection pool, the concurrency is bounded by a
+	semaphore instead of threads.
+	"""
+
+	def __init__(
+		self,
+		base_url,
+		max_concurrency=8,
+		max_retries=5,
+		backoff=0.5,
+		max_backoff=30.0,
+		timeout=None,
+		transport=None,
+	):
+		self.base_url = base_url.rstrip('/')
+		self.max_concurrency = max_concurrency
+		self.max_retries = max_retries
+		self.backoff = backoff
+		self.max_backoff = max_backoff
+		self.client = httpx.AsyncClient(
+			timeout=timeout,
+			limits=httpx.Limits(
+				max_connections=max_concurrency, max_keepalive_connections=max_concurrency
+			),
+			transport=transport,
+		)
+		self._semaphore = asyncio.Semaphore(max_concurrency)
+
+	async def execute(self, inputs, idempotency_key=None, fields=None):
+		"""Execute the tool with the given inputs and return the result of the execution."""
+		headers = {'Idempotency-Key': idempotency_key} if idempotency_key else None
+		params = {'fields': ','.join(fields)} if fields else None
+		for attempt in itertools.count():
+			# The backoff is awaited outside of the semaphore, so it does not block a slot
+			async with self._semaphore:
+				response = await self.client.post(
+					f'{self.base_url}/execute-tool/',
+					json={'inputs': inputs},
+					params=params,
+					headers=headers,
+				)
+			if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+				break
+			await asyncio.sleep(
+				retry_delay(response.headers, attempt, self.backoff, self.max_backoff)
+			)
+		if response.status_code >= 400:
+			raise ToolExecutionError(response.status_code, error_detail(response))
+		return response.json()
+
+	async def execute_many(self, inputs_list, return_exceptions=False, fields=None):
+		"""Execute the tool for each of the inputs, yield (index, result) as executions complete.
+
+		Works like RestRceClient.execute_many.
+		"""
+		inputs_iter = enumerate(inputs_list)
+		in_flight = {}
+
+		def submit_next():
+			for index, inputs in itertools.islice(inputs_iter, 1):
+				in_flight[asyncio.ensure_future(self.execute(inputs, fields=fields))] = index
+
+		for _ in range(self.max_concurrency):
+			submit_next()
+		try:
+			while in_flight:
+				done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+				for task in done:
+					index = in_flight.pop(task)
+					submit_next()
+					if task.exception() is None:
+						yield index, task.result()
+					elif return_exceptions:
+						yield index, task.exception()
+					else:
+						raise task.exception()
+		finally:
+			for task in in_flight:
+				task.cancel()
+
+	async def close(self):
+		await self.client.aclose()
+
+	async def __aenter__(self):
+		return self
+
+	async def __aexit__(self, *exc_info):
+		await self.close()
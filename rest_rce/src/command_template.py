@@ -0,0 +1,73 @@
+import json
+import os
+import re
+import shlex
+import subprocess
+
+INPUT_PLACEHOLDER = re.compile(r'\$\{in:(\w+)\}')
+SHELL_OPERATORS = {'|', '||', '&', '&&', ';', ';;', '<', '>', '>>', '<<', '(', ')', '>&', '<&'}
+
+
+def format_value(value):
+	"""Format an input value as a single command line argument."""
+	if isinstance(value, bool):
+		return 'true' if value else 'false'
+	if isinstance(value, (list, dict)):
+		return json.dumps(value)
+	return str(value)
+
+
+class CommandTemplate:
+	"""A command script parsed once into an argv template with placeholders for the inputs.
+
+	Rendering the template substitutes the inputs per argument, so values never have to be
+	quoted for a shell. A placeholder forming a whole argument expands a list input into one
+	argument per element, maps are passed as JSON. Scripts using shell syntax like pipes or
+	redirections cannot be compiled and raise a ValueError.
+	"""
+
+	def __init__(self, command_script, posix=None):
+		self.command_script = command_script
+		self.posix = os.name != 'nt' if posix is None else posix
+
+		# Tokenize without removing quotes first, so quoted operators are not mistaken as syntax
+		lexer = shlex.shlex(command_script, posix=False, punctuation_chars=True)
+		lexer.whitespace_split = True
+		operators = [token for token in lexer if token in SHELL_OPERATORS]
+		if operators or '$(' in command_script or '`' in command_script:
+			raise ValueError(
+				f'Command script uses shell syntax and cannot be run without a shell: '
+				f'{command_script}'
+			)
+
+		# Every argument is a list of literal strings and input names (odd positions)
+		self.arguments = [
+			INPUT_PLACEHOLDER.split(token)
+			for token in shlex.split(command_script, posix=self.posix)
+		]
+		if not self.arguments:
+			raise ValueError('Command script is empty.')
+		self.input_names = {name for argument in self.arguments for name in argument[1::2]}
+
+	def render(self, inputs):
+		"""Substitute the input values and return the argv list of the command."""
+		argv = []
+		for argument in self.arguments:
+			# A placeholder that is a whole argument, e.g. ${in:files}
+			if len(argument) == 3 and argument[0] == '' and argument[2] == '':
+				value = inputs.get(argument[1], '')
+				if isinstance(value, list):
+					argv.extend(format_value(item) for item in value)
+				else:
+					argv.append(format_value(value))
+				continue
+			parts = [
+				format_value(inputs.get(part, '')) if index % 2 else part
+				for index, part in enumerate(argument)
+			]
+			argv.append(''.join(parts))
+		return argv
+
+	def join(self, argv):
+		"""Join an argv list into a command line for logging and responses."""
+		return shlex.join(argv) if self.posix else subprocess.list2cmdline(argv)
@@ -0,0 +1,84 @@
+import asyncio
+import collections
+import contextlib
+
+
+class ConcurrencyLimit:
+	"""Limit the number of parallel executions of a tool, further executions wait in FIFO order.
+
+	Used from the event loop only. The limit can be changed while executions are running, e.g.
+	after the configuration was reloaded. No limit is applied if it is None.
+	"""
+
+	def __init__(self, limit=None):
+		self.limit = limit
+		self.active = 0
+		self._waiters = collections.deque()
+
+	@property
+	def waiting(self):
+		return sum(1 for waiter in self._waiters if not waiter.done())
+
+	def is_full(self):
+		"""Return True if a new execution would have to wait."""
+		return self.limit is not None and (self.active >= self.limit or self.waiting > 0)
+
+	def set_limit(self, limit):
+		self.limit = limit
+		self._wake_up()
+
+	def try_acquire(self):
+		"""Take a slot if the execution can run right away, return False otherwise."""
+		if self.is_full():
+			return False
+		self.active += 1
+		return True
+
+	async def acquire(self):
+		"""Wait until the execution can run and take its slot."""
+		if self.try_acquire():
+			return
+		waiter = asyncio.get_running_loop().create_future()
+		self._waiters.append(waiter)
+		try:
+			await waiter
+		except asyncio.CancelledError:
+			if waiter.cancelled():
+				with contextlib.suppress(ValueError):
+					self._waiters.remove(waiter)
+			else:
+				# The slot was handed over just before the waiting execution was cancelled
+				self.release()
+			raise
+
+	def release(self):
+		self.active -= 1
+		self._wake_up()
+
+	def _wake_up(self):
+		while self._waiters and (self.limit is None or self.active < self.limit):
+			waiter = self._waiters.popleft()
+			if not waiter.done():
+				self.active += 1
+				waiter.set_result(None)
+
+	def summary(self):
+		return {'limit': self.limit, 'running': self.active, 'queued': self.waiting}
+
+
+class ConcurrencyLimits:
+	"""One concurrency limit per tool, created on first use and updated with the configuration."""
+
+	def __init__(self):
+		self._limits = {}
+
+	def get(self, tool_name, limit):
+		"""Return the concurrency limit of a tool, set to the limit of its current configuration."""
+		if tool_name not in self._limits:
+			self._limits[tool_name] = ConcurrencyLimit(limit)
+		elif self._limits[tool_name].limit != limit:
+			self._limits[tool_name].set_limit(limit)
+		return self._limits[tool_name]
+
+	def summary(self):
+		return {tool_name: limit.summary() for tool_name, limit in self._limits.items()}
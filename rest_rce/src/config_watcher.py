@@ -0,0 +1,48 @@
+import asyncio
+import os
+
+
+class ConfigWatcher:
+	"""Poll the configuration file for changes and reload it in the background.
+
+	A change of the modification time or size triggers the load function in a worker thread.
+	Only a configuration that was loaded and validated successfully is passed to the activate
+	function, which runs on the event loop and can therefore swap the active configuration
+	without interfering with requests.
+	"""
+
+	def __init__(self, file_path, interval, load, activate, logger):
+		self.file_path = file_path
+		self.interval = interval
+		self.load = load
+		self.activate = activate
+		self.logger = logger
+		self._signature = self.file_signature()
+
+	def file_signature(self):
+		try:
+			stat_result = os.stat(self.file_path)
+		except OSError:
+			return None
+		return stat_result.st_mtime_ns, stat_result.st_size
+
+	async def check(self):
+		"""Reload the configuration if the file changed since the last check."""
+		signature = self.file_signature()
+		if signature is None or signature == self._signature:
+			return False
+		self._signature = signature
+		self.logger.info(f'Configuration file {self.file_path} changed, reloading it.')
+		try:
+			loaded = await asyncio.to_thread(self.load)
+		except Exception as e:
+			self.logger.error(f'Reloading the configuration failed, keeping the active one: {e}')
+			return False
+		self.activate(*loaded)
+		return True
+
+	async def run(self):
+		"""Check the configuration file periodically until the task is cancelled."""
+		while True:
+			await asyncio.sleep(self.interval)
+			await self.check()
@@ -5,6 +5,10 @@ ENABLE_CS_L = 'enableCommandScriptLinux'
 SET_AS_WORKING_DIR = 'setToolDirAsWorkingDir'
 LAUNCH_SETTINGS = 'launchSettings'
 TOOL_DIR = 'toolDirectory'
+LIMIT_INSTANCES = 'limitInstallationInstances'
+LIMIT_INSTANCES_NUMBER = 'limitInstallationInstancesNumber'
+DELETE_WORKING_DIRS = 'deleteWorkingDirectoriesAfterWorkflowExecution'
+KEEP_WORKING_DIRS = 'deleteWorkingDirectoriesNever'
 PRE_S = 'preScript'
 POST_S = 'postScript'
 INPUTS = 'inputs'
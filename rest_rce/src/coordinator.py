@@ -0,0 +1,82 @@
+import asyncio
+import collections
+
+import httpx
+
+# Status codes of a backend that is too busy or shutting down, the next backend is tried
+BUSY_STATUS_CODES = (429, 503)
+
+
+class Coordinator:
+	"""Forward tool executions to the least loaded of several REST-RCE backend nodes.
+
+	Before forwarding, the load of all backends is fetched from their '/load/' endpoints in
+	parallel. Executions the coordinator forwarded but which are not answered yet are added to
+	the load, so simultaneous requests are spread across the backends. A backend answering with
+	429 or 503 or being unreachable is skipped and the next backend is tried. A backend failing
+	after the request was sent is not, as the tool may already run there.
+	"""
+
+	def __init__(self, backends, logger, load_timeout=2.0, transport=None):
+		self.backends = [backend.rstrip('/') for backend in backends]
+		self.logger = logger
+		self.load_timeout = load_timeout
+		# Executions can run for hours, so forwarded requests have no timeout
+		self.client = httpx.AsyncClient(timeout=None, transport=transport)
+		self.pending = collections.Counter()
+
+	async def fetch_load(self, backend):
+		"""Return the load reported by a backend, None if it is unreachable or draining."""
+		try:
+			response = await self.client.get(f'{backend}/load/', timeout=self.load_timeout)
+			response.raise_for_status()
+			load = response.json()
+		except (httpx.HTTPError, ValueError) as e:
+			self.logger.warning(f'Load of backend {backend} unavailable: {e!r}')
+			return None
+		return None if load.get('draining') else load
+
+	def score(self, backend, load):
+		"""Share of the request limit of a backend which is in use, lower is better."""
+		used = load.get('running', 0) + load.get('queued', 0) + self.pending[backend]
+		return used / load['request_limit'] if load.get('request_limit') else used
+
+	async def ranked_backends(self):
+		"""Return the available backends, the least loaded first."""
+		loads = await asyncio.gather(*(self.fetch_load(backend) for backend in self.backends))
+		available = [
+			(self.score(backend, load), index, backend)
+			for index, (backend, load) in enumerate(zip(self.backends, loads, strict=True))
+			if load is not None
+		]
+		return [backend for _, _, backend in sorted(available)]
+
+	async def forward(self, path, json, headers=None):
+		"""Forward a request to the least loaded backend which accepts it.
+
+		Returns the response and the backend, or (None, None) if no backend is reachable.
+		If every backend is busy, the response of the last one is returned. If the connection
+		fails after the request was sent, (None, backend) is returned without trying the next
+		backend, so the execution does not run twice.
+		"""
+		response, answered_by = None, None
+		for backend in await self.ranked_backends():
+			self.pending[backend] += 1
+			try:
+				response = await self.client.post(f'{backend}{path}', json=json, headers=headers)
+			except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+				self.logger.warning(f'Forwarding to backend {backend} failed: {e!r}')
+				continue
+			except httpx.HTTPError as e:
+				self.logger.error(f'Backend {backend} failed after the request was sent: {e!r}')
+				return None, backend
+			finally:
+				self.pending[backend] -= 1
+			answered_by = backend
+			if response.status_code not in BUSY_STATUS_CODES:
+				break
+			self.logger.info(f'Backend {backend} is busy ({response.status_code}), trying next.')
+		return response, answered_by
+
+	async def close(self):
+		await self.client.aclose()
@@ -0,0 +1,89 @@
+import ast
+import importlib
+import importlib.util
+import os
+import re
+import subprocess
+import sys
+
+from rest_rce.src.constants import POST_S, PRE_S
+
+# Distribution names of common packages whose import name differs from the name on PyPI
+PACKAGE_NAMES = {
+	'bs4': 'beautifulsoup4',
+	'cv2': 'opencv-python',
+	'dateutil': 'python-dateutil',
+	'PIL': 'Pillow',
+	'sklearn': 'scikit-learn',
+	'yaml': 'PyYAML',
+}
+
+
+def find_script_imports(script):
+	"""Find the top-level modules imported by a pre-/post-script using its syntax tree."""
+	# Replace the placeholders, so the script can be parsed as Python code
+	script = re.sub(r'\$\{out:(\w+)\}', r"output_vars['\1']", script)
+	script = script.replace('${dir:tool}', 'tool_dir')
+	modules = set()
+	for node in ast.walk(ast.parse(script)):
+		if isinstance(node, ast.Import):
+			modules.update(alias.name.split('.')[0] for alias in node.names)
+		elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+			modules.add(node.module.split('.')[0])
+	return modules
+
+
+def find_missing_modules(modules):
+	"""Return the modules which cannot be imported in the current environment."""
+	importlib.invalidate_caches()
+	return sorted(
+		module
+		for module in modules
+		if module not in sys.stdlib_module_names and importlib.util.find_spec(module) is None
+	)
+
+
+def tool_environment_dir(dependency_dir, tool_name):
+	"""Return the directory of the cached dependency environment of a tool."""
+	return os.path.join(dependency_dir, re.sub(r'[^\w.-]', '_', tool_name or 'tool'))
+
+
+def resolve_dependencies(tool_config, dependency_dir, logger):
+	"""Install the dependencies of the pre- and post-script once into a cached tool environment.
+
+	The environment is a pip target directory added to sys.path, so dependencies installed by
+	an earlier start are reused and nothing has to be installed while serving requests.
+	"""
+	env_dir = tool_environment_dir(dependency_dir, tool_config.get('toolName'))
+	if env_dir not in sys.path:
+		sys.path.append(env_dir)
+
+	modules = set()
+	for key in (PRE_S, POST_S):
+		if tool_config.get(key):
+			try:
+				modules.update(find_script_imports(tool_config[key]))
+			except SyntaxError as e:
+				raise ValueError(f'Invalid Python syntax in {key}: {e}') from e
+
+	missing_modules = find_missing_modules(modules)
+	if not missing_modules:
+		logger.info(f'Dependencies of the pre- and post-script are available: {sorted(modules)}')
+		return env_dir
+
+	packages = [PACKAGE_NAMES.get(module, module) for module in missing_modules]
+	logger.info(f'Installing dependencies of the pre- and post-script into {env_dir}: {packages}')
+	os.makedirs(env_dir, exist_ok=True)
+	try:
+		subprocess.run(
+			[sys.executable, '-m', 'pip', 'install', '--quiet', '--target', env_dir, *packages],
+			check=True,
+		)
+	except subprocess.CalledProcessError as e:
+		raise RuntimeError(f'Failed to install dependencies {packages}: {e}') from e
+
+	still_missing = find_missing_modules(missing_modules)
+	if still_missing:
+		raise RuntimeError(f'Dependencies still missing after installation: {still_missing}')
+	logger.info(f'Dependencies {packages} installed successfully.')
+	return env_dir
@@ -0,0 +1,120 @@
+import hashlib
+import os
+import queue
+import tarfile
+import threading
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+
+FILE_DATATYPES = ('file', 'filereference')
+DIRECTORY_DATATYPES = ('directory', 'directoryreference')
+CHUNK_SIZE = 1024 * 1024
+
+
+class LargeChunkFileResponse(FileResponse):
+	"""File response reading larger chunks to reduce the number of thread hops per download."""
+
+	chunk_size = CHUNK_SIZE
+
+
+class _QueueWriter:
+	"""File-like object handing the written data to a bounded queue."""
+
+	def __init__(self, chunks, cancelled):
+		self.chunks = chunks
+		self.cancelled = cancelled
+
+	def write(self, data):
+		while not self.cancelled.is_set():
+			try:
+				self.chunks.put(bytes(data), timeout=0.1)
+				return len(data)
+			except queue.Full:
+				continue
+		raise OSError('Download cancelled by the client.')
+
+
+def iter_directory_archive(directory):
+	"""Yield a gzip compressed tar archive of a directory while it is being written.
+
+	The archive is written by a background thread into a bounded queue, so at most a few chunks
+	are kept in memory regardless of the size of the directory.
+	"""
+	chunks = queue.Queue(maxsize=8)
+	cancelled = threading.Event()
+	done = object()
+
+	def write_archive():
+		try:
+			writer = _QueueWriter(chunks, cancelled)
+			with tarfile.open(fileobj=writer, mode='w|gz', bufsize=CHUNK_SIZE) as archive:
+				archive.add(directory, arcname=os.path.basename(os.path.normpath(directory)))
+		except OSError:
+			pass
+		finally:
+			if not cancelled.is_set():
+				chunks.put(done)
+
+	thread = threading.Thread(target=write_archive, daemon=True)
+	thread.start()
+	try:
+		while (chunk := chunks.get()) is not done:
+			yield chunk
+	finally:
+		cancelled.set()
+
+
+def directory_etag(directory):
+	"""Compute an ETag from the relative paths, sizes and modification times in a directory."""
+	digest = hashlib.md5(usedforsecurity=False)
+	for root, dirs, files in os.walk(directory):
+		dirs.sort()
+		for name in sorted(files):
+			path = os.path.join(root, name)
+			stat_result = os.stat(path)
+			relative_path = os.path.relpath(path, directory)
+			digest.update(
+				f'{relative_path}:{stat_result.st_size}:{stat_result.st_mtime_ns};'.encode()
+			)
+	return f'"{digest.hexdigest()}"'
+
+
+def not_modified(request: Request, etag):
+	"""Check if the client already has the current version of a download."""
+	if_none_match = request.headers.get('if-none-match')
+	if if_none_match is None:
+		return False
+	return etag in [tag.strip() for tag in if_none_match.split(',')] or if_none_match == '*'
+
+
+def download_response(request: Request, path, datatype):
+	"""Create the response serving a file or directory output of an execution.
+
+	Files support HTTP range requests, directories are streamed as compressed tar archive.
+	Both carry an ETag and answer conditional requests with 304.
+	"""
+	if datatype in FILE_DATATYPES and os.path.isfile(path):
+		response = LargeChunkFileResponse(
+			path, stat_result=os.stat(path), filename=os.path.basename(path)
+		)
+		etag = response.headers['etag']
+		if not_modified(request, etag):
+			return Response(status_code=304, headers={'etag': etag})
+		return response
+
+	if datatype in DIRECTORY_DATATYPES and os.path.isdir(path):
+		etag = directory_etag(path)
+		if not_modified(request, etag):
+			return Response(status_code=304, headers={'etag': etag})
+		filename = f'{os.path.basename(os.path.normpath(path))}.tar.gz'
+		headers = {
+			'etag': etag,
+			'accept-ranges': 'none',
+			'content-disposition': f'attachment; filename="{filename}"',
+		}
+		return StreamingResponse(
+			iter_directory_archive(path), media_type='application/gzip', headers=headers
+		)
+
+	raise HTTPException(status_code=404, detail=f'Output {path} not found on the server.')
@@ -0,0 +1,193 @@
+import base64
+import datetime
+import json
+import logging
+import queue
+import re
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS executions (
+	execution_id TEXT PRIMARY KEY,
+	tool TEXT,
+	status TEXT NOT NULL,
+	started_at REAL NOT NULL,
+	finished_at REAL,
+	inputs TEXT NOT NULL,
+	record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_executions_started ON executions (started_at, execution_id);
+CREATE INDEX IF NOT EXISTS idx_executions_status ON executions (status, started_at, execution_id);
+CREATE INDEX IF NOT EXISTS idx_executions_tool ON executions (tool, started_at, execution_id);
+"""
+
+
+def to_timestamp(value):
+	"""Convert a datetime or an ISO formatted string into a POSIX timestamp."""
+	if value is None:
+		return None
+	if isinstance(value, str):
+		value = datetime.datetime.fromisoformat(value)
+	return value.timestamp()
+
+
+def encode_cursor(started_at, execution_id):
+	return base64.urlsafe_b64encode(json.dumps([started_at, execution_id]).encode()).decode()
+
+
+def decode_cursor(cursor):
+	try:
+		started_at, execution_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+		return float(started_at), str(execution_id)
+	except (ValueError, TypeError) as e:
+		raise ValueError(f'Invalid cursor: {cursor}') from e
+
+
+class ExecutionStore:
+	"""History of all executions in an indexed SQLite database.
+
+	Every execution is stored with its status record, so the history can be filtered by status,
+	time window, tool and input values without scanning the in-memory execution status.
+	A new execution is inserted right away and fails if its ID is taken. Updates of its status
+	are written by a background thread in batches, off the event loop of the server. Batches that
+	cannot be written are logged and dropped, so the thread keeps writing later updates.
+	"""
+
+	def __init__(self, database=':memory:', logger=None):
+		self.logger = logger if logger is not None else logging.getLogger(__name__)
+		self._lock = threading.Lock()
+		self._connection = sqlite3.connect(database, check_same_thread=False)
+		if database != ':memory:':
+			self._connection.execute('PRAGMA journal_mode=WAL')
+			self._connection.execute('PRAGMA synchronous=NORMAL')
+		self._connection.executescript(SCHEMA)
+		self._pending = queue.Queue()
+		self._writer = threading.Thread(
+			target=self._write_pending, name='execution-store', daemon=True
+		)
+		self._writer.start()
+
+	@staticmethod
+	def to_row(execution_id, status_record):
+		return (
+			execution_id,
+			status_record.get('tool'),
+			status_record.get('status'),
+			to_timestamp(status_record.get('started_at')),
+			to_timestamp(status_record.get('finished_at')),
+			json.dumps(status_record.get('inputs', {}), default=str),
+			json.dumps(status_record, default=str),
+		)
+
+	def insert(self, execution_id, status_record):
+		"""Store a new execution, raise sqlite3.IntegrityError if its ID is already taken."""
+		with self._lock, self._connection:
+			self._connection.execute(
+				'INSERT INTO executions VALUES (?, ?, ?, ?, ?, ?, ?)',
+				self.to_row(execution_id, status_record),
+			)
+
+	def record(self, execution_id, status_record):
+		"""Queue an update of the stored record of an execution."""
+		self._pending.put(self.to_row(execution_id, status_record))
+
+	def _write_pending(self):
+		while True:
+			rows = [self._pending.get()]
+			# Write all updates queued meanwhile in one transaction
+			while True:
+				try:
+					rows.append(self._pending.get_nowait())
+				except queue.Empty:
+					break
+			try:
+				updates = [row for row in rows if row is not None]
+				if updates:
+					with self._lock, self._connection:
+						self._connection.executemany(
+							'INSERT OR REPLACE INTO executions VALUES (?, ?, ?, ?, ?, ?, ?)',
+							updates,
+						)
+			except Exception as e:
+				self.logger.error(f'{len(updates)} updates of the execution history lost: {e!r}')
+			finally:
+				for _ in rows:
+					self._pending.task_done()
+			if None in rows:
+				return
+
+	def flush(self):
+		"""Wait until the queued updates are written."""
+		self._pending.join()
+
+	def get(self, execution_id):
+		"""Return the stored record of an execution, None if it is unknown."""
+		self.flush()
+		with self._lock:
+			row = self._connection.execute(
+				'SELECT record FROM executions WHERE execution_id = ?', (execution_id,)
+			).fetchone()
+		return json.loads(row[0]) if row is not None else None
+
+	def query(
+		self,
+		status=None,
+		tool=None,
+		since=None,
+		until=None,
+		input_name=None,
+		input_min=None,
+		input_max=None,
+		limit=100,
+		cursor=None,
+	):
+		"""Return the newest executions matching the filters and the cursor of the next page."""
+		self.flush()
+		conditions, parameters = [], []
+		if status is not None:
+			conditions.append('status = ?')
+			parameters.append(status)
+		if tool is not None:
+			conditions.append('tool = ?')
+			parameters.append(tool)
+		if since is not None:
+			conditions.append('started_at >= ?')
+			parameters.append(to_timestamp(since))
+		if until is not None:
+			conditions.append('started_at < ?')
+			parameters.append(to_timestamp(until))
+		if input_name is not None:
+			if not re.fullmatch(r'\w+', input_name):
+				raise ValueError(f'Invalid input name: {input_name}')
+			input_path = f'$."{input_name}"'
+			conditions.append('json_extract(inputs, ?) IS NOT NULL')
+			parameters.append(input_path)
+			if input_min is not None:
+				conditions.append('json_extract(inputs, ?) >= ?')
+				parameters.extend([input_path, input_min])
+			if input_max is not None:
+				conditions.append('json_extract(inputs, ?) <= ?')
+				parameters.extend([input_path, input_max])
+		if cursor is not None:
+			# Keyset pagination, continue below the last execution of the previous page
+			conditions.append('(started_at, execution_id) < (?, ?)')
+			parameters.extend(decode_cursor(cursor))
+
+		where = f'WHERE {" AND ".join(conditions)}' if conditions else ''
+		sql = (
+			f'SELECT started_at, execution_id, record FROM executions {where} '
+			f'ORDER BY started_at DESC, execution_id DESC LIMIT ?'
+		)
+		with self._lock:
+			rows = self._connection.execute(sql, [*parameters, limit + 1]).fetchall()
+
+		next_cursor = encode_cursor(*rows[limit - 1][:2]) if len(rows) > limit else None
+		records = [dict(json.loads(row[2]), execution_id=row[1]) for row in rows[:limit]]
+		return records, next_cursor
+
+	def close(self):
+		self._pending.put(None)
+		self._writer.join()
+		with self._lock:
+			self._connection.close()
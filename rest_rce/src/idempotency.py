@@ -0,0 +1,59 @@
+import collections
+import time
+
+
+class IdempotencyStore:
+	"""Remember the execution started for an Idempotency-Key header for a limited time.
+
+	Entries hold the task of the execution while it runs, so a repeated request can await it.
+	Once the execution completed, only its ID is kept and the result is read from the execution
+	history. At most 'max_entries' keys are kept, the oldest ones are evicted first.
+	Used on the event loop only.
+	"""
+
+	def __init__(self, ttl=3600.0, clock=None, max_entries=10000):
+		self.ttl = ttl
+		self.clock = clock or time.monotonic
+		self.max_entries = max_entries
+		# Idempotency key -> (creation time, key of the request, task or ID of the execution)
+		self._entries = collections.OrderedDict()
+
+	def __len__(self):
+		return len(self._entries)
+
+	def purge(self):
+		"""Remove the expired entries, which are the oldest ones."""
+		now = self.clock()
+		while self._entries:
+			key, (created_at, _, _) = next(iter(self._entries.items()))
+			if now - created_at < self.ttl:
+				break
+			del self._entries[key]
+
+	def get(self, key, request_key):
+		"""Return the task or the execution ID of the idempotency key, None if there is none.
+
+		Raises a ValueError if the key was used for a request with different inputs.
+		"""
+		self.purge()
+		entry = self._entries.get(key)
+		if entry is None:
+			return None
+		if entry[1] != request_key:
+			raise ValueError(f'Idempotency key {key} was already used for different inputs.')
+		return entry[2]
+
+	def put(self, key, request_key, task):
+		self.purge()
+		self._entries[key] = (self.clock(), request_key, task)
+		while len(self._entries) > self.max_entries:
+			self._entries.popitem(last=False)
+
+	def finish(self, key, execution_id):
+		"""Replace the task of a completed execution by its ID, which keeps the entry small."""
+		entry = self._entries.get(key)
+		if entry is not None:
+			self._entries[key] = (entry[0], entry[1], execution_id)
+
+	def discard(self, key):
+		self._entries.pop(key, None)
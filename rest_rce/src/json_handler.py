@@ -60,9 +60,9 @@ class JsonHandler:
 			json_data = json.load(file)
 		return json_data
 
-	def validate_schema(self):
+	def validate_schema(self, json_data=None):
 		"""Validate if the schema of the JSON file matches the keys defined in the RCE repo."""
-		json_data = self.read_file()
+		json_data = self.read_file() if json_data is None else json_data
 		invalid_keys = [key for key in json_data if key not in self.possible_keys]
 		if invalid_keys:
 			raise ValueError(
@@ -83,6 +83,13 @@ class JsonHandler:
 
 		return json_data
 
+	def load(self):
+		"""Parse the JSON file once and validate the parsed data, return it if valid."""
+		json_data = self.validate_file()
+		self.validate_schema(json_data)
+		self.validate_essential_fields(json_data)
+		return json_data
+
 	def validate_essential_fields(self, test_json_data=None):
 		"""Validate if the essential fields are present with an associated value."""
 		# Can either load the JSON data from the file or use other provided data (for testing)
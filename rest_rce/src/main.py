@@ -1,34 +1,107 @@
 import asyncio
+import collections
 import datetime
 import logging
+import math
 import multiprocessing
+import os
+import sqlite3
 import sys
+import threading
+import time
 import uuid
 from contextlib import asynccontextmanager
 from contextvars import ContextVar
+from urllib.parse import urlencode
 
-import requests
-import uvicorn
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import APIRouter, FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import FileResponse, Response
 from pydantic import BaseModel
-from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
 
-from rest_rce.src.json_handler import JsonHandler
-from rest_rce.src.tool_executor import ToolExecutor
-from rest_rce.src.utils import parse_arguments, set_up_logger
+from rest_rce.src.circuit_breaker import CircuitBreakers
+from rest_rce.src.concurrency_limit import ConcurrencyLimits
+from rest_rce.src.dependency_resolver import resolve_dependencies
+from rest_rce.src.execution_store import ExecutionStore
+from rest_rce.src.idempotency import IdempotencyStore
+from rest_rce.src.resource_usage import ResourceUsageTracker
+from rest_rce.src.retry_policy import RetryPolicy
+from rest_rce.src.serialization import (
+	DEFAULT_RESPONSE_CLASS,
+	THREAD_COMPRESSION_SIZE,
+	compress,
+	is_compressible,
+	negotiate_encoding,
+	select_fields,
+)
+from rest_rce.src.single_flight import SingleFlight, request_key
+from rest_rce.src.tool_executor import ExecutionCancelledError, ToolExecutor
+from rest_rce.src.tool_spec import ToolSpec
+from rest_rce.src.tracing import Tracer
+from rest_rce.src.utils import (
+	default_dependency_dir,
+	default_executions_dir,
+	parse_cli_arguments,
+	set_up_logger,
+)
+from rest_rce.src.working_directories import WorkingDirectoryManager
 
 # Context variable to store request ID
 request_id_var: ContextVar[str] = ContextVar('request_id', default='')
 
 # Global variables to store tool configuration and status of processes
 tool_config = {}
+tool_spec = None
+# Status records of the executions in progress, finished ones are kept in the execution store
 execution_status = {}
-
-# Set up logger
-logger = set_up_logger(request_id_var)
-
-# Parse CLI arguments before starting FastAPI
-config_file_path, tool_timeout, request_limit, execution_attempts = parse_arguments()
+# Number of executions in progress per status, so requests are admitted without a scan
+status_counts = collections.Counter()
+# Guards execution_status and status_counts, executions are also cancelled from worker threads
+status_lock = threading.Lock()
+# Executors of the executions in progress, used to cancel them
+running_executors = {}
+resource_usage = ResourceUsageTracker()
+# Limits of parallel executions per tool (limitInstallationInstances) and executions waiting
+instance_limits = ConcurrencyLimits()
+queued_waiters = {}
+# Statuses of executions which have not finished yet
+IN_PROGRESS_STATUSES = ('queued', 'running', 'retrying')
+
+# Settings and subsystems of the server, set up by create_app
+logger = None
+cli_args = None
+config_file_path = None
+tool_timeout = None
+request_limit = None
+execution_attempts = None
+executions_dir = None
+capture_limit = None
+compression_min_size = None
+dependency_dir = None
+execution_store = None
+retry_policy = None
+circuit_breakers = None
+single_flight = None
+idempotency_keys = None
+# Cleans up the directories of finished executions in the executions directory
+working_directories = None
+worker_pool = None
+# Forwards executions to backend nodes if the server runs as coordinator
+coordinator = None
+config_version = 0
+# Deadline of the grace period of running executions once the server started shutting down
+drain_deadline = None
+# Records spans of the requests as Chrome trace events, disabled unless a trace file is set
+tracer = Tracer()
+# Profiles selected executions with cProfile, None unless a profile directory is set
+profiler = None
+
+
+class TracedResponse(DEFAULT_RESPONSE_CLASS):
+	"""Default response class, records the serialization of the content in the trace."""
+
+	def render(self, content):
+		with tracer.span('serialization'):
+			return super().render(content)
 
 
 # Pydantic model for input values
@@ -36,27 +109,91 @@ class InputValues(BaseModel):
 	inputs: dict
 
 
+def load_configuration(handler):
+	"""Parse and validate the configuration file once and build the ToolSpec from it."""
+	config = handler.load()
+	resolve_dependencies(config, dependency_dir, logger)
+	spec = ToolSpec.from_config(config, no_shell=cli_args.no_shell)
+	if spec.command_template is not None:
+		arguments = spec.command_template.arguments
+		logger.info(f'Command script compiled for execution without shell: {arguments}')
+	return config, spec
+
+
+def activate_configuration(config, spec=None):
+	"""Swap the active configuration, executions already running keep their snapshot of it."""
+	global tool_spec, config_version
+	tool_config.clear()
+	tool_config.update(config)
+	tool_spec = (
+		spec if spec is not None else ToolSpec.from_config(config, no_shell=cli_args.no_shell)
+	)
+	config_version += 1
+	tool_name = tool_config.get('toolName')
+	logger.info(f'Tool configuration of tool "{tool_name}" loaded (version {config_version}).')
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
 	"""Initialize the configuration from the JSON file passed via command-line argument."""
-	global tool_config, tool_timeout, request_limit
+	global tool_config, tool_timeout, request_limit, worker_pool, coordinator
+
+	from rest_rce.src.json_handler import JsonHandler
 
 	try:
 		handler = JsonHandler(logger, config_file_path)
-		handler.validate_file()
-		handler.validate_schema()
-		handler.validate_essential_fields()
-		config_file = handler.read_file()
-		tool_config.update(config_file)
-		tool_name = tool_config.get('toolName')
-		logger.info(f'Tool configuration of tool "{tool_name}" loaded successfully.')
+		activate_configuration(*load_configuration(handler))
+		if cli_args.worker_command:
+			worker_pool = start_worker_pool(tool_spec)
+		if cli_args.backends:
+			from rest_rce.src.coordinator import Coordinator
+
+			coordinator = Coordinator(cli_args.backends, logger)
+			logger.info(f'Coordinating executions on the backends {coordinator.backends}.')
 	except Exception as e:
 		logger.error(e)
 		sys.exit(1)
 
+	# Delete, archive or evict the directories of finished executions in the background
+	cleanup_task = asyncio.create_task(working_directories.run(cli_args.cleanup_interval))
+
+	# Watch the configuration file and reload it without restarting the server
+	watcher_task = None
+	if cli_args.reload_interval > 0:
+		from rest_rce.src.config_watcher import ConfigWatcher
+
+		watcher = ConfigWatcher(
+			config_file_path,
+			cli_args.reload_interval,
+			lambda: load_configuration(handler),
+			activate_configuration,
+			logger,
+		)
+		watcher_task = asyncio.create_task(watcher.run())
+
 	yield
 
+	if watcher_task is not None:
+		watcher_task.cancel()
+	cleanup_task.cancel()
+
+	# Let running executions finish before their configuration and logging go away
+	await drain()
+	await asyncio.to_thread(execution_store.flush)
+
+	if coordinator is not None:
+		await coordinator.close()
+		coordinator = None
+
+	if worker_pool is not None:
+		worker_pool.close()
+		worker_pool = None
+		logger.info('Persistent workers stopped.')
+
+	tracer.close()
+
 	# Clean up resources
+	tool_name = tool_config.get('toolName')
 	tool_config.clear()
 	logger.info('Tool configuration cleared.')
 
@@ -67,67 +204,384 @@ async def lifespan(app: FastAPI):
 			handler.close()
 
 
-app = FastAPI(lifespan=lifespan)
+router = APIRouter()
+
+
+def current_tool_spec():
+	"""Return the ToolSpec of the active configuration, built once when it was activated."""
+	return tool_spec
+
+
+def start_draining():
+	"""Reject new executions from now on and start the grace period of the running ones."""
+	global drain_deadline
+	if drain_deadline is None:
+		drain_deadline = time.monotonic() + cli_args.drain_timeout
+		logger.info(f'Shutting down, waiting up to {cli_args.drain_timeout}s for executions.')
+
+
+def executions_in_progress():
+	return list(execution_status)
+
+
+async def drain():
+	"""Wait for the executions in progress until the grace period ended, cancel the others.
+
+	Cancelled executions are given a moment to stop their tools, their final status is
+	recorded in the execution history.
+	"""
+	start_draining()
+	while executions_in_progress() and time.monotonic() < drain_deadline:
+		await asyncio.sleep(0.1)
+	for execution_id in executions_in_progress():
+		logger.warning(f'Grace period ended, cancelling execution {execution_id}.')
+		cancel_execution(execution_id)
+	stop_deadline = time.monotonic() + 10
+	while running_executors and time.monotonic() < stop_deadline:
+		await asyncio.sleep(0.05)
+	logger.info('All executions finished or cancelled.')
+
+
+def start_worker_pool(spec):
+	"""Start the pool of persistent tool workers in the working directory of the tool."""
+	from rest_rce.src.worker_pool import WorkerPool
+
+	cwd = spec.working_directory or os.getcwd()
+	os.makedirs(executions_dir, exist_ok=True)
+	pool = WorkerPool(
+		cli_args.worker_command,
+		cwd,
+		cli_args.worker_pool_size or request_limit,
+		logger,
+		max_requests=cli_args.worker_max_requests,
+		log_path=os.path.join(executions_dir, 'workers.log'),
+	)
+	pool.start()
+	return pool
 
 
 def retry_logging(retry_state):
-	"""Logging for the retry-mechansim in case of connection errors"""
-	if retry_state.attempt_number > 0:
-		logger.warning(
-			('ConnectionError during execution. Retrying tool execution: %s.' + 'Retry attempt'),
-			retry_state.attempt_number,
+	"""Logging for the retry-mechanism before backing off from a failed attempt."""
+	outcome = retry_state.outcome
+	if outcome.failed:
+		reason = repr(outcome.exception())
+	else:
+		return_code, _, stderr = outcome.result()[:3]
+		reason = retry_policy.retry_reason(return_code, stderr)
+	logger.warning(
+		f'Attempt {retry_state.attempt_number} of the tool execution failed ({reason}). '
+		f'Retrying in {retry_state.upcoming_sleep:.1f} seconds.'
+	)
+
+
+async def execute_tool_with_retry(executor: ToolExecutor, execution_id, spec):
+	"""Execute the tool in a worker thread and retry failed attempts according to the policy.
+
+	Each attempt takes a slot of the instance limit of the tool and releases it when it ends.
+	While backing off, the execution has the status 'retrying' and holds no thread or slot.
+	"""
+
+	def before_sleep(retry_state):
+		retry_logging(retry_state)
+		update_execution(execution_id, status='retrying', retries=retry_state.attempt_number)
+		tracer.record(
+			'backoff',
+			tracer.now(),
+			retry_state.upcoming_sleep * 1e6,
+			attempt=retry_state.attempt_number,
 		)
 
+	attempts = 0
 
-@retry(
-	retry=retry_if_exception_type(requests.exceptions.ConnectionError),
-	stop=stop_after_attempt(3),  # Can be overwritten by commandline parameter
-	wait=wait_exponential(multiplier=2, min=2, max=10),
-	reraise=True,
-	before_sleep=retry_logging,
-)
-def execute_tool_with_retry(executor: ToolExecutor):
-	"""Calls execute_tool, but retries only for connection errors."""
-	result = executor.execute_tool()
-	return result
+	async def attempt():
+		nonlocal attempts
+		attempts += 1
+		with tracer.span('instance limit wait'):
+			instance_limit = await wait_for_instance(spec, executor, execution_id)
+		try:
+			with tracer.span('attempt', attempt=attempts):
+				return await asyncio.to_thread(executor.execute_tool)
+		finally:
+			instance_limit.release()
+
+	retrying = retry_policy.retrying(before_sleep=before_sleep)
+	return await retrying(attempt)
 
 
-@app.middleware('http')
 async def log_requests(request: Request, call_next):
 	"""Middleware to log incoming requests and responses with a unique request ID."""
-	request_id = str(uuid.uuid4().hex[:8])
+	request_id = uuid.uuid4().hex
 	request_id_var.set(request_id)
+	tracer.start_track(f'{request_id} {request.method} {request.url.path}')
 
 	logger.info(f'Incoming request: {request.method} {request.url}')
-	response = await call_next(request)
+	with tracer.span('request', url=str(request.url)):
+		response = await call_next(request)
+	response.headers['X-Config-Version'] = str(config_version)
 	logger.info(f'Response status: {response.status_code}')
 
 	return response
 
 
-@app.get('/')
-def read_root():
+async def compress_responses(request: Request, call_next):
+	"""Middleware to compress large JSON and text responses with the encoding the client prefers."""
+	response = await call_next(request)
+	encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+	if (
+		encoding is None
+		or request.method == 'HEAD'
+		or response.status_code < 200
+		or response.status_code in (204, 206, 304)
+		or 'Content-Encoding' in response.headers
+		# File downloads support range requests, which refer to the uncompressed content
+		or 'Accept-Ranges' in response.headers
+		or not is_compressible(response.headers.get('Content-Type'))
+		or int(response.headers.get('Content-Length', sys.maxsize)) < compression_min_size
+	):
+		return response
+
+	body = b''.join([chunk async for chunk in response.body_iterator])
+	headers = {
+		key: value for key, value in response.headers.items() if key.lower() != 'content-length'
+	}
+	if len(body) < compression_min_size:
+		return Response(content=body, status_code=response.status_code, headers=headers)
+	headers['Content-Encoding'] = encoding
+	headers['Vary'] = 'Accept-Encoding'
+	with tracer.span('compression', encoding=encoding, size=len(body)):
+		if len(body) >= THREAD_COMPRESSION_SIZE:
+			body = await asyncio.to_thread(compress, body, encoding)
+		else:
+			body = compress(body, encoding)
+	return Response(content=body, status_code=response.status_code, headers=headers)
+
+
+@router.get('/')
+def read_root(fields: str | None = None):
+	"""Health check, 'fields' selects a comma separated subset, e.g. to omit the configuration."""
 	logger.info('Root endpoint accessed.')
-	return {'message': 'API is running. Tool configuration loaded.', 'configuration': tool_config}
+	content = {
+		'message': 'API is running. Tool configuration loaded.',
+		'config_version': config_version,
+		'configuration': tool_config,
+	}
+	return select_fields(content, fields)
 
 
-@app.get('/running-processes/')
+@router.get('/running-processes/')
 def get_running_processes():
-	global execution_status
-	running_processes = [
-		(key, value) for key, value in execution_status.items() if value.get('status') == 'running'
-	]
+	with status_lock:
+		running_processes = [
+			(key, value)
+			for key, value in execution_status.items()
+			if value.get('status') == 'running'
+		]
 	logger.info(f'Running processes: {running_processes}.')
 	return running_processes
 
 
-@app.post('/execute-tool/')
-async def execute_tool(input_values: InputValues):
-	global tool_config, tool_timeout, request_limit, execution_attempts
+@router.get('/load/')
+def get_load():
+	"""Return the number of running and queued executions, used to balance the load of nodes."""
+	return {
+		'running': status_counts['running'],
+		'queued': status_counts['queued'] + status_counts['retrying'],
+		'request_limit': request_limit,
+		'draining': drain_deadline is not None,
+	}
+
+
+@router.get('/metrics/')
+def get_metrics():
+	"""Return the resource usage aggregated per tool and the state of breakers and limits."""
+	return {
+		'resource_usage': resource_usage.summary(),
+		'circuit_breakers': circuit_breakers.summary(),
+		'instance_limits': instance_limits.summary(),
+	}
+
+
+@router.get('/executions/')
+def get_executions(
+	status: str | None = None,
+	tool: str | None = None,
+	since: datetime.datetime | None = None,
+	until: datetime.datetime | None = None,
+	input_name: str | None = Query(default=None, alias='input'),
+	input_min: float | None = None,
+	input_max: float | None = None,
+	limit: int = Query(default=100, ge=1, le=1000),
+	cursor: str | None = None,
+	fields: str | None = None,
+):
+	"""Query the execution history, newest executions first.
+
+	Executions can be filtered by status, tool, a time window of their start and a numeric range
+	of an input value. Pages are continued with the returned cursor and 'fields' selects a comma
+	separated subset of the fields of every execution.
+	"""
+	try:
+		records, next_cursor = execution_store.query(
+			status=status,
+			tool=tool,
+			since=since,
+			until=until,
+			input_name=input_name,
+			input_min=input_min,
+			input_max=input_max,
+			limit=limit,
+			cursor=cursor,
+		)
+	except ValueError as e:
+		raise HTTPException(status_code=422, detail=str(e)) from e
+	if fields:
+		selected = {'execution_id', *fields.split(',')}
+		records = [{key: value for key, value in r.items() if key in selected} for r in records]
+	return {'executions': records, 'next_cursor': next_cursor}
+
+
+def execution_record(execution_id):
+	"""Return the status record of an execution in progress or from the history, or None."""
+	record = execution_status.get(execution_id)
+	return record if record is not None else execution_store.get(execution_id)
+
+
+@router.get('/executions/{execution_id}/{stream}')
+def get_captured_output(execution_id: str, stream: str):
+	"""Return the full stdout or stderr of an execution from the file it was spilled to."""
+	if stream not in ('stdout', 'stderr'):
+		raise HTTPException(status_code=404, detail=f'Unknown output stream: {stream}.')
+	captured_output = (execution_record(execution_id) or {}).get('captured_output') or {}
+	path = captured_output.get(stream, {}).get('path')
+	if path is None or not os.path.exists(path):
+		raise HTTPException(
+			status_code=404, detail=f'No captured {stream} for execution {execution_id}.'
+		)
+	working_directories.touch(execution_id)
+	return FileResponse(path, media_type='text/plain')
+
 
-	running_processes = get_running_processes()
-	logger.info(f'Number of parallel running processes: {len(running_processes)}.')
-	if request_limit is not None and len(running_processes) >= request_limit:
+@router.get('/executions/{execution_id}/outputs/{output_name}')
+def download_output(execution_id: str, output_name: str, request: Request):
+	"""Download a file or directory output of a completed execution."""
+	output_vars = (execution_record(execution_id) or {}).get('output_variables') or {}
+	if output_name not in output_vars:
+		raise HTTPException(
+			status_code=404, detail=f'Execution {execution_id} has no output {output_name}.'
+		)
+	from rest_rce.src.downloads import download_response
+
+	working_directories.touch(execution_id)
+	datatype = (current_tool_spec().output_datatypes.get(output_name) or '').lower()
+	return download_response(request, output_vars[output_name], datatype)
+
+
+@router.delete('/executions/{execution_id}')
+def delete_execution(execution_id: str):
+	"""Cancel a running execution, its post-script is skipped."""
+	if not cancel_execution(execution_id):
+		record = execution_record(execution_id)
+		if record is None:
+			raise HTTPException(status_code=404, detail=f'Unknown execution {execution_id}.')
+		status = record.get('status')
+		raise HTTPException(
+			status_code=409, detail=f'Execution {execution_id} is not running, it is {status}.'
+		)
+	return {'execution_id': execution_id, 'status': 'cancelled'}
+
+
+def start_execution(execution_id, inputs):
+	"""Add a running execution to the execution status and the execution history."""
+	status_record = {
+		'status': 'running',
+		'started_at': datetime.datetime.now(),
+		'tool': tool_config.get('toolName'),
+		'config_version': config_version,
+		'inputs': inputs,
+		'retries': 0,
+	}
+	try:
+		execution_store.insert(execution_id, status_record)
+	except sqlite3.IntegrityError as e:
+		# Never overwrite the history or the directory of another execution
+		logger.error(f'Execution ID {execution_id} is already taken.')
+		circuit_breaker = circuit_breakers.get(status_record['tool'])
+		if circuit_breaker is not None:
+			circuit_breaker.release()
+		raise HTTPException(status_code=500, detail='Execution ID is already taken.') from e
+	with status_lock:
+		execution_status[execution_id] = status_record
+		status_counts['running'] += 1
+	working_directories.started(execution_id)
+	return status_record
+
+
+def update_execution(execution_id, **details):
+	"""Update the status of an execution in progress and record it in the execution history."""
+	with status_lock:
+		record = execution_status.get(execution_id)
+		if record is None:
+			return
+		status_counts[record['status']] -= 1
+		record.update(details)
+		status_counts[record['status']] += 1
+	execution_store.record(execution_id, record)
+
+
+def finish_execution(execution_id, status, spec=None, **details):
+	"""Set the final status of an execution and record it in the execution history.
+
+	The execution is removed from the execution status, its record is only kept in the history.
+	Returns the record, None if the execution had already finished. The policy for the directory
+	of the execution is taken from the ToolSpec the execution ran with, the active one if none
+	is given.
+	"""
+	with status_lock:
+		record = execution_status.pop(execution_id, None)
+		if record is None:
+			return None
+		status_counts[record['status']] -= 1
+	record.update(details, status=status)
+	record['finished_at'] = datetime.datetime.now()
+	execution_store.record(execution_id, record)
+	spec = spec if spec is not None else current_tool_spec()
+	working_directories.finished(execution_id, spec.working_directory_policy)
+	return record
+
+
+def cancel_execution(execution_id):
+	"""Cancel an execution in progress, kill its process tree and free its slot right away.
+
+	Returns False if the execution is not in progress.
+	"""
+	executor = running_executors.get(execution_id)
+	spec = executor.spec if executor is not None else None
+	if finish_execution(execution_id, 'cancelled', spec) is None:
+		return False
+	if executor is not None:
+		executor.cancel()
+	waiter = queued_waiters.get(execution_id)
+	if waiter is not None:
+		waiter.cancel()
+	logger.info(f'Execution {execution_id} cancelled.')
+	return True
+
+
+async def cancel_on_disconnect(request, execution_id):
+	"""Cancel the execution once the client of the request disconnected."""
+	while not await request.is_disconnected():
+		await asyncio.sleep(1)
+	logger.info(f'Client of execution {execution_id} disconnected.')
+	cancel_execution(execution_id)
+
+
+def admit_request():
+	"""Check if a new execution can be started, raise an HTTPException otherwise."""
+	logger.info(f'Number of parallel running processes: {status_counts["running"]}.')
+	# Executions waiting for their tool count as well, so the queue is bounded by the limit, and
+	# so do executions backing off from a failed attempt, so they can resume without exceeding it
+	in_progress = sum(status_counts[status] for status in IN_PROGRESS_STATUSES)
+	if request_limit is not None and in_progress >= request_limit:
 		logger.error(f'Post request denied because request limit of {request_limit} is reached.')
 		logger.info("Running processes can be seen at '/running-processes/'.")
 		raise HTTPException(status_code=429, detail='Request limit reached.')
@@ -136,62 +590,400 @@ async def execute_tool(input_values: InputValues):
 		logger.error('Tool configuration is not loaded.')
 		raise HTTPException(status_code=400, detail='Tool configuration is not loaded.')
 
-	# Add request ID to execution status dictionary
-	execution_id = request_id_var.get()
-	execution_status[execution_id] = {'status': 'running', 'started_at': datetime.datetime.now()}
+	if drain_deadline is not None:
+		logger.error('Post request denied because the server is shutting down.')
+		raise HTTPException(status_code=503, detail='Server is shutting down.')
+
+	# Reject executions of a tool that keeps failing without starting it
+	tool_name = tool_config.get('toolName')
+	circuit_breaker = circuit_breakers.get(tool_name)
+	retry_after = circuit_breaker.acquire() if circuit_breaker is not None else None
+	if retry_after is not None:
+		logger.error(f'Post request denied because the circuit breaker of "{tool_name}" is open.')
+		raise HTTPException(
+			status_code=503,
+			detail=f'Tool "{tool_name}" is failing repeatedly, executions are paused.',
+			headers={'Retry-After': str(math.ceil(retry_after))},
+		)
+
+
+def release_circuit_breaker(tool_name, success=None):
+	"""Record the result of an admitted execution, or release it if the tool did not run."""
+	circuit_breaker = circuit_breakers.get(tool_name)
+	if circuit_breaker is None:
+		return
+	if success is None:
+		circuit_breaker.release()
+	else:
+		circuit_breaker.record(success)
+
 
-	def run_execution():
-		"""Execute the tool and update execution status."""
+async def wait_for_instance(spec, executor, execution_id):
+	"""Wait until the tool runs fewer executions than its limit and take a slot of it.
+
+	Returns the concurrency limit the slot was taken from.
+	"""
+	limit = instance_limits.get(spec.tool_name, spec.instance_limit)
+	if not limit.try_acquire():
+		logger.info(f'Instance limit of {limit.limit} of tool "{spec.tool_name}" reached, queued.')
+		update_execution(execution_id, status='queued')
+		waiter = asyncio.ensure_future(limit.acquire())
+		queued_waiters[execution_id] = waiter
 		try:
-			executor = ToolExecutor(tool_config, input_values.inputs, logger, tool_timeout)
+			await waiter
+		except asyncio.CancelledError:
+			# The waiter alone is cancelled if the execution is cancelled while it is queued
+			if executor.cancelled.is_set():
+				raise ExecutionCancelledError('Execution was cancelled while queued.') from None
+			raise
+		finally:
+			queued_waiters.pop(execution_id, None)
+	# Executions queued or retried run again, unless they were cancelled in the meantime
+	if execution_status.get(execution_id, {}).get('status') in ('queued', 'retrying'):
+		update_execution(execution_id, status='running')
+	return limit
+
+
+def execution_result(execution_id, record):
+	"""Response of a completed execution, built from its status record."""
+	return {
+		'execution_id': execution_id,
+		'config_version': record.get('config_version'),
+		'command': record.get('command'),
+		'tool_directory': record.get('tool_directory'),
+		'stdout': record.get('stdout'),
+		'output_variables': record.get('output_variables'),
+	}
+
+
+async def run_tool(execution_id, inputs, uploaded_inputs=(), profile=None, spec=None):
+	"""Execute the tool with retries and update the execution status.
+
+	If a profile is given, validation and the scripts of the tool are profiled. The tool is run
+	with the given ToolSpec, or a snapshot of the active one.
+	"""
+	# Snapshot the active configuration, so a reload does not affect this execution
+	spec, version = spec if spec is not None else current_tool_spec(), config_version
+	# The record stays reachable after the execution finished and left the execution status
+	record = execution_status[execution_id]
+	tool = record['tool']
+
+	# Result of the tool for the circuit breaker, None if the tool did not run
+	success = None
+	try:
+		executor = ToolExecutor(
+			spec,
+			inputs,
+			logger,
+			tool_timeout,
+			output_dir=os.path.join(executions_dir, execution_id),
+			capture_limit=capture_limit,
+			uploaded_inputs=uploaded_inputs,
+			worker_pool=worker_pool,
+			tracer=tracer,
+			profile=profile,
+		)
+		with tracer.span('validation'), executor.profiled('validation'):
 			executor.validate_inputs()
+		running_executors[execution_id] = executor
+		try:
+			result = await execute_tool_with_retry(executor, execution_id, spec)
+		except ExecutionCancelledError:
+			raise
+		except Exception:
+			success = False
+			raise
+		executor.check_cancelled()
+		return_code, stdout, stderr, tool_directory, command_script, output_vars = result
+		success = return_code == 0
+		record['inputs'] = inputs
+		record['resource_usage'] = executor.resource_usage
+		record['captured_output'] = executor.captured_output
+		resource_usage.record(spec.tool_name, executor.resource_usage)
+
+		if return_code in (-1, -2):
+			finish_execution(execution_id, 'failed', spec, stderr=stderr)
+			raise HTTPException(status_code=408 if return_code == -1 else 403, detail=f'{stderr}')
+
+		# Other failing return codes complete the execution, their stderr is kept in the record
+		details = {'stderr': stderr} if return_code != 0 else {}
+		finish_execution(
+			execution_id,
+			'completed',
+			spec,
+			config_version=version,
+			stdout=stdout,
+			tool_directory=tool_directory,
+			command=command_script,
+			output_variables=output_vars,
+			**details,
+		)
+
+		return execution_result(execution_id, record)
+
+	except ExecutionCancelledError as e:
+		logger.info(f'Execution {execution_id} stopped after its cancellation.')
+		raise HTTPException(status_code=409, detail=str(e)) from e
+
+	except asyncio.CancelledError:
+		# The request was cancelled, e.g. at the end of the grace period, so stop the tool as well
+		cancel_execution(execution_id)
+		raise
+
+	except Exception as e:
+		logger.error(f'Error during tool execution: {e}')
+		finish_execution(execution_id, 'failed', spec, error=str(e))
+		raise HTTPException(status_code=500, detail=str(e)) from e
+
+	finally:
+		running_executors.pop(execution_id, None)
+		release_circuit_breaker(tool, success)
+		if profile is not None:
+			record['profile'] = profiler.save(profile, execution_id)
+			execution_store.record(execution_id, record)
+
+
+@router.post('/execute-tool/')
+async def execute_tool(
+	input_values: InputValues,
+	request: Request,
+	idempotency_key: str | None = Header(default=None),
+	x_profile: str | None = Header(default=None),
+	fields: str | None = None,
+):
+	"""Execute the tool, 'fields' selects a comma separated subset of the result, e.g. no stdout.
+
+	An 'X-Profile' header with the admin token profiles the execution if profiling is enabled.
+	"""
+	inputs = input_values.inputs
+	if coordinator is not None:
+		return await forward_execution(inputs, idempotency_key, fields)
+
+	async def start_tool():
+		with tracer.span('admission'):
+			admit_request()
+
+		# Add request ID to execution status dictionary
+		execution_id = request_id_var.get()
+		start_execution(execution_id, inputs)
+		profile = profiler.start() if profiler is not None and profiler.wants(x_profile) else None
+
+		# Executions shared with other requests are not cancelled if a single client disconnects
+		if not cli_args.cancel_on_disconnect or idempotency_key or single_flight is not None:
+			return await run_tool(execution_id, inputs, profile=profile)
+		watcher = asyncio.create_task(cancel_on_disconnect(request, execution_id))
+		try:
+			return await run_tool(execution_id, inputs, profile=profile)
+		finally:
+			watcher.cancel()
+
+	async def start_or_attach_tool():
+		if single_flight is None:
+			return await start_tool()
+
+		# Identical requests attach to the execution in flight instead of starting the tool again
+		key = request_key(inputs, current_tool_spec().fingerprint)
+		if key in single_flight:
+			logger.info('Identical execution in flight, waiting for its result.')
+		return await single_flight.run(key, start_tool)
+
+	if idempotency_key is None:
+		return select_fields(await start_or_attach_tool(), fields, keep=('execution_id',))
+
+	# A repeated request with the same key gets the execution started by the first one
+	key = request_key(inputs)
+	try:
+		task = idempotency_keys.get(idempotency_key, key)
+	except ValueError as e:
+		raise HTTPException(status_code=422, detail=str(e)) from e
+	if isinstance(task, str):
+		logger.info(f'Repeated request with idempotency key {idempotency_key}, execution {task}.')
+		record = await asyncio.to_thread(execution_store.get, task)
+		if record is not None:
+			return select_fields(execution_result(task, record), fields, keep=('execution_id',))
+		task = None
+	if task is None:
+		task = asyncio.ensure_future(start_or_attach_tool())
+		idempotency_keys.put(idempotency_key, key, task)
+		task.add_done_callback(lambda task: remember_execution(idempotency_key, task))
+	else:
+		logger.info(f'Repeated request with idempotency key {idempotency_key}.')
+	try:
+		result = await asyncio.shield(task)
+	except HTTPException as e:
+		# Requests which were not admitted can be repeated later with the same key
+		if e.status_code in (400, 429, 503):
+			idempotency_keys.discard(idempotency_key)
+		raise
+	return select_fields(result, fields, keep=('execution_id',))
+
+
+def remember_execution(idempotency_key, task):
+	"""Map the idempotency key to the ID of its completed execution instead of its task."""
+	if not task.cancelled() and task.exception() is None:
+		idempotency_keys.finish(idempotency_key, task.result()['execution_id'])
+
+
+async def forward_execution(inputs, idempotency_key=None, fields=None):
+	"""Forward an execution to the least loaded backend node and relay its response."""
+	headers = {'Idempotency-Key': idempotency_key} if idempotency_key else None
+	path = f'/execute-tool/?{urlencode({"fields": fields})}' if fields else '/execute-tool/'
+	response, backend = await coordinator.forward(path, {'inputs': inputs}, headers)
+	if response is None and backend is not None:
+		raise HTTPException(
+			status_code=502,
+			detail=f'Backend {backend} failed, the execution may have run there.',
+			headers={'X-Backend': backend},
+		)
+	if response is None:
+		logger.error('Post request denied because no backend is available.')
+		raise HTTPException(status_code=503, detail='No backend node is available.')
+	logger.info(f'Execution forwarded to backend {backend}, status {response.status_code}.')
+	relayed_headers = {'X-Backend': backend}
+	if 'Retry-After' in response.headers:
+		relayed_headers['Retry-After'] = response.headers['Retry-After']
+	return Response(
+		content=response.content,
+		status_code=response.status_code,
+		media_type=response.headers.get('content-type'),
+		headers=relayed_headers,
+	)
+
+
+@router.post('/execute-tool/upload/')
+async def execute_tool_upload(request: Request):
+	"""Execute the tool with files uploaded as multipart/form-data for file/directory inputs."""
+	if coordinator is not None:
+		raise HTTPException(status_code=501, detail='Uploads are not forwarded by a coordinator.')
+	with tracer.span('admission'):
+		admit_request()
+
+	from rest_rce.src.uploads import MultipartUpload
+
+	execution_id = request_id_var.get()
+	spec = current_tool_spec()
+	tool = start_execution(execution_id, {})['tool']
+
+	# Stream the uploaded files into the directory of the execution
+	upload_dir = os.path.join(executions_dir, execution_id, 'inputs')
+	upload = MultipartUpload(upload_dir, spec.input_datatypes)
+	try:
+		inputs, uploaded_inputs = await upload.parse(request)
+	except BaseException as e:
+		# Whatever stopped the upload, the execution is failed and its admission released
+		detail = e.detail if isinstance(e, HTTPException) else repr(e)
+		logger.error(f'Error while receiving uploaded inputs: {detail}')
+		finish_execution(execution_id, 'failed', spec, error=detail)
+		release_circuit_breaker(tool)
+		raise
+	if execution_id not in execution_status:
+		# The execution was cancelled while its inputs were uploaded
+		release_circuit_breaker(tool)
+		raise HTTPException(status_code=409, detail='Execution was cancelled during the upload.')
+	logger.info(f'Uploaded inputs {sorted(uploaded_inputs)} written to {upload_dir}.')
+
+	token = request.headers.get('X-Profile')
+	profile = profiler.start() if profiler is not None and profiler.wants(token) else None
+	return await run_tool(execution_id, inputs, uploaded_inputs, profile=profile, spec=spec)
+
+
+def configure(settings):
+	"""Set up logging and the subsystems of the server from the settings."""
+	global logger, cli_args, config_file_path, tool_timeout, request_limit, execution_attempts
+	global executions_dir, capture_limit, compression_min_size, dependency_dir, execution_store
+	global retry_policy, circuit_breakers, single_flight, idempotency_keys, working_directories
+	global tracer, profiler
+
+	logger = set_up_logger(request_id_var)
+	cli_args = settings
+	config_file_path, tool_timeout, request_limit, execution_attempts = (
+		cli_args.config_file_path,
+		cli_args.timeout,
+		cli_args.request_limit,
+		cli_args.attempts,
+	)
+	# Absolute, as the command script runs in the directory of the execution
+	executions_dir = os.path.abspath(cli_args.executions_dir or default_executions_dir())
+	capture_limit = cli_args.capture_limit
+	compression_min_size = cli_args.compression_min_size
+	dependency_dir = cli_args.dependency_dir or default_dependency_dir()
+	execution_store = ExecutionStore(cli_args.history_db, logger)
+	retry_policy = RetryPolicy(
+		attempts=execution_attempts,
+		exit_codes=cli_args.retry_exit_codes,
+		stderr_patterns=cli_args.retry_stderr,
+		retry_timeouts=cli_args.retry_timeouts,
+		backoff=cli_args.retry_backoff,
+		max_backoff=cli_args.retry_max_backoff,
+	)
+	circuit_breakers = CircuitBreakers(
+		cli_args.breaker_failure_rate,
+		window=cli_args.breaker_window,
+		min_calls=cli_args.breaker_min_calls,
+		open_seconds=cli_args.breaker_open_seconds,
+		probes=cli_args.breaker_probes,
+	)
+	single_flight = SingleFlight() if cli_args.coalesce else None
+	idempotency_keys = IdempotencyStore(
+		cli_args.idempotency_ttl, max_entries=cli_args.idempotency_max_keys
+	)
+	quota = cli_args.working_dir_quota
+	working_directories = WorkingDirectoryManager(
+		executions_dir,
+		logger,
+		archive_dir=cli_args.archive_dir,
+		retention=cli_args.working_dir_retention,
+		quota=int(quota * 1024 * 1024) if quota is not None else None,
+	)
+	tracer.close()
+	tracer = Tracer(
+		cli_args.trace_file,
+		max_bytes=int(cli_args.trace_max_size * 1024 * 1024),
+		backup_count=cli_args.trace_backups,
+	)
+	profiler = None
+	if cli_args.profile_dir:
+		from rest_rce.src.profiling import Profiler
+
+		profiler = Profiler(
+			cli_args.profile_dir,
+			logger,
+			limit=cli_args.profile_limit,
+			token=cli_args.profile_token,
+			profile_all=cli_args.profile_all,
+		)
+
 
-			return_code, stdout, stderr, tool_directory, command_script, output_vars = (
-				execute_tool_with_retry.retry_with(
-					stop=stop_after_attempt(execution_attempts)
-				)(executor)
-			)
-
-			if return_code != 0:
-				execution_status[execution_id]['status'] = 'failed'
-				execution_status[execution_id]['stderr'] = stderr
-				if return_code == -1:
-					raise HTTPException(status_code=408, detail=f'{stderr}')
-				if return_code == -2:
-					raise HTTPException(status_code=403, detail=f'{stderr}')
-
-			execution_status[execution_id]['status'] = 'completed'
-			execution_status[execution_id].update(
-				{
-					'stdout': stdout,
-					'tool_directory': tool_directory,
-					'command': command_script,
-					'output_variables': output_vars,
-				}
-			)
-
-			return {
-				'execution_id': execution_id,
-				'command': command_script,
-				'tool_directory': tool_directory,
-				'stdout': stdout,
-				'output_variables': output_vars,
-			}
-
-		except Exception as e:
-			logger.error(f'Error during tool execution: {e}')
-			execution_status[execution_id]['status'] = 'failed'
-			execution_status[execution_id]['error'] = str(e)
-			raise HTTPException(status_code=500, detail=str(e)) from e
-
-	# Ensure to properly await the function to get the result
-	result = await asyncio.to_thread(run_execution)
-
-	return result
+def create_app(settings=None):
+	"""Create the FastAPI app of the server.
+
+	'settings' are parsed command line arguments, they are read from sys.argv if not given.
+	The state of the server is kept in this module, so one app is served per process.
+	"""
+	configure(settings if settings is not None else parse_cli_arguments())
+	app = FastAPI(lifespan=lifespan, default_response_class=TracedResponse)
+	app.include_router(router)
+	# The middleware added last handles a request first, so compression is part of its trace
+	app.middleware('http')(compress_responses)
+	app.middleware('http')(log_requests)
+	return app
+
+
+def __getattr__(name):
+	"""Create the app from sys.argv on first access, e.g. by 'uvicorn rest_rce.src.main:app'."""
+	if name == 'app':
+		globals()['app'] = create_app()
+		return globals()['app']
+	raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
 def main():
 	"""Entry point for CLI execution."""
+	import uvicorn
+
+	from rest_rce.src.server import DrainingServer
+
+	app = create_app()
 	logger.info(f'Starting the tool with configuration file: {config_file_path}')
 	if tool_timeout:
 		logger.info(f'Tool timeout set to {tool_timeout} minutes.')
@@ -200,7 +992,15 @@ def main():
 	logger.info(f'Request limit set to {request_limit} parallel processes.')
 
 	multiprocessing.freeze_support()  # For Windows support
-	uvicorn.run(app, host='127.0.0.1', port=8000, reload=False, workers=1)
+	config = uvicorn.Config(
+		app,
+		host=cli_args.host,
+		port=cli_args.port,
+		reload=False,
+		workers=1,
+		timeout_graceful_shutdown=cli_args.drain_timeout,
+	)
+	DrainingServer(config, on_exit=start_draining).run()
 
 
 if __name__ == '__main__':
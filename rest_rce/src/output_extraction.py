@@ -0,0 +1,111 @@
+import csv
+import io
+import json
+import os
+import re
+
+FORMATS = ('regex', 'json', 'csv')
+STREAMS = ('stdout', 'stderr')
+TRUE_VALUES = ('true', '1', 'yes')
+FALSE_VALUES = ('false', '0', 'no')
+
+
+def cast_value(value, datatype):
+	"""Cast an extracted value to the data type of the output endpoint."""
+	datatype = (datatype or 'string').lower()
+	text = value.strip() if isinstance(value, str) else value
+	if datatype == 'float':
+		return float(text)
+	if datatype == 'integer':
+		return int(text)
+	if datatype == 'boolean':
+		if isinstance(text, bool):
+			return text
+		if str(text).lower() in TRUE_VALUES:
+			return True
+		if str(text).lower() in FALSE_VALUES:
+			return False
+		raise ValueError(f'Expected a Boolean, but got {value!r}')
+	if datatype in ('array', 'list', 'map'):
+		return json.loads(text) if isinstance(text, str) else text
+	# Strings and paths of files or directories
+	return text if isinstance(text, str) else json.dumps(text)
+
+
+def lookup_json_path(data, path):
+	"""Return the value at a dotted path like 'results.0.value' of parsed JSON data."""
+	for key in path.split('.') if path else ():
+		data = data[int(key)] if isinstance(data, list) else data[key]
+	return data
+
+
+class OutputExtractor:
+	"""Extract the value of an output from the stdout/stderr of the tool or from a result file.
+
+	Configured by the 'extract' object of the output in the configuration, e.g.
+	{"file": "${dir:tool}/result.json", "json": "results.0.value"} or
+	{"stream": "stdout", "regex": "Result: (\\S+)"}. Without a format the whole text is used.
+	The value is cast to the data type of the output, or to the data type given as 'type'.
+	"""
+
+	def __init__(self, name, datatype, spec):
+		self.name = name
+		self.datatype = spec.get('type', datatype)
+		self.file = spec.get('file')
+		self.stream = spec.get('stream', 'stdout')
+		if self.file is None and self.stream not in STREAMS:
+			raise ValueError(f'Output {name}: stream must be one of {STREAMS}.')
+		formats = [key for key in FORMATS if key in spec]
+		if len(formats) > 1:
+			raise ValueError(f'Output {name}: only one of {formats} can be extracted.')
+		self.format = formats[0] if formats else None
+
+		if self.format == 'regex':
+			try:
+				self.pattern = re.compile(spec['regex'], re.MULTILINE)
+			except re.error as e:
+				raise ValueError(f'Output {name}: invalid regex {spec["regex"]!r}: {e}') from e
+			self.group = spec.get('group', 1 if self.pattern.groups else 0)
+		elif self.format == 'json':
+			self.json_path = spec['json']
+		elif self.format == 'csv':
+			self.column = spec['csv']
+			self.row = spec.get('row', -1)
+			self.delimiter = spec.get('delimiter', ',')
+
+	def read_text(self, stdout, stderr, inputs, tool_directory):
+		if self.file is None:
+			return stdout if self.stream == 'stdout' else stderr
+		# Absolute, so a path starting with ${dir:tool} is not joined with the directory again
+		tool_directory = os.path.abspath(tool_directory)
+		path = self.file.replace('${dir:tool}', tool_directory)
+		for key, value in inputs.items():
+			path = path.replace(f'${{in:{key}}}', str(value))
+		# Relative paths refer to the directory the command script ran in
+		with open(os.path.join(tool_directory, path)) as file:
+			return file.read()
+
+	def extract(self, stdout, stderr, inputs, tool_directory):
+		"""Return the value of the output, raise ValueError if it cannot be extracted."""
+		try:
+			text = self.read_text(stdout, stderr, inputs, tool_directory)
+			if self.format == 'regex':
+				match = self.pattern.search(text)
+				if match is None:
+					raise ValueError(f'pattern {self.pattern.pattern!r} did not match')
+				value = match.group(self.group)
+			elif self.format == 'json':
+				value = lookup_json_path(json.loads(text), self.json_path)
+			elif self.format == 'csv':
+				rows = list(csv.reader(io.StringIO(text), delimiter=self.delimiter))
+				if isinstance(self.column, str):
+					header, rows = rows[0], rows[1:]
+					column = header.index(self.column)
+				else:
+					column = self.column
+				value = rows[self.row][column]
+			else:
+				value = text
+			return cast_value(value, self.datatype)
+		except (LookupError, OSError, TypeError, ValueError) as e:
+			raise ValueError(f'Output {self.name} could not be extracted: {e}') from e
@@ -0,0 +1,85 @@
+import contextlib
+import cProfile
+import hmac
+import os
+import threading
+
+
+class ExecutionProfile:
+	"""cProfile of the server-side parts of one execution, e.g. validation and the scripts.
+
+	Only one profiler can be active at a time, sections of concurrent executions that would
+	overlap are not profiled and listed as skipped.
+	"""
+
+	def __init__(self, lock):
+		self.profile = cProfile.Profile()
+		self.sections = []
+		self.skipped = []
+		self._lock = lock
+
+	@contextlib.contextmanager
+	def section(self, name):
+		"""Profile the block, it may run in the event loop or in a worker thread."""
+		if not self._lock.acquire(blocking=False):
+			self.skipped.append(name)
+			yield
+			return
+		try:
+			self.profile.enable()
+			try:
+				yield
+			finally:
+				self.profile.disable()
+			self.sections.append(name)
+		finally:
+			self._lock.release()
+
+
+class Profiler:
+	"""Profile selected executions and write the profiles to a directory.
+
+	An execution is profiled if the server profiles all executions or if the request carries
+	the admin token. Only the newest 'limit' profiles are kept. The files can be read with
+	pstats or viewers like snakeviz.
+	"""
+
+	def __init__(self, directory, logger, limit=20, token=None, profile_all=False):
+		self.directory = directory
+		self.logger = logger
+		self.limit = limit
+		self.token = token
+		self.profile_all = profile_all
+		self._lock = threading.Lock()
+
+	def wants(self, token=None):
+		"""Return True if an execution requested with the given admin token is profiled."""
+		if self.profile_all:
+			return True
+		if token is None:
+			return False
+		if self.token is None or not hmac.compare_digest(token.encode(), self.token.encode()):
+			self.logger.warning('Profiling requested with an invalid token, not profiling.')
+			return False
+		return True
+
+	def start(self):
+		return ExecutionProfile(self._lock)
+
+	def save(self, profile, execution_id):
+		"""Write the profile of an execution and remove the oldest profiles above the limit."""
+		os.makedirs(self.directory, exist_ok=True)
+		path = os.path.join(self.directory, f'{execution_id}.prof')
+		profile.profile.dump_stats(path)
+		self.logger.info(f'Profile of {profile.sections} written to {path}.')
+		if profile.skipped:
+			self.logger.warning(f'Not profiled {profile.skipped}, another profile was active.')
+		self.prune()
+		return path
+
+	def prune(self):
+		profiles = [entry for entry in os.scandir(self.directory) if entry.name.endswith('.prof')]
+		profiles.sort(key=lambda entry: entry.stat().st_mtime)
+		for entry in profiles[: max(len(profiles) - self.limit, 0)]:
+			with contextlib.suppress(OSError):
+				os.remove(entry.path)
@@ -0,0 +1,114 @@
+import os
+import subprocess
+import sys
+import threading
+import time
+
+USAGE_FIELDS = (
+	'user_cpu_seconds',
+	'system_cpu_seconds',
+	'max_rss_kb',
+	'block_input_ops',
+	'block_output_ops',
+	'voluntary_context_switches',
+	'involuntary_context_switches',
+)
+
+
+def rusage_to_dict(rusage, wall_seconds):
+	"""Convert a resource.struct_rusage of a reaped child into a JSON serializable dictionary."""
+	# Linux reports the maximum resident set size in kilobytes, macOS in bytes
+	max_rss_kb = rusage.ru_maxrss // 1024 if sys.platform == 'darwin' else rusage.ru_maxrss
+	return {
+		'wall_seconds': round(wall_seconds, 6),
+		'user_cpu_seconds': round(rusage.ru_utime, 6),
+		'system_cpu_seconds': round(rusage.ru_stime, 6),
+		'max_rss_kb': max_rss_kb,
+		'block_input_ops': rusage.ru_inblock,
+		'block_output_ops': rusage.ru_oublock,
+		'voluntary_context_switches': rusage.ru_nvcsw,
+		'involuntary_context_switches': rusage.ru_nivcsw,
+	}
+
+
+def wait_for_process(process, timeout=None, started_at=None):
+	"""Wait for a child process and return its return code and resource usage.
+
+	On POSIX systems the child is reaped with os.wait4, which reports the resources used by the
+	child and all of its waited-for descendants (e.g. the tool binary started by the shell).
+	On other systems only the wall time is recorded.
+	"""
+	started_at = time.monotonic() if started_at is None else started_at
+	if not hasattr(os, 'wait4'):
+		return_code = process.wait(timeout=timeout)
+		return return_code, {'wall_seconds': round(time.monotonic() - started_at, 6)}
+
+	deadline = None if timeout is None else started_at + timeout
+	delay = 0.0005
+	while True:
+		try:
+			pid, status, rusage = os.wait4(process.pid, 0 if deadline is None else os.WNOHANG)
+		except ChildProcessError:
+			# The child was already reaped elsewhere, no usage information is available
+			return_code = process.wait()
+			return return_code, {'wall_seconds': round(time.monotonic() - started_at, 6)}
+		if pid == process.pid:
+			break
+		remaining = deadline - time.monotonic()
+		if remaining <= 0:
+			raise subprocess.TimeoutExpired(process.args, timeout)
+		# Poll with an increasing delay, like subprocess.Popen.wait does with a timeout
+		delay = min(delay * 2, remaining, 0.05)
+		time.sleep(delay)
+
+	process.returncode = os.waitstatus_to_exitcode(status)
+	return process.returncode, rusage_to_dict(rusage, time.monotonic() - started_at)
+
+
+class ResourceUsageTracker:
+	"""Thread-safe aggregation of the resource usage of tool executions per tool."""
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._totals = {}
+
+	def record(self, tool_name, usage):
+		"""Add the resource usage of a single execution to the totals of the given tool."""
+		if not usage:
+			return
+		with self._lock:
+			totals = self._totals.setdefault(
+				tool_name, {'executions': 0, 'wall_seconds': 0.0, 'peak_max_rss_kb': 0}
+			)
+			totals['executions'] += 1
+			totals['wall_seconds'] += usage.get('wall_seconds', 0.0)
+			for field in USAGE_FIELDS:
+				if field not in usage:
+					continue
+				if field == 'max_rss_kb':
+					totals['peak_max_rss_kb'] = max(totals['peak_max_rss_kb'], usage[field])
+					totals['total_max_rss_kb'] = totals.get('total_max_rss_kb', 0) + usage[field]
+				else:
+					totals[field] = totals.get(field, 0) + usage[field]
+
+	def summary(self):
+		"""Return the aggregated totals and per-execution means for every tool."""
+		with self._lock:
+			summary = {}
+			for tool_name, totals in self._totals.items():
+				executions = totals['executions']
+				tool_summary = dict(totals)
+				tool_summary['mean_wall_seconds'] = totals['wall_seconds'] / executions
+				if 'user_cpu_seconds' in totals:
+					cpu_seconds = totals['user_cpu_seconds'] + totals['system_cpu_seconds']
+					tool_summary['mean_cpu_seconds'] = cpu_seconds / executions
+				if 'total_max_rss_kb' in totals:
+					total_max_rss_kb = tool_summary.pop('total_max_rss_kb')
+					tool_summary['mean_max_rss_kb'] = total_max_rss_kb / executions
+				summary[tool_name] = tool_summary
+			return summary
+
+	def clear(self):
+		"""Remove all recorded usage."""
+		with self._lock:
+			self._totals.clear()
@@ -0,0 +1,73 @@
+import re
+
+# Return code of ToolExecutor.execute_tool if the command script timed out
+TIMEOUT_RETURN_CODE = -1
+
+
+class RetryPolicy:
+	"""Decide which failed attempts of a tool execution are retried and how long to back off.
+
+	Attempts raising a connection error are always retried. A completed attempt is retried if
+	its return code is one of the given exit codes, its stderr matches one of the patterns or it
+	timed out and timeouts are retried. The backoff grows exponentially with full jitter and is
+	awaited on the event loop, so no worker thread is blocked between attempts.
+	"""
+
+	def __init__(
+		self,
+		attempts=3,
+		exit_codes=(),
+		stderr_patterns=(),
+		retry_timeouts=False,
+		backoff=2.0,
+		max_backoff=10.0,
+	):
+		self.attempts = attempts
+		self.exit_codes = set(exit_codes)
+		self.stderr_patterns = [re.compile(pattern) for pattern in stderr_patterns]
+		self.retry_timeouts = retry_timeouts
+		self.backoff = backoff
+		self.max_backoff = max_backoff
+
+	def retry_reason(self, return_code, stderr):
+		"""Return why an attempt with the given result is retried, None if it is not retried."""
+		if return_code == TIMEOUT_RETURN_CODE:
+			return 'timeout' if self.retry_timeouts else None
+		if return_code in self.exit_codes:
+			return f'exit code {return_code}'
+		for pattern in self.stderr_patterns:
+			if pattern.search(stderr or ''):
+				return f'stderr matching {pattern.pattern!r}'
+		return None
+
+	def should_retry_result(self, result):
+		return_code, _, stderr = result[:3]
+		return self.retry_reason(return_code, stderr) is not None
+
+	def retrying(self, before=None, before_sleep=None):
+		"""Create the tenacity controller running the attempts of one execution.
+
+		The result of the last attempt is returned, or its exception raised, if all attempts
+		are used up.
+		"""
+		# Imported on first use, so importing the server does not load them
+		import requests
+		from tenacity import (
+			AsyncRetrying,
+			retry_if_exception_type,
+			retry_if_result,
+			stop_after_attempt,
+			wait_random_exponential,
+		)
+
+		return AsyncRetrying(
+			retry=(
+				retry_if_exception_type(requests.exceptions.ConnectionError)
+				| retry_if_result(self.should_retry_result)
+			),
+			stop=stop_after_attempt(self.attempts),
+			wait=wait_random_exponential(multiplier=self.backoff, max=self.max_backoff),
+			before=before,
+			before_sleep=before_sleep,
+			retry_error_callback=lambda retry_state: retry_state.outcome.result(),
+		)
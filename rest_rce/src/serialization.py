@@ -0,0 +1,66 @@
+import gzip
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+try:
+	import orjson
+except ImportError:
+	orjson = None
+
+try:
+	import zstandard
+except ImportError:
+	zstandard = None
+
+# orjson encodes large outputs several times faster than the json module, if it is installed
+DEFAULT_RESPONSE_CLASS = JSONResponse if orjson is None else ORJSONResponse
+
+# Encodings in order of preference if a client accepts several with the same quality
+SUPPORTED_ENCODINGS = ('zstd', 'gzip') if zstandard is not None else ('gzip',)
+
+# Only textual responses are compressed, files and archives are served as they are
+COMPRESSIBLE_TYPES = ('application/json', 'text/')
+
+# Bodies of at least this many bytes are compressed in a worker thread, not on the event loop
+THREAD_COMPRESSION_SIZE = 256 * 1024
+
+
+def select_fields(content, fields, keep=()):
+	"""Return the fields of a comma separated selection of a response, all if none are selected."""
+	if not fields:
+		return content
+	selected = {*keep, *fields.split(',')}
+	return {key: value for key, value in content.items() if key in selected}
+
+
+def negotiate_encoding(accept_encoding):
+	"""Return the supported encoding the client prefers according to Accept-Encoding, or None."""
+	qualities = {}
+	for part in (accept_encoding or '').split(','):
+		coding, _, params = part.strip().partition(';')
+		quality = 1.0
+		for param in params.split(';'):
+			name, _, value = param.strip().partition('=')
+			if name == 'q':
+				try:
+					quality = float(value)
+				except ValueError:
+					quality = 0.0
+		qualities[coding.strip().lower()] = quality
+	candidates = [
+		(qualities.get(encoding, qualities.get('*', 0.0)), -rank, encoding)
+		for rank, encoding in enumerate(SUPPORTED_ENCODINGS)
+	]
+	quality, _, encoding = max(candidates)
+	return encoding if quality > 0 else None
+
+
+def is_compressible(content_type):
+	return (content_type or '').startswith(COMPRESSIBLE_TYPES)
+
+
+def compress(body, encoding):
+	"""Compress a response body with a fast compression level."""
+	if encoding == 'zstd':
+		return zstandard.ZstdCompressor(level=3).compress(body)
+	return gzip.compress(body, compresslevel=5)
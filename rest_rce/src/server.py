@@ -0,0 +1,17 @@
+import uvicorn
+
+
+class DrainingServer(uvicorn.Server):
+	"""Uvicorn server that starts draining the executions as soon as it is asked to exit.
+
+	'on_exit' is called before uvicorn stops accepting connections, so new executions are
+	rejected while running ones finish.
+	"""
+
+	def __init__(self, config, on_exit):
+		super().__init__(config)
+		self.on_exit = on_exit
+
+	def handle_exit(self, sig, frame):
+		self.on_exit()
+		super().handle_exit(sig, frame)
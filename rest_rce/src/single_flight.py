@@ -0,0 +1,33 @@
+import asyncio
+import hashlib
+import json
+
+
+def request_key(inputs, fingerprint=''):
+	"""Key of an execution from its canonical inputs and the fingerprint of the configuration."""
+	canonical_inputs = json.dumps(inputs, sort_keys=True, separators=(',', ':'), default=str)
+	return hashlib.sha256(f'{fingerprint}:{canonical_inputs}'.encode()).hexdigest()
+
+
+class SingleFlight:
+	"""Coalesce identical in-flight executions, so the tool runs once for all of them.
+
+	The first request with a key starts its execution as a task, later requests with the same key
+	await the same task and receive its result or exception. The task is shielded, so a caller
+	that goes away does not cancel the execution for the others. Used on the event loop only.
+	"""
+
+	def __init__(self):
+		self._flights = {}
+
+	def __contains__(self, key):
+		return key in self._flights
+
+	async def run(self, key, function):
+		"""Await the execution in flight with the same key, or start it by calling the function."""
+		task = self._flights.get(key)
+		if task is None:
+			task = asyncio.ensure_future(function())
+			self._flights[key] = task
+			task.add_done_callback(lambda _: self._flights.pop(key, None))
+		return await asyncio.shield(task)
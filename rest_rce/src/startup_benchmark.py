@@ -0,0 +1,78 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+# Runs in a fresh interpreter, so every measurement includes the imports of the server
+CHILD_SCRIPT = """
+import asyncio
+import json
+import sys
+import time
+
+started = time.perf_counter()
+from rest_rce.src.main import create_app
+from rest_rce.src.utils import parse_cli_arguments
+
+timings = {'import': time.perf_counter() - started}
+modules = len(sys.modules)
+
+started = time.perf_counter()
+app = create_app(parse_cli_arguments(sys.argv[1:]))
+timings['create_app'] = time.perf_counter() - started
+
+
+async def start():
+	started = time.perf_counter()
+	async with app.router.lifespan_context(app):
+		return time.perf_counter() - started
+
+
+if sys.argv[1] != '-':
+	timings['startup'] = asyncio.run(start())
+print(json.dumps({'timings': timings, 'modules': modules}))
+"""
+
+
+def measure(server_args):
+	"""Start a fresh interpreter, create the app and return its timings in seconds."""
+	result = subprocess.run(
+		[sys.executable, '-c', CHILD_SCRIPT, *server_args],
+		capture_output=True,
+		text=True,
+		check=True,
+	)
+	return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run_benchmark(server_args, repeat=5):
+	"""Measure the startup 'repeat' times, return the minimum and median of every phase."""
+	runs = [measure(server_args) for _ in range(repeat)]
+	summary = {}
+	for phase in runs[0]['timings']:
+		values = [run['timings'][phase] for run in runs]
+		summary[phase] = {'min': min(values), 'median': statistics.median(values)}
+	summary['modules'] = runs[0]['modules']
+	return summary
+
+
+def main():
+	parser = argparse.ArgumentParser(
+		description='Measure import, app creation and startup time of the server. Arguments '
+		'after the options are passed to the server, the startup (loading the configuration) '
+		"is skipped if the config file path is '-'."
+	)
+	parser.add_argument('-n', '--repeat', type=int, help='Number of measurements', default=5)
+	args, server_args = parser.parse_known_args()
+	summary = run_benchmark(server_args or ['-'], args.repeat)
+	for phase, value in summary.items():
+		if phase == 'modules':
+			print(f'{"modules":<12}{value} imported by rest_rce.src.main')
+			continue
+		minimum, median = value['min'] * 1000, value['median'] * 1000
+		print(f'{phase:<12}min {minimum:8.1f} ms   median {median:8.1f} ms')
+
+
+if __name__ == '__main__':
+	main()
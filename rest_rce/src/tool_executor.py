@@ -1,24 +1,71 @@
+import contextlib
+import locale
 import os
 import re
+import signal
 import subprocess
+import tempfile
+import threading
+import time
 
-from rest_rce.src.constants import (
-	CS_L,
-	CS_W,
-	LAUNCH_SETTINGS,
-	POST_S,
-	PRE_S,
-	SET_AS_WORKING_DIR,
-	TOOL_DIR,
-)
+from rest_rce.src.resource_usage import wait_for_process
+from rest_rce.src.tool_spec import ToolSpec
+from rest_rce.src.tracing import Tracer
+from rest_rce.src.worker_pool import WorkerError
+
+
+class ExecutionCancelledError(Exception):
+	"""Raised if an execution is cancelled before the tool finished."""
 
 
 class ToolExecutor:
-	def __init__(self, tool_config, inputs, logger, timeout=None):
+	def __init__(
+		self,
+		tool_config,
+		inputs,
+		logger,
+		timeout=None,
+		output_dir=None,
+		capture_limit=None,
+		uploaded_inputs=(),
+		worker_pool=None,
+		tracer=None,
+		profile=None,
+	):
+		# Either a ToolSpec built at load time or the raw configuration dictionary
 		self.tool_config = tool_config
+		# The ToolSpec of the tool, built here once if a dictionary was given
+		self.spec = (
+			tool_config if isinstance(tool_config, ToolSpec) else ToolSpec.from_config(tool_config)
+		)
 		self.inputs = inputs
+		# Names of file/directory inputs bound to files uploaded to the server
+		self.uploaded_inputs = set(uploaded_inputs)
+		# Pool of persistent tool workers used instead of starting the command script
+		self.worker_pool = worker_pool
 		self.logger = logger
 		self.timeout = timeout
+		# Directory of the execution, the full stdout/stderr are spilled to it and the command
+		# script runs in it unless the tool directory is the working directory. If not set,
+		# stdout/stderr are spilled to temporary files
+		self.output_dir = output_dir
+		# Bytes of each stream kept in memory, half from the head and half from the tail
+		self.capture_limit = capture_limit
+		self.resource_usage = None
+		self.captured_output = {}
+		# Process of the running command script and the flag set to cancel the execution
+		self.process = None
+		self.cancelled = threading.Event()
+		# Cancels the request of the persistent worker processing the inputs, if there is one
+		self.cancel_worker_request = None
+		# Records the phases of the execution as spans of the trace of the request
+		self.tracer = tracer or Tracer()
+		# Profile of the server-side parts of the execution, None if it is not profiled
+		self.profile = profile
+
+	def profiled(self, name):
+		"""Profile the block as section of the execution if the execution is profiled."""
+		return self.profile.section(name) if self.profile is not None else contextlib.nullcontext()
 
 	@staticmethod
 	def validate_input_datatypes(value, config_datatype):
@@ -68,17 +115,15 @@ class ToolExecutor:
 	def validate_inputs(self):
 		"""Validate the input values given in the post request with the tool configuration."""
 		provided_inputs = self.inputs
-		inputs_config = self.tool_config.get('inputs', [])
+		input_datatypes = self.spec.input_datatypes
 
 		# Check for unexpected inputs
-		expected_inputs = {inp['endpointName'] for inp in inputs_config}
-		unexpected_inputs = [key for key in provided_inputs if key not in expected_inputs]
+		unexpected_inputs = [key for key in provided_inputs if key not in input_datatypes]
 		if len(unexpected_inputs) > 0:
 			raise ValueError(f'Post request containing unexpected inputs: {unexpected_inputs}')
 
-		for inp in inputs_config:
-			endpoint_name = inp.get('endpointName')
-			endpoint_datatype = inp.get('endpointDataType').lower()
+		for endpoint_name, config_datatype in input_datatypes.items():
+			endpoint_datatype = config_datatype.lower()
 			# Check for missing required inputs
 			if endpoint_name not in provided_inputs:
 				raise ValueError(f'Post request missing required input: {endpoint_name}.')
@@ -86,18 +131,18 @@ class ToolExecutor:
 			# Check for empty values
 			if value is None:
 				raise ValueError(f'Input value for {endpoint_name} is empty.')
+			# Paths of uploaded files are created by the server and need no pattern check
+			if endpoint_name in self.uploaded_inputs:
+				continue
 			# Validate the data type
 			self.validate_input_datatypes(value, endpoint_datatype)
 
 	def validate_outputs(self, output_vars):
 		"""Validate the output variables with the tool configuration."""
-		output_config = self.tool_config.get('outputs', [])
+		output_datatypes = self.spec.output_datatypes
 
 		# Check for unexpected outputs
-		expected_outputs = {out['endpointName'] for out in output_config}
-		unexpected_outputs = [
-			key for key, value in output_vars.items() if key not in expected_outputs
-		]
+		unexpected_outputs = [key for key in output_vars if key not in output_datatypes]
 		if len(unexpected_outputs) > 0:
 			msg = f'Tool returned outputs not defined in the config file: {unexpected_outputs}'
 			raise ValueError(msg)
@@ -107,7 +152,7 @@ class ToolExecutor:
 			if value is None:
 				raise ValueError(f'Output value for {key} is empty.')
 			# Validate the data type
-			endpoint_datatype = output_config[0].get('endpointDataType').lower()
+			endpoint_datatype = output_datatypes[key].lower()
 			self.validate_input_datatypes(value, endpoint_datatype)
 
 	def set_execute_permission(self, tool_directory, command_script):
@@ -121,6 +166,45 @@ class ToolExecutor:
 			except Exception as e:
 				self.logger.error(f'Failed to set execute permission: {e}')
 
+	@staticmethod
+	def read_captured_output(file, limit=None):
+		"""Read the captured output of the command script from a file as text.
+
+		If the output exceeds the limit, only its head and tail are read into memory.
+		"""
+		size = file.seek(0, os.SEEK_END)
+		file.seek(0)
+		if limit is None or size <= limit:
+			data = file.read()
+		else:
+			head = file.read(limit // 2)
+			file.seek(size - limit // 2)
+			tail = file.read()
+			skipped = size - len(head) - len(tail)
+			data = head + f'\n[... {skipped} bytes truncated ...]\n'.encode() + tail
+		# Decode like subprocess does in text mode (locale encoding and universal newlines)
+		text = data.decode(locale.getpreferredencoding(False), errors='replace')
+		return text.replace('\r\n', '\n').replace('\r', '\n')
+
+	def open_capture_file(self, stream_name):
+		"""Open the file the given output stream of the command script is spilled to."""
+		if self.output_dir is None:
+			return tempfile.TemporaryFile()
+		os.makedirs(self.output_dir, exist_ok=True)
+		path = os.path.join(self.output_dir, f'{stream_name}.log')
+		return open(path, 'w+b')
+
+	def capture_output(self, stream_name, file):
+		"""Read the head and tail of a captured stream and record where its full content is."""
+		text = self.read_captured_output(file, self.capture_limit)
+		size = file.seek(0, os.SEEK_END)
+		self.captured_output[stream_name] = {
+			'bytes': size,
+			'truncated': self.capture_limit is not None and size > self.capture_limit,
+			'path': file.name if self.output_dir is not None else None,
+		}
+		return text
+
 	def execute_python_script(self, script, tool_dir, project_dir, output_vars=None):
 		"""Execute a pre-/post-script with placeholders for directories and output variables."""
 		# Replace ${dir:tool} with the tool directory
@@ -134,52 +218,24 @@ class ToolExecutor:
 		# Prepare the execution environment
 		local_vars = {'output_vars': output_vars}
 
-		# Track installed dependencies to clean up later
-		installed_dependencies = set()
-
 		original_cwd = os.getcwd()
 		try:
 			# Change working directory to project directory
 			os.chdir(project_dir)
 
-			while True:
-				try:
-					# Execute the dynamically generated script
-					exec(script, {}, local_vars)
-					break  # If execution succeeds, exit the loop
-				except ImportError as e:
-					missing_module = str(e).split("'")[1]
-					self.logger.warning(
-						f'Missing dependency detected: {missing_module}. Attempting to install it.'
-					)
-
-					# Add missing dependency
-					try:
-						subprocess.run(['poetry', 'add', missing_module], check=True)
-						installed_dependencies.add(missing_module)
-						self.logger.info(
-							f'Missing dependency {missing_module} successfully installed. '
-							f'Trying to rerun the script.'
-						)
-					except subprocess.CalledProcessError as install_error:
-						self.logger.error(
-							f'Failed to install missing dependency {missing_module}. '
-							f'Error: {install_error}'
-						)
-						raise install_error  # Reraise if installation fails
-				except Exception as e:
-					self.logger.error(f'Error while executing script: {e}')
-					raise e  # Reraise for unexpected errors
-
-			# Cleanup: Remove installed dependencies
-			for dependency in installed_dependencies:
-				try:
-					subprocess.run(['poetry', 'remove', dependency], check=True)
-					self.logger.info(f'Cleaned up dependency: {dependency}')
-				except subprocess.CalledProcessError as cleanup_error:
-					self.logger.warning(
-						f'Failed to clean up dependency {dependency}. Error: {cleanup_error}'
-					)
+			try:
+				# Execute the dynamically generated script
+				exec(script, {}, local_vars)
+			except ImportError as e:
+				# Dependencies are resolved at startup, nothing is installed during a request
+				self.logger.error(
+					f'Missing dependency {e.name} in script. Dependencies of pre- and post-scripts '
+					f'are installed at startup, restart the server to resolve them.'
+				)
+				raise e
+			except Exception as e:
+				self.logger.error(f'Error while executing script: {e}')
+				raise e  # Reraise for unexpected errors
 
 		finally:
 			# Restore original working directory
@@ -187,19 +243,135 @@ class ToolExecutor:
 
 		return output_vars
 
+	def extract_outputs(self, stdout, stderr, tool_directory):
+		"""Extract the outputs with a declarative spec from the output streams or result files.
+
+		Streams reduced to their head and tail are read completely from their spill file if an
+		output is extracted from them.
+		"""
+		extractors = self.spec.output_extractors
+		streams = {'stdout': stdout, 'stderr': stderr}
+		for stream_name, captured in self.captured_output.items():
+			needed = any(e.file is None and e.stream == stream_name for e in extractors.values())
+			if needed and captured['truncated'] and captured['path'] is not None:
+				with open(captured['path'], 'rb') as file:
+					streams[stream_name] = self.read_captured_output(file)
+		return {
+			name: extractor.extract(
+				streams['stdout'], streams['stderr'], self.inputs, tool_directory
+			)
+			for name, extractor in extractors.items()
+		}
+
+	@staticmethod
+	def kill_process_tree(process):
+		"""Kill the process of the command script together with all processes it started."""
+		if os.name == 'nt':
+			subprocess.run(
+				['taskkill', '/F', '/T', '/PID', str(process.pid)], capture_output=True, check=False
+			)
+			return
+		# The command script runs in its own session, so its process group contains all children
+		with contextlib.suppress(ProcessLookupError):
+			os.killpg(process.pid, signal.SIGKILL)
+
+	def cancel(self):
+		"""Cancel the execution, kill the command script if it is running."""
+		self.cancelled.set()
+		cancel_worker_request = self.cancel_worker_request
+		if cancel_worker_request is not None:
+			self.logger.info('Killing the persistent worker processing the inputs.')
+			cancel_worker_request()
+		process = self.process
+		if process is not None and process.returncode is None:
+			self.logger.info(f'Killing the command script (pid {process.pid}).')
+			self.kill_process_tree(process)
+
+	def check_cancelled(self):
+		if self.cancelled.is_set():
+			raise ExecutionCancelledError('Execution was cancelled.')
+
+	def run_command_script(self, command_script, tool_directory, argv=None):
+		"""Run the command script and capture its output and resource usage.
+
+		The command script is run in a shell, unless an argv list is given which is executed
+		directly.
+		"""
+		timeout = self.timeout * 60 if self.timeout is not None else None
+		with (
+			self.open_capture_file('stdout') as stdout_file,
+			self.open_capture_file('stderr') as stderr_file,
+		):
+			started_at = time.monotonic()
+			process = subprocess.Popen(
+				command_script if argv is None else argv,
+				shell=argv is None,
+				stdout=stdout_file,
+				stderr=stderr_file,
+				cwd=tool_directory,
+				start_new_session=os.name != 'nt',
+			)
+			self.process = process
+			# A cancellation before the process was registered would not have killed it
+			if self.cancelled.is_set():
+				self.kill_process_tree(process)
+			try:
+				return_code, usage = wait_for_process(process, timeout, started_at)
+				self.resource_usage = usage
+			except subprocess.TimeoutExpired:
+				self.kill_process_tree(process)
+				_, self.resource_usage = wait_for_process(process, started_at=started_at)
+				raise
+			stdout = self.capture_output('stdout', stdout_file)
+			stderr = self.capture_output('stderr', stderr_file)
+		return return_code, stdout, stderr
+
+	def run_worker_request(self):
+		"""Let a persistent worker of the pool process the inputs instead of a new process."""
+		timeout = self.timeout * 60 if self.timeout is not None else None
+		started_at = time.monotonic()
+
+		def on_checkout(cancel_request):
+			self.cancel_worker_request = cancel_request
+			# The execution may have been cancelled while it waited for an idle worker
+			if self.cancelled.is_set():
+				cancel_request()
+
+		try:
+			return_code, stdout, stderr = self.worker_pool.run(
+				self.inputs, timeout, on_checkout=on_checkout
+			)
+		except WorkerError:
+			self.check_cancelled()
+			raise
+		finally:
+			self.cancel_worker_request = None
+		self.resource_usage = {'wall_seconds': round(time.monotonic() - started_at, 6)}
+		# Capture the answer like the output of the command script to keep memory bounded
+		with self.open_capture_file('stdout') as stdout_file:
+			stdout_file.write(stdout.encode())
+			stdout = self.capture_output('stdout', stdout_file)
+		with self.open_capture_file('stderr') as stderr_file:
+			stderr_file.write(stderr.encode())
+			stderr = self.capture_output('stderr', stderr_file)
+		return return_code, stdout, stderr
+
 	def execute_tool(self):
 		"""Execute the tool with the provided inputs."""
-		field_command_script = CS_W if os.name == 'nt' else CS_L
-		command_script = self.tool_config.get(field_command_script, '')
-		set_tool_dir = self.tool_config.get(SET_AS_WORKING_DIR, '')
-		launch_settings = self.tool_config.get(LAUNCH_SETTINGS, [])
-		tool_directory = launch_settings[0].get(TOOL_DIR, '')
-		pre_script = self.tool_config.get(PRE_S, '')
-		post_script = self.tool_config.get(POST_S, '')
+		spec = self.spec
+		command_script = spec.command_script
+		tool_directory = spec.tool_directory
+		pre_script, post_script = spec.pre_script, spec.post_script
+		template = spec.command_template
 
 		# Replace the input placeholders in the command script
-		for key, value in self.inputs.items():
-			command_script = command_script.replace(f'${{in:{key}}}', str(value))
+		argv = None
+		if template is not None:
+			argv = template.render(self.inputs)
+			command_script = template.join(argv)
+		else:
+			for key, value in self.inputs.items():
+				command_script = command_script.replace(f'${{in:{key}}}', str(value))
 
 		# Find the project directory with pyproject.toml
 		start_working_dir = os.getcwd()
@@ -210,42 +382,48 @@ class ToolExecutor:
 			)
 			raise FileNotFoundError('pyproject.toml not found in any parent directories.')
 
+		self.check_cancelled()
+
 		# Execute the pre-script if defined
 		output_vars = {}
 		if pre_script:
 			self.logger.info(f'Executing pre-script: \n{pre_script}')
-			self.execute_python_script(pre_script, tool_directory, project_directory, output_vars)
+			with self.tracer.span('pre-script'), self.profiled('pre-script'):
+				self.execute_python_script(
+					pre_script, tool_directory, project_directory, output_vars
+				)
 
-		# Change working directory if required
-		tool_directory = tool_directory if set_tool_dir and tool_directory else start_working_dir
+		# Run in the tool directory if configured, otherwise in the directory of the execution
+		if spec.working_directory:
+			tool_directory = spec.working_directory
+		elif self.output_dir is not None:
+			os.makedirs(self.output_dir, exist_ok=True)
+			tool_directory = self.output_dir
+		else:
+			tool_directory = start_working_dir
 
-		# Check execute permissions for Linux
-		if os.name != 'nt':
-			self.set_execute_permission(tool_directory, command_script)
+		self.check_cancelled()
 
-		# Execute the command script
-		self.logger.info(f'Executing command script: {command_script}')
+		# Execute the command script, or hand the inputs to a persistent worker if configured
 		try:
-			if self.timeout is not None:
-				process = subprocess.run(
-					command_script,
-					shell=True,
-					capture_output=True,
-					text=True,
-					cwd=tool_directory,
-					timeout=self.timeout * 60,
-				)
+			if self.worker_pool is not None:
+				self.logger.info(f'Handing inputs to a persistent worker: {self.inputs}')
+				with self.tracer.span('worker request'):
+					return_code, stdout, stderr = self.run_worker_request()
 			else:
-				process = subprocess.run(
-					command_script,
-					shell=True,
-					capture_output=True,
-					text=True,
-					cwd=tool_directory,
-				)
-			stdout = process.stdout
-			stderr = process.stderr
-			return_code = process.returncode
+				# Check execute permissions for Linux
+				if os.name != 'nt':
+					self.set_execute_permission(tool_directory, command_script)
+				self.logger.info(f'Executing command script: {command_script}')
+				if argv is not None and os.name == 'nt':
+					# Without cmd.exe, executables in the working directory have to be resolved
+					local_executable = os.path.join(tool_directory, argv[0])
+					if os.path.exists(local_executable):
+						argv[0] = os.path.abspath(local_executable)
+				with self.tracer.span('subprocess', command=command_script):
+					return_code, stdout, stderr = self.run_command_script(
+						command_script, tool_directory, argv
+					)
 		except subprocess.TimeoutExpired:
 			self.logger.error(
 				f'Timeout of {self.timeout} minutes expired while executing command script.'
@@ -255,19 +433,32 @@ class ToolExecutor:
 			self.logger.error(f'Permission denied when executing {command_script}')
 			stderr = f'Permission denied: {command_script}'
 			return -2, '', stderr, tool_directory, command_script, {}
+		self.logger.info(f'Resource usage of command script: {self.resource_usage}')
+
+		# The post-script is skipped for cancelled executions
+		self.check_cancelled()
+
+		# Extract the outputs declared in the configuration without running a script
+		if spec.output_extractors and return_code == 0:
+			with self.tracer.span('output extraction'), self.profiled('output extraction'):
+				output_vars.update(self.extract_outputs(stdout, stderr, tool_directory))
+			self.logger.info(f'Extracted outputs: {output_vars}')
 
 		# Execute the post-script if defined
 		if post_script:
 			self.logger.info(f'Executing post-script: \n{post_script}.')
-			output_vars = self.execute_python_script(
-				post_script, tool_directory, project_directory, output_vars
-			)
-			# Validate outputs with expected outputs from config file
-			self.validate_outputs(output_vars)
+			with self.tracer.span('post-script'), self.profiled('post-script'):
+				output_vars = self.execute_python_script(
+					post_script, tool_directory, project_directory, output_vars
+				)
 			self.logger.info(f'Outputs from Post-script: {output_vars}')
 
+		# Validate outputs with expected outputs from config file
+		if spec.output_extractors or post_script:
+			self.validate_outputs(output_vars)
+
 		# Restore working directory
-		if set_tool_dir and tool_directory:
+		if spec.working_directory:
 			os.chdir(start_working_dir)
 
 		return return_code, stdout, stderr, tool_directory, command_script, output_vars
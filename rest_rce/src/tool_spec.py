@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+from collections.abc import Mapping
+from dataclasses import dataclass
+from types import MappingProxyType
+
+from rest_rce.src.command_template import CommandTemplate
+from rest_rce.src.constants import (
+	CS_L,
+	CS_W,
+	DELETE_WORKING_DIRS,
+	INPUTS,
+	KEEP_WORKING_DIRS,
+	LAUNCH_SETTINGS,
+	LIMIT_INSTANCES,
+	LIMIT_INSTANCES_NUMBER,
+	OUTPUTS,
+	POST_S,
+	PRE_S,
+	SET_AS_WORKING_DIR,
+	TOOL_DIR,
+)
+from rest_rce.src.output_extraction import OutputExtractor
+from rest_rce.src.working_directories import DELETE, KEEP, NEVER_DELETE
+
+
+def is_enabled(value):
+	"""RCE configurations store flags as booleans or as the strings "true" and "false"."""
+	return str(value).lower() == 'true'
+
+
+def parse_instance_limit(launch_settings):
+	"""Return the number of parallel instances the tool is limited to, None if it is unlimited."""
+	if not is_enabled(launch_settings.get(LIMIT_INSTANCES)):
+		return None
+	number = launch_settings.get(LIMIT_INSTANCES_NUMBER)
+	try:
+		limit = int(number)
+	except (TypeError, ValueError):
+		limit = 0
+	if limit < 1:
+		raise ValueError(f'{LIMIT_INSTANCES_NUMBER} must be a positive integer, got {number!r}.')
+	return limit
+
+
+def parse_working_directory_policy(config):
+	"""Return what happens to the directory of an execution once it finished."""
+	if is_enabled(config.get(KEEP_WORKING_DIRS)):
+		return NEVER_DELETE
+	if is_enabled(config.get(DELETE_WORKING_DIRS)):
+		return DELETE
+	return KEEP
+
+
+@dataclass(frozen=True, slots=True)
+class ToolSpec:
+	"""Immutable view of a tool configuration with everything requests need pre-computed.
+
+	The spec is built once from the parsed configuration file, so requests do not have to
+	re-derive the platform specific command script, the tool directory or the endpoint maps.
+	"""
+
+	config: Mapping
+	# Hash of the canonical configuration, identifies the configuration an execution ran with
+	fingerprint: str
+	tool_name: str | None
+	command_script: str
+	command_template: CommandTemplate | None
+	tool_directory: str
+	set_tool_dir_as_working_dir: bool
+	# Number of parallel executions the tool is limited to, None if unlimited
+	instance_limit: int | None
+	# Cleanup policy of the directories of finished executions
+	working_directory_policy: str
+	pre_script: str
+	post_script: str
+	# Endpoint names mapped to the data types given in the configuration
+	input_datatypes: Mapping
+	output_datatypes: Mapping
+	# Extractors of the outputs with a declarative 'extract' spec, evaluated before the post-script
+	output_extractors: Mapping
+
+	@classmethod
+	def from_config(cls, config, no_shell=False):
+		"""Build the spec from a parsed configuration, compiling the command script if needed."""
+		command_script = config.get(CS_W if os.name == 'nt' else CS_L, '')
+		launch_settings = config.get(LAUNCH_SETTINGS) or [{}]
+		return cls(
+			config=MappingProxyType(dict(config)),
+			fingerprint=hashlib.sha256(
+				json.dumps(config, sort_keys=True, default=str).encode()
+			).hexdigest(),
+			tool_name=config.get('toolName'),
+			command_script=command_script,
+			command_template=CommandTemplate(command_script) if no_shell else None,
+			tool_directory=launch_settings[0].get(TOOL_DIR, ''),
+			set_tool_dir_as_working_dir=bool(config.get(SET_AS_WORKING_DIR, '')),
+			instance_limit=parse_instance_limit(launch_settings[0]),
+			working_directory_policy=parse_working_directory_policy(config),
+			pre_script=config.get(PRE_S, ''),
+			post_script=config.get(POST_S, ''),
+			input_datatypes=MappingProxyType(
+				{inp['endpointName']: inp.get('endpointDataType') for inp in config.get(INPUTS, [])}
+			),
+			output_datatypes=MappingProxyType(
+				{
+					out['endpointName']: out.get('endpointDataType')
+					for out in config.get(OUTPUTS, [])
+				}
+			),
+			output_extractors=MappingProxyType(
+				{
+					out['endpointName']: OutputExtractor(
+						out['endpointName'], out.get('endpointDataType'), out['extract']
+					)
+					for out in config.get(OUTPUTS, [])
+					if out.get('extract')
+				}
+			),
+		)
+
+	@property
+	def working_directory(self):
+		"""Directory the command script runs in, None for the current working directory."""
+		if self.set_tool_dir_as_working_dir and self.tool_directory:
+			return self.tool_directory
+		return None
@@ -0,0 +1,113 @@
+import contextlib
+import itertools
+import json
+import logging
+import logging.handlers
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+# Track (thread ID in the trace) the spans of the current request are drawn on
+trace_track: ContextVar[int] = ContextVar('trace_track', default=0)
+
+
+class TraceFileHandler(logging.handlers.RotatingFileHandler):
+	"""Rotating file of trace events in the JSON array format of the Chrome trace viewer.
+
+	Every file starts with '[' and every event ends with ',', the viewers (Perfetto,
+	chrome://tracing) accept the missing closing bracket, so a file can be loaded while it is
+	still written and after it was rotated.
+	"""
+
+	def _open(self):
+		stream = super()._open()
+		if stream.tell() == 0:
+			stream.write('[\n')
+			stream.flush()
+		return stream
+
+
+class Tracer:
+	"""Record spans of requests and write them as Chrome trace events to a rotating file.
+
+	Each request is drawn on its own track, so concurrent requests, queueing and stalls can be
+	seen on a timeline. Tracing is disabled if no file path is given, spans cost next to nothing
+	then.
+	"""
+
+	def __init__(self, path=None, max_bytes=10 * 1024 * 1024, backup_count=3):
+		self.enabled = path is not None
+		self.pid = os.getpid()
+		# Timestamps are monotonic, but aligned to the wall clock to match the log files
+		self._offset_ns = time.time_ns() - time.perf_counter_ns()
+		self._tracks = itertools.count(1)
+		self._logger = None
+		if self.enabled:
+			os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+			handler = TraceFileHandler(path, maxBytes=max_bytes, backupCount=backup_count)
+			handler.setFormatter(logging.Formatter('%(message)s,'))
+			self._logger = logging.getLogger(f'{__name__}.{id(self)}')
+			self._logger.propagate = False
+			self._logger.setLevel(logging.INFO)
+			self._logger.addHandler(handler)
+
+	def now(self):
+		"""Current timestamp in microseconds."""
+		return (time.perf_counter_ns() + self._offset_ns) / 1000
+
+	def write(self, event):
+		self._logger.info(json.dumps(event, default=str))
+
+	def start_track(self, name):
+		"""Draw the spans of the current context (e.g. a request) on a new named track."""
+		if not self.enabled:
+			return
+		track = next(self._tracks)
+		trace_track.set(track)
+		self.write(
+			{
+				'name': 'thread_name',
+				'ph': 'M',
+				'pid': self.pid,
+				'tid': track,
+				'args': {'name': name},
+			}
+		)
+
+	def record(self, name, start, duration, **args):
+		"""Record a span which started at the given timestamp and lasted 'duration' microseconds."""
+		if not self.enabled:
+			return
+		self.write(
+			{
+				'name': name,
+				'cat': 'rest_rce',
+				'ph': 'X',
+				'ts': round(start, 3),
+				'dur': round(duration, 3),
+				'pid': self.pid,
+				'tid': trace_track.get(),
+				'args': {'thread': threading.current_thread().name, **args},
+			}
+		)
+
+	@contextlib.contextmanager
+	def span(self, name, **args):
+		"""Record the time spent in the block as span of the current track."""
+		if not self.enabled:
+			yield
+			return
+		start = self.now()
+		try:
+			yield
+		finally:
+			self.record(name, start, self.now() - start, **args)
+
+	def close(self):
+		"""Close the trace file, spans are not recorded afterwards."""
+		self.enabled = False
+		if self._logger is not None:
+			for handler in self._logger.handlers:
+				handler.close()
+			self._logger.handlers.clear()
@@ -0,0 +1,157 @@
+import asyncio
+import json
+import os
+import re
+
+from fastapi import HTTPException, Request
+from python_multipart.exceptions import MultipartParseError
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.requests import ClientDisconnect
+
+FILE_DATATYPES = ('file', 'filereference')
+DIRECTORY_DATATYPES = ('directory', 'directoryreference')
+
+
+def sanitize_relative_path(filename):
+	"""Turn a client supplied file name into a safe relative path without parent references."""
+	parts = []
+	for part in re.split(r'[/\\]', filename):
+		part = re.sub(r'[^\w.-]', '_', part)
+		if part and part not in ('.', '..'):
+			parts.append(part)
+	if not parts:
+		raise HTTPException(status_code=422, detail=f'Invalid upload file name: {filename}')
+	return os.path.join(*parts)
+
+
+class MultipartUpload:
+	"""Streaming parser for multipart requests writing uploaded files directly to disk.
+
+	File parts are written chunk by chunk to the upload directory of the execution and bound to
+	the file or directory input named like the form field. The form field 'inputs' may contain a
+	JSON object with the remaining inputs, other plain fields are parsed as JSON if possible.
+	Fields must not set an uploaded input, its path is always the one of the uploaded file.
+	"""
+
+	def __init__(self, upload_dir, input_datatypes):
+		self.upload_dir = upload_dir
+		self.datatypes = {name: (dtype or '').lower() for name, dtype in input_datatypes.items()}
+		self.inputs = {}
+		# Uploaded inputs mapped to the paths they are bound to, applied after parsing
+		self.uploaded_paths = {}
+		self._headers = {}
+		self._header_field = b''
+		self._header_value = b''
+		self._field_name = None
+		self._field_data = None
+		self._file = None
+
+	def on_part_begin(self):
+		self._headers = {}
+
+	def on_header_field(self, data, start, end):
+		self._header_field += data[start:end]
+
+	def on_header_value(self, data, start, end):
+		self._header_value += data[start:end]
+
+	def on_header_end(self):
+		self._headers[self._header_field.lower()] = self._header_value
+		self._header_field = b''
+		self._header_value = b''
+
+	def on_headers_finished(self):
+		_, options = parse_options_header(self._headers.get(b'content-disposition', b''))
+		self._field_name = options.get(b'name', b'').decode()
+		filename = options.get(b'filename')
+		if filename is None:
+			self._field_data = bytearray()
+			return
+		self._file = self.open_upload_file(self._field_name, filename.decode())
+
+	def on_part_data(self, data, start, end):
+		if self._file is not None:
+			self._file.write(data[start:end])
+		else:
+			self._field_data += data[start:end]
+
+	def on_part_end(self):
+		if self._file is not None:
+			self._file.close()
+			self._file = None
+			return
+		value = self._field_data.decode()
+		if self._field_name == 'inputs':
+			try:
+				self.inputs.update(json.loads(value))
+			except (json.JSONDecodeError, TypeError, ValueError) as e:
+				raise HTTPException(
+					status_code=422, detail=f'Field "inputs" is not a JSON object: {e}'
+				) from e
+			return
+		try:
+			self.inputs[self._field_name] = json.loads(value)
+		except json.JSONDecodeError:
+			self.inputs[self._field_name] = value
+
+	def open_upload_file(self, endpoint_name, filename):
+		"""Open the file an uploaded part is written to and bind its path to the input."""
+		datatype = self.datatypes.get(endpoint_name)
+		if datatype in FILE_DATATYPES:
+			if endpoint_name in self.uploaded_paths:
+				raise HTTPException(
+					status_code=422, detail=f'Only one file can be uploaded for {endpoint_name}.'
+				)
+			input_dir = os.path.join(self.upload_dir, endpoint_name)
+			path = os.path.join(input_dir, os.path.basename(sanitize_relative_path(filename)))
+			self.uploaded_paths[endpoint_name] = path
+		elif datatype in DIRECTORY_DATATYPES:
+			input_dir = os.path.join(self.upload_dir, endpoint_name)
+			path = os.path.join(input_dir, sanitize_relative_path(filename))
+			self.uploaded_paths[endpoint_name] = input_dir
+		else:
+			raise HTTPException(
+				status_code=422,
+				detail=f'Uploaded file for {endpoint_name}, which is no file or directory input.',
+			)
+		os.makedirs(os.path.dirname(path), exist_ok=True)
+		return open(path, 'wb')
+
+	async def parse(self, request: Request):
+		"""Stream the request body through the parser, writing files in a worker thread.
+
+		Malformed bodies, disconnects and failed writes are raised as HTTPException.
+		"""
+		content_type, options = parse_options_header(request.headers.get('content-type', ''))
+		if content_type != b'multipart/form-data' or b'boundary' not in options:
+			raise HTTPException(status_code=415, detail='Expected a multipart/form-data request.')
+		callbacks = {
+			'on_part_begin': self.on_part_begin,
+			'on_part_data': self.on_part_data,
+			'on_part_end': self.on_part_end,
+			'on_header_field': self.on_header_field,
+			'on_header_value': self.on_header_value,
+			'on_header_end': self.on_header_end,
+			'on_headers_finished': self.on_headers_finished,
+		}
+		parser = MultipartParser(options[b'boundary'], callbacks)
+		try:
+			async for chunk in request.stream():
+				if chunk:
+					await asyncio.to_thread(parser.write, chunk)
+			parser.finalize()
+		except MultipartParseError as e:
+			raise HTTPException(status_code=400, detail=f'Malformed multipart body: {e}') from e
+		except ClientDisconnect as e:
+			raise HTTPException(status_code=400, detail='Client disconnected during upload.') from e
+		except OSError as e:
+			raise HTTPException(status_code=500, detail=f'Upload could not be written: {e}') from e
+		finally:
+			if self._file is not None:
+				self._file.close()
+		overridden = sorted(set(self.inputs) & set(self.uploaded_paths))
+		if overridden:
+			raise HTTPException(
+				status_code=422, detail=f'Fields set the uploaded inputs: {overridden}.'
+			)
+		return {**self.inputs, **self.uploaded_paths}, set(self.uploaded_paths)
@@ -5,8 +5,8 @@ import sys
 from contextvars import ContextVar
 
 
-def parse_arguments() -> tuple[str, float, int]:
-	"""Parse arguments given via the command line."""
+def parse_cli_arguments(args: list[str] | None = None) -> argparse.Namespace:
+	"""Parse all arguments given via the command line, or the given list of arguments."""
 	parser = argparse.ArgumentParser(description='Process some inputs.')
 	# Required argument config file path
 	parser.add_argument('config_file_path', type=str, help='Path to the config file')
@@ -20,7 +20,234 @@ def parse_arguments() -> tuple[str, float, int]:
 	parser.add_argument(
 		'-a', '--attempts', type=int, help='Number of automatic attempts to execute tool', default=3
 	)
-	args = parser.parse_args()
+	parser.add_argument(
+		'--retry_exit_codes',
+		type=int,
+		nargs='*',
+		help='Exit codes of the command script after which the execution is retried',
+		default=[],
+	)
+	parser.add_argument(
+		'--retry_stderr',
+		type=str,
+		action='append',
+		help='Regular expression, the execution is retried if stderr matches it (repeatable)',
+		default=[],
+	)
+	parser.add_argument(
+		'--retry_timeouts',
+		action='store_true',
+		help='Retry executions whose command script timed out',
+	)
+	parser.add_argument(
+		'--retry_backoff',
+		type=float,
+		help='Base of the exponential backoff between attempts in seconds',
+		default=2.0,
+	)
+	parser.add_argument(
+		'--retry_max_backoff',
+		type=float,
+		help='Maximal backoff between attempts in seconds',
+		default=10.0,
+	)
+	parser.add_argument(
+		'--breaker_failure_rate',
+		type=float,
+		help='Failure rate (0-1) of recent executions opening the circuit breaker of a tool',
+		default=None,
+	)
+	parser.add_argument(
+		'--breaker_window',
+		type=int,
+		help='Number of recent executions the failure rate is computed from',
+		default=20,
+	)
+	parser.add_argument(
+		'--breaker_min_calls',
+		type=int,
+		help='Minimal number of recent executions before the circuit breaker can open',
+		default=5,
+	)
+	parser.add_argument(
+		'--breaker_open_seconds',
+		type=float,
+		help='Seconds executions are rejected before the circuit breaker lets probes through',
+		default=30.0,
+	)
+	parser.add_argument(
+		'--breaker_probes',
+		type=int,
+		help='Number of parallel probe executions while the circuit breaker is half-open',
+		default=1,
+	)
+	parser.add_argument(
+		'--coalesce',
+		action='store_true',
+		help='Let identical requests attach to an execution in flight instead of running again',
+	)
+	parser.add_argument(
+		'--idempotency_ttl',
+		type=float,
+		help='Seconds an Idempotency-Key header is mapped to the execution it started',
+		default=3600.0,
+	)
+	parser.add_argument(
+		'--idempotency_max_keys',
+		type=int,
+		help='Number of Idempotency-Key headers remembered, the oldest ones are evicted',
+		default=10000,
+	)
+	parser.add_argument(
+		'--cancel_on_disconnect',
+		action='store_true',
+		help='Cancel an execution if the client of /execute-tool/ disconnects before it finished',
+	)
+	parser.add_argument(
+		'--drain_timeout',
+		type=float,
+		help='Seconds running executions may finish at shutdown before they are cancelled',
+		default=60.0,
+	)
+	parser.add_argument('--host', type=str, help='Host the server listens on', default='127.0.0.1')
+	parser.add_argument('--port', type=int, help='Port the server listens on', default=8000)
+	parser.add_argument(
+		'--backends',
+		type=str,
+		nargs='+',
+		help='URLs of REST-RCE nodes, runs the server as coordinator forwarding executions to them',
+		default=None,
+	)
+	parser.add_argument(
+		'--compression_min_size',
+		type=int,
+		help='Minimum size in bytes of JSON and text responses compressed with gzip or zstd',
+		default=1024,
+	)
+	parser.add_argument(
+		'--archive_dir',
+		type=str,
+		help='Directory finished execution directories are archived to instead of deleting them',
+		default=None,
+	)
+	parser.add_argument(
+		'--working_dir_retention',
+		type=float,
+		help='Seconds the directory of a finished execution is kept before it is deleted',
+		default=300.0,
+	)
+	parser.add_argument(
+		'--working_dir_quota',
+		type=float,
+		help='Quota in MB of all execution directories, least recently used ones are evicted',
+		default=None,
+	)
+	parser.add_argument(
+		'--cleanup_interval',
+		type=float,
+		help='Seconds between cleanups of the directories of finished executions',
+		default=30.0,
+	)
+	parser.add_argument(
+		'--trace_file',
+		type=str,
+		help='File to write spans of the requests to in the Chrome trace event format',
+		default=None,
+	)
+	parser.add_argument(
+		'--trace_max_size',
+		type=float,
+		help='Size in MB after which the trace file is rotated',
+		default=10.0,
+	)
+	parser.add_argument(
+		'--trace_backups',
+		type=int,
+		help='Number of rotated trace files kept',
+		default=3,
+	)
+	parser.add_argument(
+		'--profile_dir',
+		type=str,
+		help='Directory to write cProfile profiles of selected executions to',
+		default=None,
+	)
+	parser.add_argument(
+		'--profile_token',
+		type=str,
+		help="Admin token, executions requested with it in the 'X-Profile' header are profiled",
+		default=None,
+	)
+	parser.add_argument(
+		'--profile_all',
+		action='store_true',
+		help='Profile every execution (requires --profile_dir)',
+	)
+	parser.add_argument(
+		'--profile_limit',
+		type=int,
+		help='Number of profiles kept, the oldest ones are removed',
+		default=20,
+	)
+	parser.add_argument(
+		'--executions_dir',
+		type=str,
+		help='Directory for per-execution files like captured stdout/stderr',
+		default=None,
+	)
+	parser.add_argument(
+		'--capture_limit',
+		type=int,
+		help='Bytes of stdout/stderr kept in memory per stream (head and tail)',
+		default=65536,
+	)
+	parser.add_argument(
+		'--worker_command',
+		type=str,
+		help='Command starting a persistent tool worker (JSON lines over stdin/stdout)',
+		default=None,
+	)
+	parser.add_argument(
+		'--worker_pool_size',
+		type=int,
+		help='Number of persistent workers, defaults to the request limit',
+		default=None,
+	)
+	parser.add_argument(
+		'--worker_max_requests',
+		type=int,
+		help='Requests after which a persistent worker is recycled',
+		default=100,
+	)
+	parser.add_argument(
+		'--no_shell',
+		action='store_true',
+		help='Run the command script directly from a compiled argv template without a shell',
+	)
+	parser.add_argument(
+		'--dependency_dir',
+		type=str,
+		help='Directory for the cached dependency environments of pre-/post-scripts',
+		default=None,
+	)
+	parser.add_argument(
+		'--history_db',
+		type=str,
+		help='SQLite database file for the execution history, kept in memory if not set',
+		default=':memory:',
+	)
+	parser.add_argument(
+		'--reload_interval',
+		type=float,
+		help='Seconds between checks of the config file for changes, 0 disables reloading',
+		default=2.0,
+	)
+	return parser.parse_args(args)
+
+
+def parse_arguments() -> tuple[str, float, int, int]:
+	"""Parse the core arguments given via the command line."""
+	args = parse_cli_arguments()
 	config_file_path = args.config_file_path
 	timeout = args.timeout
 	limit = args.request_limit
@@ -28,9 +255,24 @@ def parse_arguments() -> tuple[str, float, int]:
 	return config_file_path, timeout, limit, attempts
 
 
+def default_executions_dir() -> str:
+	"""Return the default directory for per-execution files inside the project root."""
+	start_dir = os.path.dirname(os.path.abspath(__file__))
+	return os.path.join(find_project_directory(start_dir), 'executions')
+
+
+def default_dependency_dir() -> str:
+	"""Return the default directory for dependencies of pre-/post-scripts in the project root."""
+	start_dir = os.path.dirname(os.path.abspath(__file__))
+	return os.path.join(find_project_directory(start_dir), 'envs')
+
+
 def set_up_logger(request_id_var: ContextVar[str]) -> logging.Logger:
 	"""Set up logger for rest api containing file and console handlers."""
 	logger = logging.getLogger(__name__)
+	# The logger is set up once per process, also if several apps are created
+	if logger.handlers:
+		return logger
 	logger.setLevel(logging.INFO)
 	formatter = logging.Formatter(
 		'%(asctime)s - %(levelname)s - [Request ID: %(request_id)s] - %(message)s',
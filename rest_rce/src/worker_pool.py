@@ -0,0 +1,171 @@
+import json
+import os
+import queue
+import shlex
+import subprocess
+import threading
+import time
+
+
+class WorkerError(Exception):
+	"""Raised if a persistent worker died or answered with an invalid response."""
+
+
+class ToolWorker:
+	"""A pre-started tool process answering requests over a JSON lines protocol.
+
+	For every request the worker receives one line '{"inputs": {...}}' on stdin and has to answer
+	with one line '{"return_code": 0, "stdout": "...", "stderr": "..."}' on stdout.
+	"""
+
+	def __init__(self, command, cwd, log_file=None):
+		self.process = subprocess.Popen(
+			command,
+			stdin=subprocess.PIPE,
+			stdout=subprocess.PIPE,
+			stderr=log_file if log_file is not None else subprocess.DEVNULL,
+			cwd=cwd,
+			text=True,
+			bufsize=1,
+		)
+		self.handled_requests = 0
+		# Lines are read by a background thread, so a request can wait for them with a timeout
+		self._lines = queue.Queue()
+		self._reader = threading.Thread(target=self._read_lines, daemon=True)
+		self._reader.start()
+
+	def _read_lines(self):
+		for line in self.process.stdout:
+			self._lines.put(line)
+		self._lines.put(None)
+
+	def is_alive(self):
+		return self.process.poll() is None
+
+	def request(self, inputs, timeout=None):
+		"""Send the inputs of a single execution and wait for the answer of the worker."""
+		try:
+			self.process.stdin.write(json.dumps({'inputs': inputs}) + '\n')
+			self.process.stdin.flush()
+		except OSError as e:
+			raise WorkerError(f'Worker process is not accepting requests: {e}') from e
+		try:
+			line = self._lines.get(timeout=timeout)
+		except queue.Empty as e:
+			raise subprocess.TimeoutExpired(self.process.args, timeout) from e
+		if line is None:
+			raise WorkerError(f'Worker process exited with code {self.process.wait()}.')
+		try:
+			response = json.loads(line)
+			result = int(response['return_code']), response['stdout'], response['stderr']
+		except (json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+			raise WorkerError(f'Invalid response from worker process: {line!r}') from e
+		self.handled_requests += 1
+		return result
+
+	def stop(self):
+		"""Stop the worker process, closing stdin first to let it exit on its own."""
+		try:
+			self.process.stdin.close()
+			self.process.wait(timeout=1)
+		except (OSError, subprocess.TimeoutExpired):
+			self.process.kill()
+			self.process.wait()
+
+
+class WorkerPool:
+	"""Pool of warm tool workers, recycled after a number of requests or on failure."""
+
+	def __init__(self, command, cwd, size, logger, max_requests=None, log_path=None):
+		self.command = (
+			shlex.split(command, posix=os.name != 'nt') if isinstance(command, str) else command
+		)
+		self.cwd = cwd
+		self.size = size
+		self.logger = logger
+		self.max_requests = max_requests
+		# The stderr log of the workers is kept open for the lifetime of the pool
+		self.log_file = open(log_path, 'a') if log_path is not None else None  # noqa: SIM115
+		self._idle = queue.Queue()
+		self._closed = False
+
+	def start(self):
+		"""Start all workers of the pool."""
+		for _ in range(self.size):
+			self._idle.put(self._start_worker())
+		self.logger.info(f'Started {self.size} persistent workers: {self.command}')
+
+	def _start_worker(self):
+		return ToolWorker(self.command, self.cwd, self.log_file)
+
+	def _replace(self, worker):
+		"""Stop a worker and put a freshly started one into the pool."""
+		worker.stop()
+		if not self._closed:
+			self._idle.put(self._start_worker())
+
+	def run(self, inputs, timeout=None, on_checkout=None):
+		"""Hand the inputs to an idle worker and return its return code, stdout and stderr.
+
+		If on_checkout is given, it is called with a function cancelling the request once a worker
+		is checked out. Cancelling kills the busy worker, which is replaced like a failed worker,
+		and raises a WorkerError. Once the request returned, the function does nothing.
+		"""
+		started_at = time.monotonic()
+		try:
+			worker = self._idle.get(timeout=timeout)
+		except queue.Empty as e:
+			raise subprocess.TimeoutExpired(self.command, timeout) from e
+		remaining = None if timeout is None else max(timeout - (time.monotonic() - started_at), 0)
+
+		lock = threading.Lock()
+		in_use, killed = True, False
+
+		def cancel():
+			nonlocal killed
+			with lock:
+				if in_use:
+					killed = True
+					worker.process.kill()
+
+		if on_checkout is not None:
+			on_checkout(cancel)
+		try:
+			try:
+				if not worker.is_alive():
+					raise WorkerError(
+						f'Worker process exited with code {worker.process.returncode}.'
+					)
+				result = worker.request(inputs, remaining)
+			finally:
+				with lock:
+					in_use = False
+			if killed:
+				raise WorkerError('Worker process was killed to cancel the request.')
+		except (WorkerError, subprocess.TimeoutExpired) as e:
+			self.logger.warning(f'Recycling persistent worker after failure: {e}')
+			worker.process.kill()
+			threading.Thread(target=self._replace, args=(worker,), daemon=True).start()
+			raise
+
+		if self._closed:
+			worker.stop()
+		elif self.max_requests is not None and worker.handled_requests >= self.max_requests:
+			self.logger.info(
+				f'Recycling persistent worker after {worker.handled_requests} requests.'
+			)
+			threading.Thread(target=self._replace, args=(worker,), daemon=True).start()
+		else:
+			self._idle.put(worker)
+		return result
+
+	def close(self):
+		"""Stop all idle workers, workers in use are stopped when they are returned."""
+		self._closed = True
+		while True:
+			try:
+				self._idle.get_nowait().stop()
+			except queue.Empty:
+				break
+		if self.log_file is not None:
+			self.log_file.close()
@@ -0,0 +1,202 @@
+import asyncio
+import contextlib
+import os
+import re
+import shutil
+import threading
+import time
+
+# What happens to the directory of an execution once it finished
+KEEP = 'keep'
+DELETE = 'delete'
+NEVER_DELETE = 'never'
+
+# Only directories named like execution IDs are evicted, other files in the root are left alone
+EXECUTION_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+# File in the directory of an execution storing its policy, so that it survives a restart
+POLICY_FILE = '.policy'
+
+
+def directory_size(path):
+	"""Return the size in bytes of all files below a directory."""
+	size = 0
+	for root, _, files in os.walk(path):
+		for name in files:
+			try:
+				size += os.lstat(os.path.join(root, name)).st_size
+			except OSError:
+				continue
+	return size
+
+
+def read_policy(path):
+	"""Return the time the execution ended and its policy stored in its directory, or None."""
+	try:
+		with open(os.path.join(path, POLICY_FILE)) as file:
+			policy, finished_at = file.read().split()
+		return float(finished_at), policy
+	except (OSError, ValueError):
+		return None
+
+
+class WorkingDirectoryManager:
+	"""Clean up the directories of finished executions in the background.
+
+	Directories of executions whose tool configuration asks for it are deleted, or archived if
+	an archive directory is set, once the retention period after their execution ended is over.
+	If the directories together exceed the quota, the least recently used directories of
+	finished executions are removed until the quota is met again. Directories of executions in
+	progress and of tools configured to never delete them are not touched.
+
+	Only executions in progress and directories waiting for their deletion are tracked in
+	memory. The policy of a finished execution is stored in its directory and the modification
+	time of the directory is its last use, so both are respected after a restart as well.
+	"""
+
+	def __init__(self, root, logger, archive_dir=None, retention=300.0, quota=None, clock=None):
+		self.root = root
+		self.logger = logger
+		self.archive_dir = archive_dir
+		self.retention = retention
+		# Maximal size of all directories in bytes, None for no quota
+		self.quota = quota
+		self.clock = clock or time.time
+		self._active = set()
+		# Execution ID mapped to the time its execution ended and the cleanup policy
+		self._finished = {}
+		self._last_used = {}
+		self._lock = threading.Lock()
+
+	def started(self, execution_id):
+		with self._lock:
+			self._active.add(execution_id)
+			self._last_used[execution_id] = self.clock()
+
+	def finished(self, execution_id, policy=KEEP):
+		finished_at = self.clock()
+		self.store_policy(execution_id, policy, finished_at)
+		with self._lock:
+			self._active.discard(execution_id)
+			if policy == DELETE:
+				self._finished[execution_id] = (finished_at, policy)
+				self._last_used[execution_id] = finished_at
+			else:
+				self._finished.pop(execution_id, None)
+				self._last_used.pop(execution_id, None)
+
+	def store_policy(self, execution_id, policy, finished_at):
+		"""Write the policy to the directory of an execution and set its time of last use."""
+		path = os.path.join(self.root, execution_id)
+		if not os.path.isdir(path):
+			return
+		try:
+			if policy != KEEP:
+				with open(os.path.join(path, POLICY_FILE), 'w') as file:
+					file.write(f'{policy} {finished_at}')
+			os.utime(path, (finished_at, finished_at))
+		except OSError as e:
+			self.logger.warning(f'Policy of the directory of {execution_id} not stored: {e!r}')
+
+	def touch(self, execution_id):
+		"""Record an access to the files of an execution, e.g. a download of its outputs."""
+		with self._lock:
+			if execution_id in self._last_used:
+				self._last_used[execution_id] = self.clock()
+				return
+		if EXECUTION_ID_PATTERN.match(execution_id):
+			now = self.clock()
+			with contextlib.suppress(OSError):
+				os.utime(os.path.join(self.root, execution_id), (now, now))
+
+	def last_used(self, execution_id, path):
+		"""Time of the last use, directories of finished executions use their modification time."""
+		if execution_id in self._last_used:
+			return self._last_used[execution_id]
+		try:
+			return os.stat(path).st_mtime
+		except OSError:
+			return 0.0
+
+	def remove(self, execution_id):
+		"""Archive the directory of an execution if an archive directory is set and delete it."""
+		path = os.path.join(self.root, execution_id)
+		if self.archive_dir is not None:
+			os.makedirs(self.archive_dir, exist_ok=True)
+			base_name = os.path.join(self.archive_dir, execution_id)
+			shutil.make_archive(base_name, 'gztar', root_dir=path)
+			self.logger.info(f'Directory of execution {execution_id} archived to {base_name}.')
+		shutil.rmtree(path, ignore_errors=True)
+		with self._lock:
+			self._finished.pop(execution_id, None)
+			self._last_used.pop(execution_id, None)
+
+	def cleanup(self):
+		"""Remove expired directories and evict directories until the quota is met.
+
+		Returns the IDs of the executions whose directories were removed.
+		"""
+		if not os.path.isdir(self.root):
+			return []
+		now = self.clock()
+		with self._lock:
+			active = set(self._active)
+			finished = dict(self._finished)
+		directories = {
+			entry.name: entry.path
+			for entry in os.scandir(self.root)
+			if entry.is_dir() and (entry.name in finished or EXECUTION_ID_PATTERN.match(entry.name))
+		}
+		for execution_id, path in directories.items():
+			if execution_id not in finished and execution_id not in active:
+				stored = read_policy(path)
+				if stored is not None:
+					finished[execution_id] = stored
+		removed = []
+		for execution_id, (finished_at, policy) in finished.items():
+			if (
+				policy == DELETE
+				and execution_id in directories
+				and finished_at + self.retention <= now
+			):
+				self.remove(execution_id)
+				removed.append(execution_id)
+		if self.quota is None:
+			return removed
+
+		sizes = {
+			execution_id: directory_size(path)
+			for execution_id, path in directories.items()
+			if execution_id not in removed
+		}
+		total = sum(sizes.values())
+		evictable = [
+			execution_id
+			for execution_id in sizes
+			if execution_id not in active
+			and finished.get(execution_id, (None, KEEP))[1] != NEVER_DELETE
+		]
+		evictable.sort(
+			key=lambda execution_id: self.last_used(execution_id, directories[execution_id])
+		)
+		for execution_id in evictable:
+			if total <= self.quota:
+				break
+			self.logger.info(f'Quota of working directories exceeded, evicting {execution_id}.')
+			self.remove(execution_id)
+			removed.append(execution_id)
+			total -= sizes[execution_id]
+		if total > self.quota:
+			self.logger.warning(
+				f'Working directories use {total} bytes, more than the quota of {self.quota}.'
+			)
+		return removed
+
+	async def run(self, interval):
+		"""Clean up periodically in a worker thread, off the path of the requests."""
+		while True:
+			await asyncio.sleep(interval)
+			try:
+				await asyncio.to_thread(self.cleanup)
+			except Exception as e:
+				self.logger.error(f'Cleanup of working directories failed: {e!r}')
@@ -0,0 +1,16 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from rest_rce.src.main import create_app
+from rest_rce.src.utils import parse_cli_arguments
+
+
+@pytest.fixture(scope='session')
+def app():
+	"""App of the server, the tests set the tool configuration instead of loading it."""
+	return create_app(parse_cli_arguments(['rest_rce/test/tools/root/configuration.json']))
+
+
+@pytest.fixture
+def client(app):
+	return TestClient(app)
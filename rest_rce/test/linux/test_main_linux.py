@@ -4,18 +4,15 @@ from unittest.mock import patch
 
 import pytest
 import requests
-from fastapi.testclient import TestClient
 from httpx import ASGITransport, AsyncClient
 
-from rest_rce.src.main import app, tool_config
+from rest_rce.src.main import activate_configuration, tool_config
 from rest_rce.src.utils import assert_output_values
 
-client = TestClient(app)
-
 
 @pytest.fixture
 def mock_tool_config():
-	tool_config.update(
+	activate_configuration(
 		{
 			'enableCommandScriptLinux': True,
 			'commandScriptLinux': './poly.sh ${in:x} ${in:n}',
@@ -36,7 +33,7 @@ def mock_tool_config():
 	return tool_config
 
 
-def test_execute_tool_linux(mock_tool_config):
+def test_execute_tool_linux(mock_tool_config, client):
 	"""Test execution of the tool in Ubuntu with a single input."""
 	test_input = {'inputs': {'x': 2, 'n': 4}}
 	output_file_path = 'rest_rce/test/tools/poly//result'
@@ -54,7 +51,7 @@ def test_execute_tool_linux(mock_tool_config):
 	assert_output_values(response, expected_output)
 
 
-def test_execute_tool_linux_connection_error_unresolved(mock_tool_config):
+def test_execute_tool_linux_connection_error_unresolved(mock_tool_config, client):
 	"""Test execution of the tool in Linux, if a connection error cannot be resolved."""
 	test_input = {'inputs': {'x': 2, 'n': 4}}
 
@@ -69,7 +66,7 @@ def test_execute_tool_linux_connection_error_unresolved(mock_tool_config):
 	assert response.status_code == 500
 
 
-def test_execute_tool_linux_connection_error_resolved(mock_tool_config):
+def test_execute_tool_linux_connection_error_resolved(mock_tool_config, client):
 	"""Test execution of the tool in Linux, if a connection error can be resolved."""
 	test_input = {'inputs': {'x': 2, 'n': 4}}
 	output_file_path = 'rest_rce/test/tools/poly//result'
@@ -99,7 +96,7 @@ def test_execute_tool_linux_connection_error_resolved(mock_tool_config):
 
 
 @pytest.mark.asyncio
-async def test_parallel_tool_execution_linux(mock_tool_config):
+async def test_parallel_tool_execution_linux(mock_tool_config, app):
 	"""Test parallel execution of the tool in Ubuntu with different inputs."""
 
 	# Define test inputs and expected outputs
@@ -135,3 +132,20 @@ async def test_parallel_tool_execution_linux(mock_tool_config):
 	# Verify responses
 	for response, expected_output in zip(responses, expected_outputs):
 		assert_output_values(response, expected_output)
+
+
+def test_execute_tool_upload_linux(mock_tool_config, client):
+	"""Test execution of the tool in Ubuntu with an uploaded file input."""
+	activate_configuration(
+		dict(
+			mock_tool_config,
+			commandScriptLinux='cat ${in:data}',
+			inputs=[{'endpointName': 'data', 'endpointDataType': 'FileReference'}],
+			postScript='',
+			preScript='',
+		)
+	)
+	files = [('data', ('data.bin', b'uploaded content'))]
+	response = client.post('/execute-tool/upload/', files=files)
+	assert response.status_code == 200, response.json()
+	assert response.json()['stdout'] == 'uploaded content'
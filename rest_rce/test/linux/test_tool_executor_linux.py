@@ -1,11 +1,22 @@
+import glob
 import json
+import threading
+import time
 from unittest.mock import patch
 
 import pytest
 
-from rest_rce.src.constants import CS_L, ENABLE_CS_L, ENABLE_CS_W, POST_S, POLY_VAlID_JSON_PATH
+from rest_rce.src.constants import (
+	CS_L,
+	ENABLE_CS_L,
+	ENABLE_CS_W,
+	POST_S,
+	SET_AS_WORKING_DIR,
+	POLY_VAlID_JSON_PATH,
+)
 from rest_rce.src.main import request_id_var
-from rest_rce.src.tool_executor import ToolExecutor
+from rest_rce.src.tool_executor import ExecutionCancelledError, ToolExecutor
+from rest_rce.src.tool_spec import ToolSpec
 from rest_rce.src.utils import set_up_logger
 
 
@@ -27,6 +38,27 @@ def mock_tool_executor_timeout_linux(main_logger):
 	)
 
 
+def reconfigure(executor, config, no_shell=False):
+	"""Update the tool configuration of the executor and rebuild its ToolSpec."""
+	executor.tool_config = dict(executor.tool_config, **config)
+	executor.spec = ToolSpec.from_config(executor.tool_config, no_shell=no_shell)
+
+
+def live_processes_in_group(process_group):
+	"""Return the ids of the processes in a process group which are not zombies."""
+	pids = []
+	for stat_path in glob.glob('/proc/[0-9]*/stat'):
+		try:
+			with open(stat_path) as file:
+				stat = file.read()
+		except OSError:
+			continue
+		state, _, pgrp = stat.rsplit(')', 1)[1].split()[:3]
+		if int(pgrp) == process_group and state != 'Z':
+			pids.append(stat_path.split('/')[2])
+	return pids
+
+
 # Test 'execute_tool' method for runs in Ubuntu operating system
 
 # The following cases are tested:
@@ -34,6 +66,10 @@ def mock_tool_executor_timeout_linux(main_logger):
 # - Project directory is found when the tool is executed
 # - Tool times out and raises a TimeoutExpired exception
 # - Tool is executed without a timeout and the execution time is below the timeout value
+# - Cancelled execution kills the command script and skips the post-script
+# - Outputs are extracted from stdout and a result file without a post-script
+# - The command script runs in the directory of the execution if the tool directory is not the
+#   working directory
 
 
 @patch('rest_rce.src.tool_executor.ToolExecutor.execute_python_script')
@@ -52,7 +88,7 @@ def test_execute_tool_no_timeout_linux(mock_script_execution, mock_tool_executor
 def test_execute_tool_missing_project_dir_linux(
 	mock_script_execution, mock_tool_executor_timeout_linux
 ):
-	mock_tool_executor_timeout_linux.tool_config[CS_L] = './poly.sh ${in:x} ${in:n}'
+	reconfigure(mock_tool_executor_timeout_linux, {CS_L: './poly.sh ${in:x} ${in:n}'})
 	with (
 		patch('rest_rce.src.tool_executor.ToolExecutor.find_project_directory', return_value=None),
 		pytest.raises(FileNotFoundError),
@@ -84,3 +120,114 @@ def test_execute_tool_timeout_not_reached_linux(
 	msg = 'Calculating exp\nReceived parameter x=2\nReceived parameter n=2\nResult: 4\n'
 	assert return_code == 0
 	assert stdout == msg
+
+
+@patch('rest_rce.src.tool_executor.ToolExecutor.execute_python_script')
+def test_execute_tool_resource_usage_linux(mock_script_execution, mock_tool_executor_timeout_linux):
+	"""Test if the resource usage of the command script is recorded in Ubuntu."""
+	mock_tool_executor_timeout_linux.timeout = None
+	mock_tool_executor_timeout_linux.inputs = {'x': 2, 'n': 2}
+	mock_tool_executor_timeout_linux.execute_tool()
+	usage = mock_tool_executor_timeout_linux.resource_usage
+	assert usage['wall_seconds'] > 0
+	assert usage['max_rss_kb'] > 0
+	assert usage['user_cpu_seconds'] >= 0
+	assert 'voluntary_context_switches' in usage
+
+
+@patch('rest_rce.src.tool_executor.ToolExecutor.execute_python_script')
+def test_execute_tool_without_shell_linux(mock_script_execution, mock_tool_executor_timeout_linux):
+	"""Test if the command script is executed from a compiled argv template in Ubuntu."""
+	mock_tool_executor_timeout_linux.timeout = None
+	reconfigure(
+		mock_tool_executor_timeout_linux, {CS_L: './poly.sh ${in:x} ${in:n}'}, no_shell=True
+	)
+	return_code, stdout, stderr, tool_directory, command_script, output_vars = (
+		mock_tool_executor_timeout_linux.execute_tool()
+	)
+	assert return_code == 0
+	assert command_script == './poly.sh 2 4'
+	assert stdout.endswith('Result: 16\n')
+
+
+@patch('rest_rce.src.tool_executor.ToolExecutor.execute_python_script')
+def test_execute_tool_cancelled_linux(mock_script_execution, mock_tool_executor_timeout_linux):
+	"""Test if cancelling an execution in Ubuntu kills the process tree of the command script
+	and skips the post-script."""
+	executor = mock_tool_executor_timeout_linux
+	executor.timeout = None
+	reconfigure(executor, {POST_S: '${out:fx} = "${dir:tool}/result"'})
+	errors = []
+
+	def run():
+		try:
+			executor.execute_tool()
+		except ExecutionCancelledError as e:
+			errors.append(e)
+
+	thread = threading.Thread(target=run)
+	started_at = time.monotonic()
+	thread.start()
+	while executor.process is None and thread.is_alive():
+		time.sleep(0.01)
+	time.sleep(0.2)
+	executor.cancel()
+	thread.join(timeout=10)
+	assert not thread.is_alive()
+	assert time.monotonic() - started_at < 10
+	assert len(errors) == 1
+	mock_script_execution.assert_not_called()
+	# No process of the command script is left (killed children may remain as zombies)
+	assert live_processes_in_group(executor.process.pid) == []
+
+
+def test_execute_tool_extract_outputs_linux(mock_tool_executor_timeout_linux):
+	"""Test if outputs declared with an extract spec are extracted in Ubuntu."""
+	executor = mock_tool_executor_timeout_linux
+	executor.timeout = None
+	reconfigure(
+		executor,
+		{
+			CS_L: './poly.sh ${in:x} ${in:n}',
+			'outputs': [
+				{
+					'endpointName': 'result',
+					'endpointDataType': 'Integer',
+					'extract': {'stream': 'stdout', 'regex': r'Result: (\d+)'},
+				},
+				{
+					'endpointName': 'stored',
+					'endpointDataType': 'Float',
+					'extract': {'file': 'result'},
+				},
+				{
+					'endpointName': 'stored_path',
+					'endpointDataType': 'Float',
+					'extract': {'file': '${dir:tool}/result'},
+				},
+			],
+		},
+	)
+	return_code, stdout, stderr, tool_directory, command_script, output_vars = (
+		executor.execute_tool()
+	)
+	assert return_code == 0
+	assert output_vars == {'result': 16, 'stored': 16.0, 'stored_path': 16.0}
+
+
+@patch('rest_rce.src.tool_executor.ToolExecutor.execute_python_script')
+def test_execute_tool_in_execution_directory_linux(
+	mock_script_execution, mock_tool_executor_timeout_linux, tmp_path
+):
+	"""Test if the command script runs in the directory of the execution in Ubuntu if the tool
+	directory is not set as working directory."""
+	executor = mock_tool_executor_timeout_linux
+	executor.timeout = None
+	executor.output_dir = str(tmp_path / 'execution')
+	reconfigure(executor, {CS_L: 'pwd && touch scratch', SET_AS_WORKING_DIR: False})
+	return_code, stdout, stderr, tool_directory, command_script, output_vars = (
+		executor.execute_tool()
+	)
+	assert return_code == 0
+	assert stdout.strip() == executor.output_dir == tool_directory
+	assert (tmp_path / 'execution' / 'scratch').exists()
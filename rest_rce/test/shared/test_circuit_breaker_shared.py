@@ -0,0 +1,90 @@
+from rest_rce.src.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitBreakers
+
+
+class FakeClock:
+	def __init__(self):
+		self.now = 0.0
+
+	def __call__(self):
+		return self.now
+
+
+def open_breaker(clock):
+	breaker = CircuitBreaker(0.5, window=4, min_calls=2, open_seconds=10, clock=clock)
+	for success in (True, True, False, False):
+		assert breaker.acquire() is None
+		breaker.record(success)
+	return breaker
+
+
+# Tests for 'CircuitBreaker'
+
+# The following cases are tested:
+# - The breaker stays closed below the failure rate or the minimal number of calls
+# - The breaker opens at the failure rate and rejects executions with the remaining time
+# - After the open period a single probe is admitted
+# - A successful probe closes the breaker, a failed probe opens it again
+# - A released probe can be admitted again
+# - Breakers are created per tool and only if enabled
+
+
+def test_stays_closed():
+	breaker = CircuitBreaker(0.75, window=4, min_calls=3)
+	breaker.record(False)
+	breaker.record(False)
+	assert breaker.state == CLOSED
+	breaker.record(True)
+	breaker.record(True)
+	breaker.record(True)
+	assert breaker.state == CLOSED
+	assert breaker.summary() == {'state': CLOSED, 'calls': 4, 'failures': 1}
+
+
+def test_opens():
+	clock = FakeClock()
+	breaker = open_breaker(clock)
+	assert breaker.state == OPEN
+	clock.now = 4
+	assert breaker.acquire() == 6
+
+
+def test_half_open_probe():
+	clock = FakeClock()
+	breaker = open_breaker(clock)
+	clock.now = 10
+	assert breaker.acquire() is None
+	assert breaker.state == HALF_OPEN
+	# Only one probe at a time
+	assert breaker.acquire() is not None
+	breaker.record(True)
+	assert breaker.state == CLOSED
+	assert breaker.acquire() is None
+
+
+def test_failed_probe():
+	clock = FakeClock()
+	breaker = open_breaker(clock)
+	clock.now = 10
+	assert breaker.acquire() is None
+	breaker.record(False)
+	assert breaker.state == OPEN
+	assert breaker.acquire() == 10
+
+
+def test_released_probe():
+	clock = FakeClock()
+	breaker = open_breaker(clock)
+	clock.now = 10
+	assert breaker.acquire() is None
+	breaker.release()
+	assert breaker.state == HALF_OPEN
+	assert breaker.acquire() is None
+
+
+def test_circuit_breakers():
+	assert CircuitBreakers().get('Root') is None
+	breakers = CircuitBreakers(0.5, min_calls=1)
+	assert breakers.get('Root') is breakers.get('Root')
+	assert breakers.get('Root') is not breakers.get('Poly')
+	breakers.get('Root').record(False)
+	assert breakers.summary()['Root']['state'] == OPEN
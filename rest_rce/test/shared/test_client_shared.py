@@ -0,0 +1,145 @@
+import threading
+
+import httpx
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+from rest_rce.src.client import AsyncRestRceClient, RestRceClient, ToolExecutionError, retry_delay
+
+
+class FakeAdapter(BaseAdapter):
+	"""Adapter answering requests with the given status codes, then with 200 and the inputs."""
+
+	def __init__(self, status_codes=()):
+		super().__init__()
+		self.status_codes = list(status_codes)
+		self.requests = []
+		self.lock = threading.Lock()
+
+	def send(self, request, **kwargs):
+		with self.lock:
+			self.requests.append(request)
+			status_code = self.status_codes.pop(0) if self.status_codes else 200
+		response = requests.Response()
+		response.status_code = status_code
+		response.headers['Retry-After'] = '0'
+		response._content = request.body if status_code == 200 else b'{"detail": "busy"}'
+		response.request = request
+		return response
+
+	def close(self):
+		pass
+
+
+def sync_client(status_codes=(), **options):
+	adapter = FakeAdapter(status_codes)
+	session = requests.Session()
+	session.mount('http://', adapter)
+	return RestRceClient('http://rce/', session=session, **options), adapter
+
+
+def async_client(status_codes=(), **options):
+	status_codes = list(status_codes)
+	sent = []
+
+	def handler(request):
+		sent.append(request)
+		if status_codes:
+			return httpx.Response(
+				status_codes.pop(0), json={'detail': 'busy'}, headers={'Retry-After': '0'}
+			)
+		return httpx.Response(200, content=request.content)
+
+	client = AsyncRestRceClient('http://rce/', transport=httpx.MockTransport(handler), **options)
+	return client, sent
+
+
+# Tests for 'retry_delay'
+
+# The following cases are tested:
+# - Retry-After in seconds is honoured and capped
+# - Without Retry-After the delay grows exponentially and is capped
+
+
+def test_retry_delay_retry_after():
+	assert retry_delay({'Retry-After': '3'}, 0, 0.5, 30.0) == 3.0
+	assert retry_delay({'Retry-After': '300'}, 0, 0.5, 30.0) == 30.0
+
+
+def test_retry_delay_backoff():
+	assert 0 <= retry_delay({}, 2, 0.5, 30.0) <= 2.0
+	assert 0 <= retry_delay({}, 20, 0.5, 30.0) <= 30.0
+
+
+# Tests for 'RestRceClient'
+
+# The following cases are tested:
+# - An execution returns the response body
+# - A 429 answer is repeated until the execution is admitted
+# - The error of the last attempt is raised once the retries are used up
+# - execute_many yields all results, errors are yielded with 'return_exceptions'
+
+
+def test_execute():
+	client, adapter = sync_client()
+	with client:
+		assert client.execute({'x': 2}, idempotency_key='key') == {'inputs': {'x': 2}}
+	assert adapter.requests[0].url == 'http://rce/execute-tool/'
+	assert adapter.requests[0].headers['Idempotency-Key'] == 'key'
+
+
+def test_execute_retry_busy():
+	client, adapter = sync_client([429, 503])
+	with client:
+		assert client.execute({'x': 2}) == {'inputs': {'x': 2}}
+	assert len(adapter.requests) == 3
+
+
+def test_execute_retries_exhausted():
+	client, adapter = sync_client([429] * 3, max_retries=2)
+	with client, pytest.raises(ToolExecutionError) as exc_info:
+		client.execute({'x': 2})
+	assert exc_info.value.status_code == 429
+	assert exc_info.value.detail == 'busy'
+	assert len(adapter.requests) == 3
+
+
+def test_execute_many():
+	client, _ = sync_client([500], max_concurrency=2)
+	inputs = ({'x': i} for i in range(5))
+	with client:
+		results = dict(client.execute_many(inputs, return_exceptions=True))
+	assert sorted(results) == [0, 1, 2, 3, 4]
+	errors = [result for result in results.values() if isinstance(result, ToolExecutionError)]
+	assert len(errors) == 1
+	assert {'inputs': {'x': 4}} in results.values()
+
+
+# Tests for 'AsyncRestRceClient'
+
+# The following cases are tested:
+# - A 429 answer is repeated until the execution is admitted
+# - execute_many yields all results and raises errors by default
+
+
+@pytest.mark.asyncio
+async def test_async_execute_retry_busy():
+	client, sent = async_client([429])
+	async with client:
+		assert await client.execute({'x': 2}) == {'inputs': {'x': 2}}
+	assert len(sent) == 2
+
+
+@pytest.mark.asyncio
+async def test_async_execute_many():
+	client, _ = async_client(max_concurrency=2)
+	async with client:
+		results = {index: result async for index, result in client.execute_many([{'x': 1}] * 3)}
+	assert results == {i: {'inputs': {'x': 1}} for i in range(3)}
+
+	client, _ = async_client([500], max_concurrency=2)
+	async with client:
+		with pytest.raises(ToolExecutionError):
+			async for _ in client.execute_many([{'x': 1}] * 3):
+				pass
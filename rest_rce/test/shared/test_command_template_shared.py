@@ -0,0 +1,58 @@
+import pytest
+
+from rest_rce.src.command_template import CommandTemplate, format_value
+
+# Tests for 'CommandTemplate'
+
+# The following cases are tested:
+# - Placeholders are substituted per argument without shell quoting
+# - List inputs forming a whole argument are expanded into several arguments
+# - Values are formatted according to their type
+# - Command scripts using shell syntax are rejected
+# - Quoted shell operators are accepted as literal arguments
+
+
+def test_render_arguments():
+	"""Test if input values are substituted into their arguments."""
+	template = CommandTemplate('./poly.sh ${in:x} --n=${in:n}', posix=True)
+	assert template.input_names == {'x', 'n'}
+	assert template.render({'x': 2, 'n': 4}) == ['./poly.sh', '2', '--n=4']
+
+
+def test_render_value_with_spaces():
+	"""Test if values containing spaces or shell characters stay a single argument."""
+	template = CommandTemplate('tool ${in:name}', posix=True)
+	argv = template.render({'name': 'a b; rm -rf /'})
+	assert argv == ['tool', 'a b; rm -rf /']
+	assert template.join(argv) == "tool 'a b; rm -rf /'"
+
+
+def test_render_list_expansion():
+	"""Test if a list input forming a whole argument is expanded into several arguments."""
+	template = CommandTemplate('tool ${in:values} --list=${in:values}', posix=True)
+	assert template.render({'values': [1, 2]}) == ['tool', '1', '2', '--list=[1, 2]']
+
+
+@pytest.mark.parametrize(
+	'value, expected',
+	[(True, 'true'), (2.5, '2.5'), (3, '3'), ({'a': 1}, '{"a": 1}'), ('text', 'text')],
+	ids=['boolean', 'float', 'integer', 'map', 'string'],
+)
+def test_format_value(value, expected):
+	assert format_value(value) == expected
+
+
+@pytest.mark.parametrize(
+	'command_script',
+	['tool ${in:x} | tee log', 'tool > out.txt', 'a && b', 'tool $(date)', 'tool `date`', ''],
+	ids=['pipe', 'redirection', 'and', 'substitution', 'backticks', 'empty'],
+)
+def test_shell_syntax_rejected(command_script):
+	with pytest.raises(ValueError):
+		CommandTemplate(command_script, posix=True)
+
+
+def test_quoted_operator_accepted():
+	"""Test if shell operators inside quotes are treated as literal arguments."""
+	template = CommandTemplate("tool 'a|b'", posix=True)
+	assert template.render({}) == ['tool', 'a|b']
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from rest_rce.src.concurrency_limit import ConcurrencyLimit, ConcurrencyLimits
+
+# Tests for 'ConcurrencyLimit'
+
+# The following cases are tested:
+# - Executions beyond the limit wait and are started in FIFO order
+# - No execution waits without a limit
+# - Raising the limit starts waiting executions
+# - A cancelled waiting execution gives up its place in the queue
+
+
+async def acquire_all(limit, count):
+	"""Start 'count' acquisitions and return their tasks once they had the chance to run."""
+	tasks = [asyncio.ensure_future(limit.acquire()) for _ in range(count)]
+	await asyncio.sleep(0)
+	return tasks
+
+
+@pytest.mark.asyncio
+async def test_fifo():
+	limit = ConcurrencyLimit(1)
+	first, second, third = await acquire_all(limit, 3)
+	assert first.done() and not second.done() and not third.done()
+	assert limit.summary() == {'limit': 1, 'running': 1, 'queued': 2}
+	assert limit.is_full()
+
+	limit.release()
+	await asyncio.sleep(0)
+	assert second.done() and not third.done()
+	limit.release()
+	await asyncio.sleep(0)
+	assert third.done()
+	limit.release()
+	assert limit.summary() == {'limit': 1, 'running': 0, 'queued': 0}
+
+
+@pytest.mark.asyncio
+async def test_unlimited():
+	limit = ConcurrencyLimit()
+	tasks = await acquire_all(limit, 5)
+	assert all(task.done() for task in tasks)
+	assert not limit.is_full()
+
+
+@pytest.mark.asyncio
+async def test_set_limit():
+	limit = ConcurrencyLimit(1)
+	tasks = await acquire_all(limit, 3)
+	limit.set_limit(3)
+	await asyncio.sleep(0)
+	assert all(task.done() for task in tasks)
+	assert limit.active == 3
+
+
+@pytest.mark.asyncio
+async def test_cancel_waiting():
+	limit = ConcurrencyLimit(1)
+	first, second, third = await acquire_all(limit, 3)
+	second.cancel()
+	await asyncio.sleep(0)
+	assert limit.waiting == 1
+	limit.release()
+	await asyncio.sleep(0)
+	assert third.done() and not third.cancelled()
+	assert limit.active == 1
+
+
+# Tests for 'ConcurrencyLimits'
+
+# The following cases are tested:
+# - One limit is kept per tool and updated to the limit of the current configuration
+
+
+def test_limits_per_tool():
+	limits = ConcurrencyLimits()
+	limit = limits.get('root', 2)
+	assert limits.get('root', 2) is limit
+	assert limits.get('poly', None) is not limit
+	assert limits.get('root', 4).limit == 4
+	assert limits.summary()['root'] == {'limit': 4, 'running': 0, 'queued': 0}
@@ -0,0 +1,59 @@
+import os
+from unittest.mock import MagicMock
+
+import pytest
+
+from rest_rce.src.config_watcher import ConfigWatcher
+
+
+@pytest.fixture
+def config_file(tmp_path):
+	path = tmp_path / 'configuration.json'
+	path.write_text('{"toolName": "Root"}')
+	return path
+
+
+def touch(path, content):
+	"""Write new content and move the modification time forward to make the change visible."""
+	stat_result = os.stat(path)
+	path.write_text(content)
+	os.utime(path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns + 1_000_000_000))
+
+
+# Tests for 'ConfigWatcher'
+
+# The following cases are tested:
+# - An unchanged file is not reloaded
+# - A changed file is loaded and activated
+# - A configuration failing to load is not activated
+
+
+@pytest.mark.asyncio
+async def test_check_unchanged(config_file):
+	load, activate = MagicMock(), MagicMock()
+	watcher = ConfigWatcher(config_file, 1, load, activate, MagicMock())
+	assert await watcher.check() is False
+	load.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_check_changed(config_file):
+	load = MagicMock(return_value=({'toolName': 'Poly'}, None))
+	activate = MagicMock()
+	watcher = ConfigWatcher(config_file, 1, load, activate, MagicMock())
+	touch(config_file, '{"toolName": "Poly"}')
+	assert await watcher.check() is True
+	activate.assert_called_once_with({'toolName': 'Poly'}, None)
+	# The same change is only reloaded once
+	assert await watcher.check() is False
+
+
+@pytest.mark.asyncio
+async def test_check_invalid(config_file):
+	load = MagicMock(side_effect=ValueError('Invalid JSON syntax'))
+	activate, logger = MagicMock(), MagicMock()
+	watcher = ConfigWatcher(config_file, 1, load, activate, logger)
+	touch(config_file, '{"toolName": ')
+	assert await watcher.check() is False
+	activate.assert_not_called()
+	assert 'keeping the active one' in logger.error.call_args[0][0]
@@ -0,0 +1,123 @@
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+
+from rest_rce.src.coordinator import Coordinator
+
+
+def backend_transport(loads, answers, forwarded):
+	"""Mock transport for backends with the given loads and answers of '/execute-tool/'."""
+
+	def handler(request):
+		backend = f'{request.url.scheme}://{request.url.host}'
+		if backend not in loads:
+			raise httpx.ConnectError('unreachable', request=request)
+		if request.url.path == '/load/':
+			return httpx.Response(200, json=loads[backend])
+		forwarded.append(backend)
+		answer = answers.get(backend, 200)
+		if isinstance(answer, type) and issubclass(answer, Exception):
+			raise answer('failed', request=request)
+		return httpx.Response(answer, json={'backend': backend})
+
+	return httpx.MockTransport(handler)
+
+
+def load(running, limit=10, queued=0, draining=False):
+	return {'running': running, 'queued': queued, 'request_limit': limit, 'draining': draining}
+
+
+# Tests for 'Coordinator'
+
+# The following cases are tested:
+# - Backends are ranked by the share of their request limit in use
+# - Unreachable and draining backends are skipped
+# - A request is forwarded to the least loaded backend
+# - A busy backend (429) is skipped and the next one tried
+# - The last busy answer is returned if all backends are busy
+# - A backend refusing the connection is skipped, one failing after the request was sent is not
+
+
+@pytest.mark.asyncio
+async def test_ranked_backends():
+	loads = {'http://a': load(5), 'http://b': load(1, queued=1), 'http://c': load(1, limit=1)}
+	coordinator = Coordinator(
+		['http://a', 'http://b', 'http://c'],
+		MagicMock(),
+		transport=backend_transport(loads, {}, []),
+	)
+	assert await coordinator.ranked_backends() == ['http://b', 'http://a', 'http://c']
+	await coordinator.close()
+
+
+@pytest.mark.asyncio
+async def test_ranked_backends_unavailable():
+	loads = {'http://a': load(5), 'http://c': load(0, draining=True)}
+	coordinator = Coordinator(
+		['http://a', 'http://b', 'http://c'],
+		MagicMock(),
+		transport=backend_transport(loads, {}, []),
+	)
+	assert await coordinator.ranked_backends() == ['http://a']
+	await coordinator.close()
+
+
+@pytest.mark.asyncio
+async def test_forward():
+	forwarded = []
+	loads = {'http://a': load(5), 'http://b': load(1)}
+	coordinator = Coordinator(
+		['http://a', 'http://b'], MagicMock(), transport=backend_transport(loads, {}, forwarded)
+	)
+	response, backend = await coordinator.forward('/execute-tool/', {'inputs': {}})
+	assert response.status_code == 200
+	assert backend == 'http://b'
+	assert forwarded == ['http://b']
+	await coordinator.close()
+
+
+@pytest.mark.asyncio
+async def test_forward_busy():
+	forwarded = []
+	loads = {'http://a': load(5), 'http://b': load(1)}
+	transport = backend_transport(loads, {'http://b': 429}, forwarded)
+	coordinator = Coordinator(['http://a', 'http://b'], MagicMock(), transport=transport)
+	response, backend = await coordinator.forward('/execute-tool/', {'inputs': {}})
+	assert response.status_code == 200
+	assert backend == 'http://a'
+	assert forwarded == ['http://b', 'http://a']
+	await coordinator.close()
+
+
+@pytest.mark.asyncio
+async def test_forward_all_busy():
+	loads = {'http://a': load(5), 'http://b': load(1)}
+	transport = backend_transport(loads, {'http://a': 429, 'http://b': 429}, [])
+	coordinator = Coordinator(['http://a', 'http://b'], MagicMock(), transport=transport)
+	response, backend = await coordinator.forward('/execute-tool/', {'inputs': {}})
+	assert response.status_code == 429
+	assert backend == 'http://a'
+	await coordinator.close()
+
+
+@pytest.mark.asyncio
+async def test_forward_failed():
+	forwarded = []
+	loads = {'http://a': load(5), 'http://b': load(1)}
+	transport = backend_transport(loads, {'http://b': httpx.ConnectError}, forwarded)
+	coordinator = Coordinator(['http://a', 'http://b'], MagicMock(), transport=transport)
+	response, backend = await coordinator.forward('/execute-tool/', {'inputs': {}})
+	assert response.status_code == 200
+	assert backend == 'http://a'
+	assert forwarded == ['http://b', 'http://a']
+	await coordinator.close()
+
+	forwarded.clear()
+	transport = backend_transport(loads, {'http://b': httpx.ReadTimeout}, forwarded)
+	coordinator = Coordinator(['http://a', 'http://b'], MagicMock(), transport=transport)
+	response, backend = await coordinator.forward('/execute-tool/', {'inputs': {}})
+	assert response is None
+	assert backend == 'http://b'
+	assert forwarded == ['http://b']
+	await coordinator.close()
@@ -0,0 +1,97 @@
+import subprocess
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from rest_rce.src.dependency_resolver import (
+	find_missing_modules,
+	find_script_imports,
+	resolve_dependencies,
+	tool_environment_dir,
+)
+
+
+@pytest.fixture
+def tool_config():
+	return {
+		'toolName': 'Root',
+		'preScript': 'import json\r\nimport ThisIsNotARealModule.sub as sub',
+		'postScript': 'from yaml import safe_load\r\n${out:root} = float("${dir:tool}")',
+	}
+
+
+@pytest.fixture(autouse=True)
+def restore_sys_path():
+	sys_path = list(sys.path)
+	yield
+	sys.path[:] = sys_path
+
+
+# Tests for the import analysis
+
+# The following cases are tested:
+# - Imports are found in scripts with placeholders
+# - Relative imports are ignored
+# - Standard library and installed modules are not reported as missing
+
+
+def test_find_script_imports(tool_config):
+	"""Test if the top-level modules of all import statements are found."""
+	assert find_script_imports(tool_config['preScript']) == {'json', 'ThisIsNotARealModule'}
+	assert find_script_imports(tool_config['postScript']) == {'yaml'}
+
+
+def test_find_script_imports_relative():
+	"""Test if relative imports are not treated as dependencies."""
+	assert find_script_imports('from . import helper\nimport os.path') == {'os'}
+
+
+def test_find_missing_modules():
+	"""Test if only modules that cannot be imported are reported."""
+	assert find_missing_modules({'json', 'pytest', 'ThisIsNotARealModule'}) == [
+		'ThisIsNotARealModule'
+	]
+
+
+# Tests for 'resolve_dependencies'
+
+# The following cases are tested:
+# - Missing modules are installed once into the tool environment
+# - Nothing is installed if all modules are available
+# - A failed installation raises a RuntimeError
+# - A script with invalid syntax raises a ValueError
+
+
+@patch('rest_rce.src.dependency_resolver.find_missing_modules')
+@patch('subprocess.run')
+def test_resolve_dependencies_installs(mock_run, mock_missing, tool_config, tmp_path):
+	"""Test if missing modules are installed into the cached environment of the tool."""
+	mock_missing.side_effect = [['ThisIsNotARealModule', 'yaml'], []]
+	env_dir = resolve_dependencies(tool_config, str(tmp_path), MagicMock())
+	assert env_dir == tool_environment_dir(str(tmp_path), 'Root')
+	assert env_dir in sys.path
+	command = mock_run.call_args[0][0]
+	assert command[-4:] == ['--target', env_dir, 'ThisIsNotARealModule', 'PyYAML']
+
+
+@patch('subprocess.run')
+def test_resolve_dependencies_available(mock_run, tmp_path):
+	"""Test if nothing is installed if all dependencies are available."""
+	tool_config = {'toolName': 'Root', 'preScript': 'import json', 'postScript': ''}
+	resolve_dependencies(tool_config, str(tmp_path), MagicMock())
+	mock_run.assert_not_called()
+
+
+@patch('subprocess.run', side_effect=subprocess.CalledProcessError(1, 'pip'))
+def test_resolve_dependencies_failed(mock_run, tool_config, tmp_path):
+	"""Test if a failed installation raises a RuntimeError at startup."""
+	with pytest.raises(RuntimeError, match='Failed to install dependencies'):
+		resolve_dependencies(tool_config, str(tmp_path), MagicMock())
+
+
+def test_resolve_dependencies_syntax_error(tmp_path):
+	"""Test if a script with invalid syntax raises a ValueError."""
+	tool_config = {'toolName': 'Root', 'preScript': 'import (', 'postScript': ''}
+	with pytest.raises(ValueError, match='Invalid Python syntax in preScript'):
+		resolve_dependencies(tool_config, str(tmp_path), MagicMock())
@@ -0,0 +1,109 @@
+import io
+import tarfile
+
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from rest_rce.src.downloads import directory_etag, download_response, iter_directory_archive
+
+app = FastAPI()
+
+
+@app.get('/download')
+def download(path: str, datatype: str, request: Request):
+	return download_response(request, path, datatype)
+
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def result_file(tmp_path):
+	path = tmp_path / 'result'
+	path.write_bytes(b'0123456789')
+	return path
+
+
+@pytest.fixture
+def result_dir(tmp_path):
+	directory = tmp_path / 'results'
+	(directory / 'sub').mkdir(parents=True)
+	(directory / 'a.txt').write_text('a')
+	(directory / 'sub' / 'b.txt').write_text('b' * 100000)
+	return directory
+
+
+# Tests for file downloads
+
+# The following cases are tested:
+# - A file is downloaded completely
+# - A byte range of a file is downloaded
+# - A matching If-None-Match header results in 304
+# - A missing file results in 404
+
+
+def test_download_file(result_file):
+	"""Test if a file output is downloaded with an ETag."""
+	response = client.get('/download', params={'path': result_file, 'datatype': 'filereference'})
+	assert response.status_code == 200
+	assert response.content == b'0123456789'
+	assert 'etag' in response.headers
+
+
+def test_download_file_range(result_file):
+	"""Test if a byte range of a file output can be requested."""
+	response = client.get(
+		'/download',
+		params={'path': result_file, 'datatype': 'filereference'},
+		headers={'Range': 'bytes=2-5'},
+	)
+	assert response.status_code == 206
+	assert response.content == b'2345'
+
+
+def test_download_file_not_modified(result_file):
+	"""Test if a conditional request with the current ETag is answered with 304."""
+	params = {'path': result_file, 'datatype': 'filereference'}
+	etag = client.get('/download', params=params).headers['etag']
+	response = client.get('/download', params=params, headers={'If-None-Match': etag})
+	assert response.status_code == 304
+
+
+def test_download_file_missing(tmp_path):
+	"""Test if a missing output results in a 404 response."""
+	params = {'path': tmp_path / 'missing', 'datatype': 'filereference'}
+	assert client.get('/download', params=params).status_code == 404
+
+
+# Tests for directory downloads
+
+# The following cases are tested:
+# - A directory is streamed as gzip compressed tar archive
+# - The ETag of a directory changes if a file in it changes
+
+
+def test_download_directory(result_dir):
+	"""Test if a directory output is streamed as compressed tar archive."""
+	response = client.get('/download', params={'path': result_dir, 'datatype': 'directory'})
+	assert response.status_code == 200
+	assert response.headers['content-type'] == 'application/gzip'
+	with tarfile.open(fileobj=io.BytesIO(response.content), mode='r:gz') as archive:
+		names = archive.getnames()
+		assert archive.extractfile('results/sub/b.txt').read() == b'b' * 100000
+	assert 'results/a.txt' in names
+
+
+def test_directory_etag_changes(result_dir):
+	"""Test if the ETag of a directory changes with its content."""
+	etag = directory_etag(result_dir)
+	assert directory_etag(result_dir) == etag
+	(result_dir / 'a.txt').write_text('changed')
+	assert directory_etag(result_dir) != etag
+
+
+def test_iter_directory_archive_closed_early(result_dir):
+	"""Test if the archive writer stops when the consumer closes the stream early."""
+	chunks = iter_directory_archive(result_dir)
+	next(chunks)
+	chunks.close()
@@ -0,0 +1,118 @@
+import datetime
+import sqlite3
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from rest_rce.src.execution_store import ExecutionStore
+
+START = datetime.datetime(2025, 1, 1, 12, 0, 0)
+
+
+@pytest.fixture
+def store():
+	store = ExecutionStore()
+	for i in range(10):
+		store.insert(
+			f'task{i}',
+			{
+				'status': 'failed' if i % 3 == 0 else 'completed',
+				'tool': 'Root' if i < 5 else 'Poly',
+				'started_at': START + datetime.timedelta(minutes=i),
+				'inputs': {'x': i},
+			},
+		)
+	yield store
+	store.close()
+
+
+def ids(records):
+	return [record['execution_id'] for record in records]
+
+
+# Tests for 'ExecutionStore'
+
+# The following cases are tested:
+# - Executions are returned newest first
+# - Filtering by status, tool, time window and input range
+# - Cursor pagination returns every execution exactly once
+# - Updating an execution replaces its record
+# - A new execution with a taken ID is rejected
+# - The record of a single execution is returned
+# - Invalid cursors and input names are rejected
+# - Updates failing to be written are logged and do not stop later updates
+
+
+def test_query_newest_first(store):
+	records, next_cursor = store.query()
+	assert ids(records) == [f'task{i}' for i in range(9, -1, -1)]
+	assert next_cursor is None
+
+
+def test_query_filters(store):
+	records, _ = store.query(status='failed', tool='Root')
+	assert ids(records) == ['task3', 'task0']
+	since, until = START + datetime.timedelta(minutes=2), START + datetime.timedelta(minutes=4)
+	records, _ = store.query(since=since, until=until)
+	assert ids(records) == ['task3', 'task2']
+	records, _ = store.query(input_name='x', input_min=7, input_max=8)
+	assert ids(records) == ['task8', 'task7']
+
+
+def test_query_pagination(store):
+	seen, cursor = [], None
+	while True:
+		records, cursor = store.query(limit=3, cursor=cursor)
+		seen.extend(ids(records))
+		if cursor is None:
+			break
+	assert seen == [f'task{i}' for i in range(9, -1, -1)]
+
+
+def test_record_update(store):
+	store.record('task0', {'status': 'cancelled', 'tool': 'Root', 'started_at': START})
+	records, _ = store.query(status='cancelled')
+	assert ids(records) == ['task0']
+	assert store.query(status='failed', tool='Root')[0][0]['execution_id'] == 'task3'
+
+
+def test_insert_taken_id(store):
+	store.insert('new', {'status': 'running', 'tool': 'Root', 'started_at': START})
+	with pytest.raises(sqlite3.IntegrityError):
+		store.insert('task0', {'status': 'running', 'tool': 'Root', 'started_at': START})
+	records, _ = store.query(tool='Root', status='failed')
+	assert ids(records) == ['task3', 'task0']
+	assert ids(store.query(status='running')[0]) == ['new']
+
+
+def test_query_invalid_arguments(store):
+	with pytest.raises(ValueError, match='Invalid cursor'):
+		store.query(cursor='not-a-cursor')
+	with pytest.raises(ValueError, match='Invalid input name'):
+		store.query(input_name='x") OR 1=1 --')
+
+
+def test_get(store):
+	store.record(
+		'task1', {'status': 'completed', 'tool': 'Root', 'started_at': START, 'stdout': 'ok'}
+	)
+	assert store.get('task1')['stdout'] == 'ok'
+	assert store.get('unknown') is None
+
+
+def test_record_write_error(store):
+	store.logger = MagicMock()
+	store._connection.execute(
+		"CREATE TRIGGER fail BEFORE INSERT ON executions WHEN NEW.status = 'broken' "
+		"BEGIN SELECT RAISE(ABORT, 'disk full'); END"
+	)
+	store.record('task1', {'status': 'broken', 'started_at': START})
+	flush = threading.Thread(target=store.flush)
+	flush.start()
+	flush.join(timeout=5)
+	assert not flush.is_alive()
+	store.logger.error.assert_called_once()
+
+	store.record('task1', {'status': 'running', 'started_at': START})
+	assert store.get('task1')['status'] == 'running'
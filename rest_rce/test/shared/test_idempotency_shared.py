@@ -0,0 +1,73 @@
+import pytest
+
+from rest_rce.src.idempotency import IdempotencyStore
+
+
+class FakeClock:
+	def __init__(self):
+		self.now = 0.0
+
+	def __call__(self):
+		return self.now
+
+
+# Tests for 'IdempotencyStore'
+
+# The following cases are tested:
+# - A stored key returns its task
+# - Reusing a key for a different request raises a ValueError
+# - Entries expire after the TTL
+# - Discarded keys can be used again
+# - The task of a completed execution is replaced by its ID
+# - The oldest keys are evicted above the maximal number of entries
+
+
+def test_get_stored():
+	store = IdempotencyStore()
+	assert store.get('key', 'request') is None
+	store.put('key', 'request', 'task')
+	assert store.get('key', 'request') == 'task'
+
+
+def test_get_different_request():
+	store = IdempotencyStore()
+	store.put('key', 'request', 'task')
+	with pytest.raises(ValueError, match='different inputs'):
+		store.get('key', 'other request')
+
+
+def test_expired():
+	clock = FakeClock()
+	store = IdempotencyStore(ttl=10, clock=clock)
+	store.put('old', 'request', 'task')
+	clock.now = 5
+	store.put('new', 'request', 'task')
+	clock.now = 10
+	assert store.get('old', 'request') is None
+	assert store.get('new', 'request') == 'task'
+	assert len(store) == 1
+
+
+def test_discard():
+	store = IdempotencyStore()
+	store.put('key', 'request', 'task')
+	store.discard('key')
+	assert store.get('key', 'other request') is None
+
+
+def test_finish():
+	store = IdempotencyStore()
+	store.put('key', 'request', 'task')
+	store.finish('key', 'execution')
+	store.finish('unknown', 'execution')
+	assert store.get('key', 'request') == 'execution'
+	assert len(store) == 1
+
+
+def test_max_entries():
+	store = IdempotencyStore(max_entries=2)
+	for key in ('a', 'b', 'c'):
+		store.put(key, 'request', 'task')
+	assert store.get('a', 'request') is None
+	assert store.get('c', 'request') == 'task'
+	assert len(store) == 2
@@ -333,3 +333,17 @@ def test_windows_validate_essential_fields_command_script_missing_error(
 	with pytest.raises(HTTPException, match=message_l), patch('os.name', 'posix'):
 		del json_essential_fields[CS_L]
 		root_json_handler.validate_essential_fields(json_essential_fields)
+
+
+# Test 'load'
+@patch('rest_rce.src.json_handler.JsonHandler.validate_essential_fields', return_value=None)
+@patch('rest_rce.src.json_handler.JsonHandler.validate_schema', return_value=None)
+def test_load_reads_file_once(mock_validate_schema, mock_validate_fields, root_json_handler):
+	"""Tests 'load' method of class JSONHandler, if the file is parsed only once and the parsed
+	data is validated and returned."""
+	with patch.object(JsonHandler, 'read_file', wraps=root_json_handler.read_file) as read_file:
+		json_data = root_json_handler.load()
+	read_file.assert_called_once()
+	mock_validate_schema.assert_called_once_with(json_data)
+	mock_validate_fields.assert_called_once_with(json_data)
+	assert json_data['toolName']
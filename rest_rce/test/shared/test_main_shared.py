@@ -1,25 +1,40 @@
+import asyncio
+import datetime
+import json
+import os
+import time
 from unittest.mock import patch
 
+import httpx
 import pytest
-from fastapi.testclient import TestClient
-
-from rest_rce.src.main import app, execution_status, tool_config
+from httpx import ASGITransport, AsyncClient
+
+from rest_rce.src import main
+from rest_rce.src.circuit_breaker import CircuitBreakers
+from rest_rce.src.coordinator import Coordinator
+from rest_rce.src.main import (
+	IN_PROGRESS_STATUSES,
+	activate_configuration,
+	execution_status,
+	finish_execution,
+	running_executors,
+	start_execution,
+	status_counts,
+	tool_config,
+	update_execution,
+)
+from rest_rce.src.profiling import Profiler
+from rest_rce.src.retry_policy import RetryPolicy
+from rest_rce.src.single_flight import SingleFlight, request_key
+from rest_rce.src.tool_executor import ToolExecutor
+from rest_rce.src.tracing import Tracer
 from rest_rce.src.utils import run_parse_arguments
-
-client = TestClient(app)
-request_limit = 10
-
-
-@pytest.fixture
-def mock_get_running_processes():
-	"""Fixture to mock get_running_processes function."""
-	with patch('rest_rce.src.main.get_running_processes') as mock_func:
-		yield mock_func
+from rest_rce.src.working_directories import DELETE
 
 
 @pytest.fixture
 def mock_tool_config():
-	tool_config.update(
+	activate_configuration(
 		{
 			'enableCommandScriptWindows': True,
 			'commandScriptWindows': 'root.exe ${in:x}',
@@ -34,14 +49,20 @@ def mock_tool_config():
 
 @pytest.fixture
 def mock_execution_status():
-	execution_status.update(
+	with patch.dict(
+		execution_status,
 		{
 			'task1': {'status': 'running', 'started_at': '2021-09-01T12:00:00'},
-			'task2': {'status': 'completed', 'started_at': '2021-09-01T12:01:00'},
+			'task2': {'status': 'queued', 'started_at': '2021-09-01T12:01:00'},
 			'task3': {'status': 'running', 'started_at': '2021-09-01T12:02:00'},
-		}
-	)
-	return execution_status
+		},
+	):
+		yield execution_status
+
+
+def in_progress_count():
+	"""Number of executions in progress, as counted towards the request limit."""
+	return sum(status_counts[status] for status in IN_PROGRESS_STATUSES)
 
 
 # Tests for parse_arguments
@@ -121,14 +142,14 @@ def test_missing_required_argument(monkeypatch):
 # - POST request to execute-tool endpoint with request limit exceeded
 
 
-def test_read_root(mock_tool_config):
+def test_read_root(mock_tool_config, client):
 	"""Test the basic get method."""
 	response = client.get('/')
 	assert response.status_code == 200
 	assert response.json()['message'] == 'API is running. Tool configuration loaded.'
 
 
-def test_get_running_processes(mock_execution_status):
+def test_get_running_processes(mock_execution_status, client):
 	"""Test if the running processes are returned correctly."""
 	expected_response = [
 		['task1', {'status': 'running', 'started_at': '2021-09-01T12:00:00'}],
@@ -139,22 +160,515 @@ def test_get_running_processes(mock_execution_status):
 	assert response.json() == expected_response
 
 
-def test_execute_tool_exceeds_limit(mock_get_running_processes):
+def test_execute_tool_exceeds_limit(client):
 	"""Test if execute_tool denies requests when request limit is reached."""
-	mock_get_running_processes.return_value = [
-		'task1',
-		'task2',
-		'task3',
-		'task4',
-		'task5',
-		'task6',
-		'task7',
-		'task8',
-		'task9',
-		'task10',
-	]
-	global request_limit
-	request_limit = 3
-	response = client.post('/execute-tool/', json={'inputs': {'x': 4}})
+	with (
+		patch('rest_rce.src.main.request_limit', 3),
+		patch.dict(status_counts, {'running': 10}),
+	):
+		response = client.post('/execute-tool/', json={'inputs': {'x': 4}})
 	assert response.status_code == 429
 	assert response.json()['detail'] == 'Request limit reached.'
+
+
+def test_get_metrics(client):
+	"""Test if the aggregated resource usage is returned by the metrics endpoint."""
+	response = client.get('/metrics/')
+	assert response.status_code == 200
+	assert 'resource_usage' in response.json()
+
+
+def test_get_captured_output(mock_tool_config, tmp_path, client):
+	"""Test if the full captured stdout of an execution is returned from its spill file."""
+	stdout_path = tmp_path / 'stdout.log'
+	stdout_path.write_text('full output')
+	start_execution('task4', {})
+	finish_execution(
+		'task4',
+		'completed',
+		captured_output={'stdout': {'bytes': 11, 'truncated': False, 'path': str(stdout_path)}},
+	)
+	response = client.get('/executions/task4/stdout')
+	assert response.status_code == 200
+	assert response.text == 'full output'
+	assert client.get('/executions/task4/stderr').status_code == 404
+	assert client.get('/executions/unknown/stdout').status_code == 404
+
+
+def test_download_output(mock_tool_config, tmp_path, client):
+	"""Test if a file output of an execution can be downloaded."""
+	result_path = tmp_path / 'result'
+	result_path.write_text('2.0')
+	outputs = [{'endpointName': 'fx', 'endpointDataType': 'FileReference'}]
+	activate_configuration(dict(mock_tool_config, outputs=outputs))
+	start_execution('task5', {})
+	finish_execution('task5', 'completed', output_variables={'fx': str(result_path)})
+	response = client.get('/executions/task5/outputs/fx')
+	assert response.status_code == 200
+	assert response.text == '2.0'
+	assert client.get('/executions/task5/outputs/unknown').status_code == 404
+
+
+def test_execute_tool_upload_invalid_input(mock_tool_config, client):
+	"""Test if uploading a file for an input that is no file input fails the execution."""
+	response = client.post('/execute-tool/upload/', files=[('x', ('x.txt', b'4'))])
+	assert response.status_code == 422
+	assert 'no file or directory input' in response.json()['detail']
+
+
+def test_execute_tool_upload_malformed_body(mock_tool_config, client):
+	"""Test if malformed uploads fail their executions and do not block later requests."""
+	started = datetime.datetime.now()
+	# Room for exactly one more execution besides those left running by other tests
+	with (
+		patch('rest_rce.src.main.request_limit', in_progress_count() + 1),
+		patch(
+			'rest_rce.src.tool_executor.ToolExecutor.execute_tool',
+			return_value=(0, 'ok', '', '/tool', 'cmd', {}),
+		),
+	):
+		for _ in range(2):
+			response = client.post(
+				'/execute-tool/upload/',
+				content=b'garbage without boundary',
+				headers={'Content-Type': 'multipart/form-data; boundary=abc'},
+			)
+			assert response.status_code == 400
+		response = client.post('/execute-tool/', json={'inputs': {'x': 4}})
+	assert response.status_code == 200
+	records, _ = main.execution_store.query(since=started)
+	assert sorted(record['status'] for record in records) == ['completed', 'failed', 'failed']
+
+
+def test_get_executions(mock_tool_config, client):
+	"""Test if the execution history can be filtered and reduced to selected fields."""
+	start_execution('history1', {'x': 1})
+	start_execution('history2', {'x': 5})
+	finish_execution('history1', 'completed')
+	finish_execution('history2', 'failed', error='Tool crashed')
+	response = client.get('/executions/', params={'status': 'failed', 'fields': 'status,error'})
+	assert response.status_code == 200
+	executions = response.json()['executions']
+	assert {'execution_id': 'history2', 'status': 'failed', 'error': 'Tool crashed'} in executions
+	assert all(execution['status'] == 'failed' for execution in executions)
+	response = client.get('/executions/', params={'input': 'x', 'input_max': 2})
+	assert 'history1' in [execution['execution_id'] for execution in response.json()['executions']]
+
+
+def test_activate_configuration(mock_tool_config, client):
+	"""Test if activating a configuration swaps it and increases the config version."""
+	version = client.get('/').json()['config_version']
+	activate_configuration(dict(mock_tool_config, toolName='Reloaded'))
+	response = client.get('/')
+	assert response.json()['config_version'] == version + 1
+	assert response.headers['X-Config-Version'] == str(version + 1)
+	assert response.json()['configuration']['toolName'] == 'Reloaded'
+
+
+def test_execute_tool_retry_exit_code(mock_tool_config, client):
+	"""Test if an execution failing with a retried exit code is retried and the retry counted."""
+	results = [
+		(75, '', 'license busy', 'd', 'root.exe 4', {}),
+		(0, 'ok', '', 'd', 'root.exe 4', {}),
+	]
+	with (
+		patch('rest_rce.src.main.retry_policy', RetryPolicy(exit_codes=[75], backoff=0)),
+		patch('rest_rce.src.tool_executor.ToolExecutor.execute_tool', side_effect=results),
+	):
+		response = client.post('/execute-tool/', json={'inputs': {'x': 4}})
+	assert response.status_code == 200
+	assert response.json()['stdout'] == 'ok'
+	status = main.execution_store.get(response.json()['execution_id'])
+	assert status['status'] == 'completed'
+	assert status['retries'] == 1
+
+
+@pytest.mark.asyncio
+async def test_execute_tool_retrying_counts_towards_limit(mock_tool_config, app):
+	"""Test if an execution backing off from a failed attempt keeps its place in the request
+	limit, so it resumes without exceeding the limit."""
+	results = [
+		(75, '', 'license busy', 'd', 'root.exe 4', {}),
+		(0, 'ok', '', 'd', 'root.exe 4', {}),
+	]
+	with (
+		patch('rest_rce.src.main.request_limit', in_progress_count() + 1),
+		patch('rest_rce.src.main.retry_policy', RetryPolicy(exit_codes=[75], backoff=0.5)),
+		# Back off for the whole jitter window of 1 second
+		patch('tenacity.wait.random.uniform', side_effect=lambda low, high: high),
+		patch('rest_rce.src.tool_executor.ToolExecutor.execute_tool', side_effect=results),
+	):
+		async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as ac:
+			retried = asyncio.ensure_future(ac.post('/execute-tool/', json={'inputs': {'x': 4}}))
+			while status_counts['retrying'] == 0:
+				await asyncio.sleep(0.01)
+			response = await ac.post('/execute-tool/', json={'inputs': {'x': 5}})
+			assert response.status_code == 429
+			assert (await retried).status_code == 200
+
+
+def test_execute_tool_circuit_breaker_open(mock_tool_config, client):
+	"""Test if executions are rejected with 503 after the circuit breaker of the tool opened."""
+	results = [(1, '', 'license server down', 'd', 'root.exe 4', {})]
+	with (
+		patch('rest_rce.src.main.circuit_breakers', CircuitBreakers(0.5, min_calls=1)),
+		patch('rest_rce.src.tool_executor.ToolExecutor.execute_tool', side_effect=results),
+	):
+		client.post('/execute-tool/', json={'inputs': {'x': 4}})
+		response = client.post('/execute-tool/', json={'inputs': {'x': 4}})
+	assert response.status_code == 503
+	assert int(response.headers['Retry-After']) > 0
+
+
+@pytest.mark.asyncio
+async def test_execute_tool_coalesced(mock_tool_config, app):
+	"""Test if identical requests in flight are coalesced into a single tool execution."""
+
+	def slow_execution():
+		time.sleep(0.2)
+		return 0, 'ok', '', 'd', 'root.exe 4', {}
+
+	with (
+		patch('rest_rce.src.main.single_flight', SingleFlight()),
+		patch(
+			'rest_rce.src.tool_executor.ToolExecutor.execute_tool', side_effect=slow_execution
+		) as execute,
+	):
+		async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as ac:
+			responses = await asyncio.gather(
+				ac.post('/execute-tool/', json={'inputs': {'x': 4}}),
+				ac.post('/execute-tool/', json={'inputs': {'x': 4}}),
+			)
+	assert [response.status_code for response in responses] == [200, 200]
+	assert responses[0].json() == responses[1].json()
+	assert execute.call_count == 1
+
+
+def test_execute_tool_idempotency_key(mock_tool_config, client):
+	"""Test if a repeated request with the same idempotency key does not run the tool again."""
+	result = (0, 'ok', '', 'd', 'root.exe 4', {})
+	headers = {'Idempotency-Key': 'request-1'}
+	with patch('rest_rce.src.tool_executor.ToolExecutor.execute_tool', return_value=result) as ex:
+		first = client.post('/execute-tool/', json={'inputs': {'x': 4}}, headers=headers)
+		repeated = client.post('/execute-tool/', json={'inputs': {'x': 4}}, headers=headers)
+		other = client.post('/execute-tool/', json={'inputs': {'x': 5}}, headers=headers)
+	assert first.status_code == 200
+	assert repeated.json() == first.json()
+	assert ex.call_count == 1
+	assert other.status_code == 422
+	# The completed execution is remembered by its ID, its response read from the history
+	execution_id = first.json()['execution_id']
+	assert main.idempotency_keys.get('request-1', request_key({'x': 4})) == execution_id
+
+
+def test_delete_execution_not_running(mock_tool_config, client):
+	"""Test if only executions in progress can be cancelled."""
+	start_execution('task6', {})
+	finish_execution('task6', 'completed')
+	assert client.delete('/executions/unknown').status_code == 404
+	assert client.delete('/executions/task6').status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_delete_execution(mock_tool_config, app):
+	"""Test if cancelling a running execution frees its slot and answers its request with 409."""
+
+	def blocking_execution(executor):
+		executor.cancelled.wait(5)
+		executor.check_cancelled()
+
+	with patch.object(ToolExecutor, 'execute_tool', autospec=True, side_effect=blocking_execution):
+		async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as ac:
+			request = asyncio.ensure_future(ac.post('/execute-tool/', json={'inputs': {'x': 4}}))
+			while not running_executors:
+				await asyncio.sleep(0.01)
+			execution_id = next(iter(running_executors))
+			response = await ac.delete(f'/executions/{execution_id}')
+			assert response.status_code == 200
+			assert main.execution_store.get(execution_id)['status'] == 'cancelled'
+			assert (await request).status_code == 409
+	assert main.execution_store.get(execution_id)['status'] == 'cancelled'
+
+
+@pytest.mark.asyncio
+async def test_drain(mock_tool_config, monkeypatch, app):
+	"""Test if draining rejects new executions and cancels executions running past the grace
+	period."""
+
+	def blocking_execution(executor):
+		executor.cancelled.wait(5)
+		executor.check_cancelled()
+
+	monkeypatch.setattr('rest_rce.src.main.drain_deadline', None)
+	monkeypatch.setattr(main.cli_args, 'drain_timeout', 0.2)
+	with patch.object(ToolExecutor, 'execute_tool', autospec=True, side_effect=blocking_execution):
+		async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as ac:
+			request = asyncio.ensure_future(ac.post('/execute-tool/', json={'inputs': {'x': 4}}))
+			while not running_executors:
+				await asyncio.sleep(0.01)
+			execution_id = next(iter(running_executors))
+			await main.drain()
+			assert main.execution_store.get(execution_id)['status'] == 'cancelled'
+			assert (await request).status_code == 409
+			response = await ac.post('/execute-tool/', json={'inputs': {'x': 4}})
+			assert response.status_code == 503
+
+
+def test_get_load(mock_tool_config, client):
+	"""Test if the load endpoint counts running and retrying executions."""
+	load = client.get('/load/').json()
+	start_execution('task7', {})
+	start_execution('task8', {})
+	update_execution('task8', status='retrying')
+	response = client.get('/load/')
+	assert response.status_code == 200
+	assert response.json()['running'] == load['running'] + 1
+	assert response.json()['queued'] == load['queued'] + 1
+	assert response.json()['draining'] is False
+	finish_execution('task7', 'completed')
+	finish_execution('task8', 'failed')
+	assert client.get('/load/').json() == load
+
+
+def test_finished_executions_released(mock_tool_config, client):
+	"""Test if finished executions leave the execution status and are kept in the history."""
+	counts = dict(status_counts)
+	with patch(
+		'rest_rce.src.tool_executor.ToolExecutor.execute_tool',
+		return_value=(0, 'ok', '', '/tool', 'cmd', {}),
+	):
+		response = client.post('/execute-tool/', json={'inputs': {'x': 4}})
+	assert response.status_code == 200
+	execution_id = response.json()['execution_id']
+	assert execution_id not in execution_status
+	assert main.execution_store.get(execution_id)['stdout'] == 'ok'
+	assert {status: count for status, count in status_counts.items() if count} == {
+		status: count for status, count in counts.items() if count
+	}
+
+
+def test_execute_tool_failing_return_code(mock_tool_config, client):
+	"""Test if an execution failing with a return code is completed with its stderr."""
+	with patch(
+		'rest_rce.src.tool_executor.ToolExecutor.execute_tool',
+		return_value=(1, 'partial', 'tool error', '/tool', 'cmd', {}),
+	):
+		response = client.post('/execute-tool/', json={'inputs': {'x': 4}})
+	assert response.status_code == 200
+	assert response.json()['stdout'] == 'partial'
+	record = main.execution_store.get(response.json()['execution_id'])
+	assert record['status'] == 'completed'
+	assert record['stderr'] == 'tool error'
+
+
+@pytest.mark.asyncio
+async def test_execute_tool_forwarded(mock_tool_config, monkeypatch, app):
+	"""Test if a coordinator forwards executions to a backend and relays its response."""
+
+	def handler(request):
+		if request.url.path == '/load/':
+			return httpx.Response(200, json={'running': 0, 'queued': 0, 'request_limit': 1})
+		return httpx.Response(200, json={'stdout': 'ok'})
+
+	coordinator = Coordinator(
+		['http://backend'], main.logger, transport=httpx.MockTransport(handler)
+	)
+	monkeypatch.setattr('rest_rce.src.main.coordinator', coordinator)
+	async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as ac:
+		response = await ac.post('/execute-tool/', json={'inputs': {'x': 4}})
+	await coordinator.close()
+	assert response.status_code == 200
+	assert response.json() == {'stdout': 'ok'}
+	assert response.headers['X-Backend'] == 'http://backend'
+
+
+def test_read_root_fields(client):
+	"""Test if the health check can omit the tool configuration."""
+	response = client.get('/', params={'fields': 'message,config_version'})
+	assert response.status_code == 200
+	assert set(response.json()) == {'message', 'config_version'}
+
+
+def test_execute_tool_fields(mock_tool_config, client):
+	"""Test if the result of an execution can be limited to selected fields."""
+	with patch(
+		'rest_rce.src.tool_executor.ToolExecutor.execute_tool',
+		return_value=(0, 'x' * 5000, '', '/tool', 'cmd', {'y': 1}),
+	):
+		response = client.post(
+			'/execute-tool/',
+			params={'fields': 'output_variables'},
+			json={'inputs': {'x': 4}},
+			headers={'Accept-Encoding': 'identity'},
+		)
+	assert response.status_code == 200
+	assert set(response.json()) == {'execution_id', 'output_variables'}
+	assert 'Content-Encoding' not in response.headers
+
+
+def test_execute_tool_compressed_in_thread(mock_tool_config, client):
+	"""Test if large bodies are compressed in a worker thread."""
+	with (
+		patch('rest_rce.src.main.THREAD_COMPRESSION_SIZE', 2000),
+		patch('rest_rce.src.main.asyncio.to_thread', wraps=asyncio.to_thread) as to_thread,
+		patch(
+			'rest_rce.src.tool_executor.ToolExecutor.execute_tool',
+			return_value=(0, 'x' * 5000, '', '/tool', 'cmd', {'y': 1}),
+		),
+	):
+		response = client.post(
+			'/execute-tool/', json={'inputs': {'x': 4}}, headers={'Accept-Encoding': 'gzip'}
+		)
+	assert response.status_code == 200
+	assert response.json()['stdout'] == 'x' * 5000
+	assert any(call.args[0] is main.compress for call in to_thread.call_args_list)
+
+
+def test_execute_tool_compressed(mock_tool_config, client):
+	"""Test if large results are compressed with gzip if the client accepts it."""
+	with patch(
+		'rest_rce.src.tool_executor.ToolExecutor.execute_tool',
+		return_value=(0, 'x' * 5000, '', '/tool', 'cmd', {'y': 1}),
+	):
+		response = client.post(
+			'/execute-tool/', json={'inputs': {'x': 4}}, headers={'Accept-Encoding': 'gzip'}
+		)
+	assert response.status_code == 200
+	assert response.headers['Content-Encoding'] == 'gzip'
+	assert response.json()['stdout'] == 'x' * 5000
+
+
+@pytest.mark.asyncio
+async def test_instance_limit(mock_tool_config, app):
+	"""Test if executions beyond the instance limit of the tool are queued and can be cancelled."""
+	launch_settings = {
+		'toolDirectory': 'rest_rce/test/tools/root/',
+		'limitInstallationInstances': 'true',
+		'limitInstallationInstancesNumber': '1',
+	}
+	activate_configuration(dict(mock_tool_config, launchSettings=[launch_settings]))
+
+	def blocking_execution(executor):
+		executor.cancelled.wait(5)
+		executor.check_cancelled()
+
+	with patch.object(ToolExecutor, 'execute_tool', autospec=True, side_effect=blocking_execution):
+		async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as ac:
+			running = asyncio.ensure_future(ac.post('/execute-tool/', json={'inputs': {'x': 4}}))
+			queued = asyncio.ensure_future(ac.post('/execute-tool/', json={'inputs': {'x': 5}}))
+			while len(running_executors) < 2:
+				await asyncio.sleep(0.01)
+			statuses = {key: execution_status[key]['status'] for key in running_executors}
+			assert sorted(statuses.values()) == ['queued', 'running']
+			assert (await ac.get('/load/')).json()['queued'] >= 1
+
+			queued_id = next(key for key, status in statuses.items() if status == 'queued')
+			running_id = next(key for key, status in statuses.items() if status == 'running')
+			assert (await ac.delete(f'/executions/{queued_id}')).status_code == 200
+			assert (await queued).status_code == 409
+			assert (await ac.delete(f'/executions/{running_id}')).status_code == 200
+			assert (await running).status_code == 409
+	assert main.execution_store.get(queued_id)['status'] == 'cancelled'
+
+
+@pytest.mark.asyncio
+async def test_instance_limit_released_while_retrying(mock_tool_config, app):
+	"""Test if an execution backing off from a failed attempt frees its slot of the instance
+	limit for other executions."""
+	launch_settings = {
+		'toolDirectory': 'rest_rce/test/tools/root/',
+		'limitInstallationInstances': 'true',
+		'limitInstallationInstancesNumber': '1',
+	}
+	activate_configuration(dict(mock_tool_config, launchSettings=[launch_settings]))
+	results = [
+		(75, '', 'license busy', 'd', 'root.exe 4', {}),
+		(0, 'other', '', 'd', 'root.exe 5', {}),
+		(0, 'retried', '', 'd', 'root.exe 4', {}),
+	]
+	known = set(execution_status)
+	with (
+		patch('rest_rce.src.main.retry_policy', RetryPolicy(exit_codes=[75], backoff=0.5)),
+		# Back off for the whole jitter window of 1 second
+		patch('tenacity.wait.random.uniform', side_effect=lambda low, high: high),
+		patch('rest_rce.src.tool_executor.ToolExecutor.execute_tool', side_effect=results),
+	):
+		async with AsyncClient(transport=ASGITransport(app=app), base_url='http://test') as ac:
+			retried = asyncio.ensure_future(ac.post('/execute-tool/', json={'inputs': {'x': 4}}))
+			while status_counts['retrying'] == 0:
+				await asyncio.sleep(0.01)
+			retried_id = next(iter(set(execution_status) - known))
+			other = await ac.post('/execute-tool/', json={'inputs': {'x': 5}})
+			assert other.json()['stdout'] == 'other'
+			assert execution_status[retried_id]['status'] == 'retrying'
+			assert (await retried).json()['stdout'] == 'retried'
+
+
+def test_execute_tool_snapshot_policy(mock_tool_config, client):
+	"""Test if the directory policy of an execution is taken from the configuration it ran with,
+	not from a configuration loaded while it ran."""
+	activate_configuration(
+		dict(mock_tool_config, deleteWorkingDirectoriesAfterWorkflowExecution=True)
+	)
+
+	def reloading_execution():
+		activate_configuration(dict(mock_tool_config, deleteWorkingDirectoriesNever=True))
+		return 0, 'ok', '', 'd', 'root.exe 4', {}
+
+	with (
+		patch(
+			'rest_rce.src.tool_executor.ToolExecutor.execute_tool', side_effect=reloading_execution
+		),
+		patch.object(main.working_directories, 'finished') as finished,
+	):
+		response = client.post('/execute-tool/', json={'inputs': {'x': 4}})
+	assert response.status_code == 200
+	finished.assert_called_once_with(response.json()['execution_id'], DELETE)
+
+
+def test_execute_tool_traced(mock_tool_config, tmp_path, client):
+	"""Test if the phases of an execution and its retries are recorded in the trace file."""
+	results = [
+		(75, '', 'license busy', 'd', 'root.exe 4', {}),
+		(0, 'ok', '', 'd', 'root.exe 4', {}),
+	]
+	tracer = Tracer(str(tmp_path / 'trace.json'))
+	with (
+		patch('rest_rce.src.main.tracer', tracer),
+		patch('rest_rce.src.main.retry_policy', RetryPolicy(exit_codes=[75], backoff=0)),
+		patch('rest_rce.src.tool_executor.ToolExecutor.execute_tool', side_effect=results),
+	):
+		response = client.post('/execute-tool/', json={'inputs': {'x': 4}})
+	tracer.close()
+	assert response.status_code == 200
+
+	text = (tmp_path / 'trace.json').read_text().rstrip().rstrip(',')
+	events = json.loads(text + ']')
+	names = [event['name'] for event in events]
+	for name in ('admission', 'validation', 'instance limit wait', 'serialization', 'request'):
+		assert name in names
+	assert names.count('attempt') == 2
+	assert names.count('backoff') == 1
+	assert len({event['tid'] for event in events}) == 1
+
+
+def test_execute_tool_profiled(mock_tool_config, tmp_path, client):
+	"""Test if an execution requested with the admin token is profiled."""
+	profiler = Profiler(str(tmp_path), main.logger, token='secret')
+	with (
+		patch('rest_rce.src.main.profiler', profiler),
+		patch(
+			'rest_rce.src.tool_executor.ToolExecutor.execute_tool',
+			return_value=(0, 'ok', '', '/tool', 'cmd', {}),
+		),
+	):
+		unprofiled = client.post('/execute-tool/', json={'inputs': {'x': 4}})
+		response = client.post(
+			'/execute-tool/', json={'inputs': {'x': 4}}, headers={'X-Profile': 'secret'}
+		)
+	assert unprofiled.status_code == response.status_code == 200
+	execution_id = response.json()['execution_id']
+	assert 'profile' not in main.execution_store.get(unprofiled.json()['execution_id'])
+	profiled = main.execution_store.get(execution_id)
+	assert profiled['profile'] == str(tmp_path / f'{execution_id}.prof')
+	assert os.listdir(tmp_path) == [f'{execution_id}.prof']
@@ -0,0 +1,106 @@
+import pytest
+
+from rest_rce.src.output_extraction import OutputExtractor, cast_value, lookup_json_path
+
+# Tests for 'cast_value' and 'lookup_json_path'
+
+# The following cases are tested:
+# - Extracted text is cast to the data type of the output
+# - Invalid values raise a ValueError
+# - Values are looked up in nested JSON data by a dotted path
+
+
+def test_cast_value():
+	assert cast_value(' 1.5\n', 'Float') == 1.5
+	assert cast_value('3', 'Integer') == 3
+	assert cast_value('Yes', 'Boolean') is True
+	assert cast_value('0', 'Boolean') is False
+	assert cast_value('[1, 2]', 'Array') == [1, 2]
+	assert cast_value(' text ', 'ShortText') == 'text'
+	assert cast_value(4, 'String') == '4'
+
+
+def test_cast_value_invalid():
+	with pytest.raises(ValueError):
+		cast_value('abc', 'Float')
+	with pytest.raises(ValueError):
+		cast_value('maybe', 'Boolean')
+
+
+def test_lookup_json_path():
+	data = {'results': [{'value': 1}, {'value': 2}]}
+	assert lookup_json_path(data, 'results.1.value') == 2
+	assert lookup_json_path(data, '') == data
+
+
+# Tests for 'OutputExtractor'
+
+# The following cases are tested:
+# - A value is extracted from stdout or stderr with a regex
+# - The whole content of a result file is used without a format
+# - Values are extracted from JSON and CSV files, paths can contain placeholders
+# - ${dir:tool} paths work with a relative tool directory
+# - Invalid specs and values which cannot be extracted raise a ValueError
+
+
+def test_extract_regex():
+	extractor = OutputExtractor('root', 'Float', {'regex': r'Result: (\S+)'})
+	assert extractor.extract('Calculating\nResult: 2.5\n', '', {}, '.') == 2.5
+	extractor = OutputExtractor('code', 'Integer', {'stream': 'stderr', 'regex': r'code=\d+'})
+	with pytest.raises(ValueError):
+		extractor.extract('', 'error code=3', {}, '.')
+	extractor = OutputExtractor('code', 'String', {'stream': 'stderr', 'regex': r'code=\d+'})
+	assert extractor.extract('', 'error code=3', {}, '.') == 'code=3'
+
+
+def test_extract_text_file(tmp_path):
+	(tmp_path / 'result.txt').write_text('1.4142\n')
+	extractor = OutputExtractor('root', 'Float', {'file': '${dir:tool}/result.txt'})
+	assert extractor.extract('', '', {}, str(tmp_path)) == 1.4142
+
+
+def test_extract_file_relative_tool_directory(tmp_path, monkeypatch):
+	"""Test if ${dir:tool} paths work with a tool directory relative to the working directory."""
+	monkeypatch.chdir(tmp_path)
+	(tmp_path / 'tools' / 'root').mkdir(parents=True)
+	(tmp_path / 'tools' / 'root' / 'result.txt').write_text('2\n')
+	extractor = OutputExtractor('root', 'Integer', {'file': '${dir:tool}/result.txt'})
+	assert extractor.extract('', '', {}, 'tools/root/') == 2
+	extractor = OutputExtractor('root', 'Integer', {'file': 'result.txt'})
+	assert extractor.extract('', '', {}, 'tools/root/') == 2
+
+
+def test_extract_json_file(tmp_path):
+	(tmp_path / 'result_2.json').write_text('{"results": [{"value": "7"}]}')
+	spec = {'file': 'result_${in:x}.json', 'json': 'results.0.value', 'type': 'Integer'}
+	extractor = OutputExtractor('value', 'ShortText', spec)
+	assert extractor.extract('', '', {'x': 2}, str(tmp_path)) == 7
+
+
+def test_extract_csv_file(tmp_path):
+	(tmp_path / 'result.csv').write_text('x;fx\n1;1\n2;4\n')
+	extractor = OutputExtractor(
+		'fx', 'Float', {'file': 'result.csv', 'csv': 'fx', 'delimiter': ';'}
+	)
+	assert extractor.extract('', '', {}, str(tmp_path)) == 4.0
+	spec = {'file': 'result.csv', 'csv': 0, 'row': 1, 'delimiter': ';'}
+	extractor = OutputExtractor('x', 'Float', spec)
+	assert extractor.extract('', '', {}, str(tmp_path)) == 1.0
+
+
+def test_extract_invalid():
+	with pytest.raises(ValueError):
+		OutputExtractor('root', 'Float', {'regex': '(', 'file': 'result'})
+	with pytest.raises(ValueError):
+		OutputExtractor('root', 'Float', {'regex': 'x', 'json': 'y'})
+	with pytest.raises(ValueError):
+		OutputExtractor('root', 'Float', {'stream': 'stdin'})
+	extractor = OutputExtractor('root', 'Float', {'regex': 'Result: (.*)'})
+	with pytest.raises(ValueError, match='did not match'):
+		extractor.extract('no result', '', {}, '.')
+	extractor = OutputExtractor('root', 'Float', {'stream': 'stdout', 'json': 'missing'})
+	with pytest.raises(ValueError):
+		extractor.extract('{"value": 1}', '', {}, '.')
+	extractor = OutputExtractor('root', 'Float', {'file': '${dir:tool}/missing.txt'})
+	with pytest.raises(ValueError, match='could not be extracted'):
+		extractor.extract('', '', {}, '.')
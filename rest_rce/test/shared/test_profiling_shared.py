@@ -0,0 +1,74 @@
+import os
+import pstats
+from unittest.mock import MagicMock
+
+from rest_rce.src.profiling import Profiler
+
+
+def busy_function():
+	return sum(number * number for number in range(10000))
+
+
+# Tests for 'Profiler'
+
+# The following cases are tested:
+# - Executions are profiled for the admin token or if all executions are profiled
+# - Non-ASCII tokens are compared without errors
+# - Profiled sections are written to a file which can be read with pstats
+# - Sections overlapping with an active profile are skipped
+# - Only the newest profiles are kept
+
+
+def test_wants():
+	"""Test if executions are profiled for the admin token or if all are profiled."""
+	profiler = Profiler('profiles', MagicMock(), token='secret')
+	assert profiler.wants('secret')
+	assert not profiler.wants()
+	assert not profiler.wants('wrong')
+	# Tokens with non-ASCII characters are rejected instead of raising a TypeError
+	assert not profiler.wants('sécret')
+	assert profiler.logger.warning.call_count == 2
+	assert Profiler('profiles', MagicMock(), token='sécret').wants('sécret')
+
+	assert not Profiler('profiles', MagicMock()).wants('secret')
+	assert Profiler('profiles', MagicMock(), profile_all=True).wants()
+
+
+def test_save(tmp_path):
+	"""Test if profiled sections are written to a file which can be read with pstats."""
+	profiler = Profiler(str(tmp_path), MagicMock())
+	profile = profiler.start()
+	with profile.section('post-script'):
+		busy_function()
+
+	path = profiler.save(profile, 'abc')
+	assert path == os.path.join(str(tmp_path), 'abc.prof')
+	assert profile.sections == ['post-script']
+	functions = {function for _, _, function in pstats.Stats(path).stats}
+	assert 'busy_function' in functions
+
+
+def test_overlapping_sections(tmp_path):
+	"""Test if sections overlapping with an active profile are skipped."""
+	profiler = Profiler(str(tmp_path), MagicMock())
+	first, second = profiler.start(), profiler.start()
+	with first.section('validation'), second.section('validation'):
+		busy_function()
+	assert first.sections == ['validation']
+	assert second.skipped == ['validation']
+
+	with second.section('post-script'):
+		pass
+	assert second.sections == ['post-script']
+
+
+def test_prune(tmp_path):
+	"""Test if only the newest profiles are kept."""
+	profiler = Profiler(str(tmp_path), MagicMock(), limit=3)
+	for number, execution_id in enumerate(('a', 'b', 'c')):
+		path = profiler.save(profiler.start(), execution_id)
+		os.utime(path, (number, number))
+	(tmp_path / 'notes.txt').write_text('not a profile')
+	profiler.limit = 2
+	profiler.prune()
+	assert sorted(os.listdir(tmp_path)) == ['b.prof', 'c.prof', 'notes.txt']
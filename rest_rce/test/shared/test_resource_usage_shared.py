@@ -0,0 +1,64 @@
+import subprocess
+import sys
+
+import pytest
+
+from rest_rce.src.resource_usage import ResourceUsageTracker, wait_for_process
+
+
+@pytest.fixture
+def tracker():
+	return ResourceUsageTracker()
+
+
+# Tests for 'wait_for_process'
+
+# The following cases are tested:
+# - Return code and wall time of a finished process are returned
+# - A process exceeding the timeout raises a TimeoutExpired exception
+
+
+def test_wait_for_process_return_code():
+	"""Test if the return code and the wall time of the child process are returned."""
+	process = subprocess.Popen([sys.executable, '-c', 'import sys; sys.exit(3)'])
+	return_code, usage = wait_for_process(process)
+	assert return_code == 3
+	assert process.returncode == 3
+	assert usage['wall_seconds'] > 0
+
+
+def test_wait_for_process_timeout():
+	"""Test if a TimeoutExpired exception is raised if the process exceeds the timeout."""
+	process = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(10)'])
+	with pytest.raises(subprocess.TimeoutExpired):
+		wait_for_process(process, timeout=0.1)
+	process.kill()
+	wait_for_process(process)
+
+
+# Tests for 'ResourceUsageTracker'
+
+# The following cases are tested:
+# - Usage of several executions is aggregated per tool
+# - Executions without usage information are ignored
+
+
+def test_tracker_aggregates_per_tool(tracker):
+	"""Test if the usage of several executions is summed up and averaged per tool."""
+	usage = {'wall_seconds': 1.0, 'user_cpu_seconds': 0.5, 'system_cpu_seconds': 0.1}
+	tracker.record('Root', dict(usage, max_rss_kb=100))
+	tracker.record('Root', dict(usage, max_rss_kb=300))
+	tracker.record('Poly', dict(usage, max_rss_kb=50))
+	summary = tracker.summary()
+	assert summary['Root']['executions'] == 2
+	assert summary['Root']['user_cpu_seconds'] == 1.0
+	assert summary['Root']['peak_max_rss_kb'] == 300
+	assert summary['Root']['mean_max_rss_kb'] == 200
+	assert summary['Root']['mean_cpu_seconds'] == pytest.approx(0.6)
+	assert summary['Poly']['executions'] == 1
+
+
+def test_tracker_ignores_missing_usage(tracker):
+	"""Test if executions without recorded usage are not counted."""
+	tracker.record('Root', None)
+	assert tracker.summary() == {}
@@ -0,0 +1,72 @@
+import pytest
+import requests
+
+from rest_rce.src.retry_policy import RetryPolicy
+
+
+def attempts_returning(*outcomes):
+	"""Create an attempt function returning or raising the given outcomes one after another."""
+	outcomes = list(outcomes)
+
+	async def attempt():
+		outcome = outcomes.pop(0)
+		if isinstance(outcome, Exception):
+			raise outcome
+		return outcome
+
+	return attempt
+
+
+# Tests for 'RetryPolicy'
+
+# The following cases are tested:
+# - Retry reasons for exit codes, stderr patterns and timeouts
+# - A retried result is followed by the next attempt
+# - Connection errors are retried
+# - The result of the last attempt is returned if all attempts are used up
+# - The backoff is awaited before every retry
+
+
+def test_retry_reason():
+	policy = RetryPolicy(exit_codes=[75], stderr_patterns=['license .* unavailable'])
+	assert policy.retry_reason(0, '') is None
+	assert policy.retry_reason(1, 'error') is None
+	assert policy.retry_reason(75, '') == 'exit code 75'
+	assert 'stderr' in policy.retry_reason(1, 'license server unavailable')
+	assert policy.retry_reason(-1, 'Timeout expired') is None
+	assert RetryPolicy(retry_timeouts=True).retry_reason(-1, '') == 'timeout'
+
+
+@pytest.mark.asyncio
+async def test_retry_result():
+	policy = RetryPolicy(exit_codes=[75], backoff=0)
+	attempt = attempts_returning((75, '', ''), (0, 'done', ''))
+	assert await policy.retrying()(attempt) == (0, 'done', '')
+
+
+@pytest.mark.asyncio
+async def test_retry_connection_error():
+	policy = RetryPolicy(backoff=0)
+	attempt = attempts_returning(requests.exceptions.ConnectionError(), (0, 'done', ''))
+	assert await policy.retrying()(attempt) == (0, 'done', '')
+
+
+@pytest.mark.asyncio
+async def test_attempts_used_up():
+	policy = RetryPolicy(attempts=2, exit_codes=[75], backoff=0)
+	attempt = attempts_returning((75, '', 'first'), (75, '', 'last'))
+	assert await policy.retrying()(attempt) == (75, '', 'last')
+
+	attempt = attempts_returning(*[requests.exceptions.ConnectionError()] * 2)
+	with pytest.raises(requests.exceptions.ConnectionError):
+		await policy.retrying()(attempt)
+
+
+@pytest.mark.asyncio
+async def test_backoff_before_sleep():
+	sleeps = []
+	policy = RetryPolicy(attempts=3, exit_codes=[75], backoff=0.01, max_backoff=0.02)
+	retrying = policy.retrying(before_sleep=lambda state: sleeps.append(state.upcoming_sleep))
+	await retrying(attempts_returning((75, '', ''), (75, '', ''), (0, '', '')))
+	assert len(sleeps) == 2
+	assert all(0 <= sleep <= 0.02 for sleep in sleeps)
@@ -0,0 +1,65 @@
+import gzip
+
+from rest_rce.src.serialization import compress, is_compressible, negotiate_encoding, select_fields
+
+# Tests for 'select_fields'
+
+# The following cases are tested:
+# - All fields are returned if none are selected
+# - Only the selected fields and the fields to keep are returned
+
+
+def test_select_fields_none():
+	content = {'execution_id': 'a', 'stdout': 'x'}
+	assert select_fields(content, None) is content
+
+
+def test_select_fields():
+	content = {'execution_id': 'a', 'stdout': 'x', 'output_variables': {'y': 1}}
+	result = select_fields(content, 'output_variables,unknown', keep=('execution_id',))
+	assert result == {'execution_id': 'a', 'output_variables': {'y': 1}}
+	assert 'stdout' in content
+
+
+# Tests for 'negotiate_encoding'
+
+# The following cases are tested:
+# - No encoding without an accepted supported encoding
+# - gzip is chosen if accepted, also through a wildcard
+# - An encoding with quality 0 is refused
+
+
+def test_negotiate_encoding_none():
+	assert negotiate_encoding(None) is None
+	assert negotiate_encoding('br, identity') is None
+
+
+def test_negotiate_encoding_gzip():
+	assert negotiate_encoding('gzip, deflate') == 'gzip'
+	assert negotiate_encoding('br;q=1.0, *;q=0.5') is not None
+
+
+def test_negotiate_encoding_refused():
+	assert negotiate_encoding('gzip;q=0') is None
+	assert negotiate_encoding('*;q=0') is None
+
+
+# Tests for 'compress' and 'is_compressible'
+
+# The following cases are tested:
+# - A gzip compressed body can be decompressed
+# - Only JSON and text responses are compressible
+
+
+def test_compress_gzip():
+	body = b'{"stdout": "' + b'a' * 5000 + b'"}'
+	compressed = compress(body, 'gzip')
+	assert len(compressed) < len(body)
+	assert gzip.decompress(compressed) == body
+
+
+def test_is_compressible():
+	assert is_compressible('application/json')
+	assert is_compressible('text/plain; charset=utf-8')
+	assert not is_compressible('application/gzip')
+	assert not is_compressible(None)
@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from rest_rce.src.single_flight import SingleFlight, request_key
+
+
+def counting_execution(calls, result='done', delay=0.05):
+	async def execution():
+		calls.append(1)
+		await asyncio.sleep(delay)
+		if isinstance(result, Exception):
+			raise result
+		return result
+
+	return execution
+
+
+# Tests for 'request_key'
+def test_request_key():
+	assert request_key({'x': 1, 'n': 2}, 'abc') == request_key({'n': 2, 'x': 1}, 'abc')
+	assert request_key({'x': 1}, 'abc') != request_key({'x': 2}, 'abc')
+	assert request_key({'x': 1}, 'abc') != request_key({'x': 1}, 'def')
+
+
+# Tests for 'SingleFlight'
+
+# The following cases are tested:
+# - Identical executions in flight run once and share the result
+# - Exceptions are shared as well
+# - The execution is not coalesced with later ones after it finished
+# - A cancelled caller does not cancel the execution for the others
+
+
+@pytest.mark.asyncio
+async def test_run_coalesced():
+	single_flight, calls = SingleFlight(), []
+	results = await asyncio.gather(
+		*(single_flight.run('key', counting_execution(calls)) for _ in range(3))
+	)
+	assert results == ['done'] * 3
+	assert len(calls) == 1
+	assert 'key' not in single_flight
+
+
+@pytest.mark.asyncio
+async def test_run_exception():
+	single_flight, calls = SingleFlight(), []
+	execution = counting_execution(calls, ValueError('failed'))
+	results = await asyncio.gather(
+		single_flight.run('key', execution),
+		single_flight.run('key', execution),
+		return_exceptions=True,
+	)
+	assert [str(result) for result in results] == ['failed', 'failed']
+	assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_run_after_finished():
+	single_flight, calls = SingleFlight(), []
+	await single_flight.run('key', counting_execution(calls))
+	await single_flight.run('key', counting_execution(calls))
+	assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_run_caller_cancelled():
+	single_flight, calls = SingleFlight(), []
+	first = asyncio.ensure_future(single_flight.run('key', counting_execution(calls)))
+	second = asyncio.ensure_future(single_flight.run('key', counting_execution(calls)))
+	await asyncio.sleep(0.01)
+	first.cancel()
+	assert await second == 'done'
+	assert len(calls) == 1
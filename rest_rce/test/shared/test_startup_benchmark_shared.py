@@ -0,0 +1,30 @@
+import subprocess
+import sys
+
+from rest_rce.src.startup_benchmark import run_benchmark
+
+# Tests for the startup of the server
+
+# The following cases are tested:
+# - Importing the server neither parses sys.argv, sets up logging nor loads optional subsystems
+# - The benchmark measures the import and the creation of the app with the given settings
+
+
+def test_import_without_side_effects():
+	script = (
+		'import sys\n'
+		"sys.argv = ['rest_rce', '--unknown']\n"
+		'import rest_rce.src.main as main\n'
+		'assert main.cli_args is None and main.logger is None\n'
+		"for name in ('requests', 'tenacity', 'httpx', 'uvicorn'):\n"
+		'	assert name not in sys.modules, name\n'
+	)
+	result = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True)
+	assert result.returncode == 0, result.stderr
+
+
+def test_run_benchmark():
+	summary = run_benchmark(['-', '--request_limit', '3'], repeat=1)
+	assert set(summary) == {'import', 'create_app', 'modules'}
+	assert 0 < summary['import']['min'] <= summary['import']['median']
+	assert summary['modules'] > 0
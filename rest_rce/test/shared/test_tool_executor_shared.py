@@ -1,7 +1,6 @@
 import json
 import os
 import re
-import subprocess
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -9,6 +8,7 @@ import pytest
 from rest_rce.src.constants import VALID_JSON_PATH
 from rest_rce.src.main import request_id_var
 from rest_rce.src.tool_executor import ToolExecutor
+from rest_rce.src.tool_spec import ToolSpec
 from rest_rce.src.utils import set_up_logger
 
 
@@ -30,6 +30,12 @@ def mock_tool_executor(main_logger):
 	yield ToolExecutor(tool_config=configuration, inputs={'x': 4}, logger=main_logger)
 
 
+def reconfigure(executor, config):
+	"""Update the tool configuration of the executor and rebuild its ToolSpec."""
+	executor.tool_config = dict(executor.tool_config, **config)
+	executor.spec = ToolSpec.from_config(executor.tool_config)
+
+
 @pytest.fixture
 def mock_project_dir(tmp_path):
 	project_dir = tmp_path / 'my_project'
@@ -104,7 +110,7 @@ def mock_input_int_without_endpointname():
 def test_validate_inputs_no_inputs(mock_tool_executor):
 	"""Tests 'validate_inputs' method, if no inputs are required nor provided"""
 	mock_tool_executor.inputs = {}
-	mock_tool_executor.tool_config['inputs'] = []
+	reconfigure(mock_tool_executor, {'inputs': []})
 	mock_tool_executor.validate_inputs()
 
 
@@ -117,11 +123,11 @@ def test_validate_inputs_broken_config(
 	"""
 	# Tests if endpointName is missing
 	mock_tool_executor.inputs = {'x': 1}
-	mock_tool_executor.tool_config['inputs'] = mock_input_int_without_endpointname
 	with pytest.raises(KeyError):
+		reconfigure(mock_tool_executor, {'inputs': mock_input_int_without_endpointname})
 		mock_tool_executor.validate_inputs()
 	# Tests if endpointDataType is missing
-	mock_tool_executor.tool_config['inputs'] = mock_input_int_without_endpointdatatype
+	reconfigure(mock_tool_executor, {'inputs': mock_input_int_without_endpointdatatype})
 	with pytest.raises(AttributeError):
 		mock_tool_executor.validate_inputs()
 
@@ -129,7 +135,7 @@ def test_validate_inputs_broken_config(
 def test_validate_inputs_missing_input(mock_tool_executor, mock_clean_input_int):
 	"""Tests 'validate_inputs' method, if an input is required but not provided"""
 	mock_tool_executor.inputs = {}
-	mock_tool_executor.tool_config['inputs'] = mock_clean_input_int
+	reconfigure(mock_tool_executor, {'inputs': mock_clean_input_int})
 	with pytest.raises(ValueError, match='Post request missing required input'):
 		mock_tool_executor.validate_inputs()
 
@@ -137,7 +143,7 @@ def test_validate_inputs_missing_input(mock_tool_executor, mock_clean_input_int)
 def test_validate_inputs_unexpected_input(mock_tool_executor, mock_clean_input_int):
 	"""Tests 'validate_inputs' method, if an unexpected input is provided"""
 	mock_tool_executor.inputs = {'unexpectedInput1': 187, 'unexpectedInput2': 'this'}
-	mock_tool_executor.tool_config['inputs'] = mock_clean_input_int
+	reconfigure(mock_tool_executor, {'inputs': mock_clean_input_int})
 	with pytest.raises(ValueError, match='Post request containing unexpected inputs:'):
 		mock_tool_executor.validate_inputs()
 
@@ -145,7 +151,7 @@ def test_validate_inputs_unexpected_input(mock_tool_executor, mock_clean_input_i
 def test_validate_inputs_missing_value(mock_tool_executor, mock_clean_input_int):
 	"""Tests 'validate_inputs' method, if an input key is provided but not an input value"""
 	mock_tool_executor.inputs = {'x': None}
-	mock_tool_executor.tool_config['inputs'] = mock_clean_input_int
+	reconfigure(mock_tool_executor, {'inputs': mock_clean_input_int})
 	with pytest.raises(ValueError, match='Input value for'):
 		mock_tool_executor.validate_inputs()
 
@@ -153,7 +159,7 @@ def test_validate_inputs_missing_value(mock_tool_executor, mock_clean_input_int)
 def test_validate_inputs_datatype_error(mock_tool_executor, mock_clean_input_int):
 	"""Tests 'validate_inputs' method, if an input value has an unexpected data type"""
 	mock_tool_executor.inputs = {'x': 'this is not an integer value'}
-	mock_tool_executor.tool_config['inputs'] = mock_clean_input_int
+	reconfigure(mock_tool_executor, {'inputs': mock_clean_input_int})
 	with pytest.raises(ValueError):
 		mock_tool_executor.validate_inputs()
 
@@ -169,7 +175,7 @@ def test_validate_inputs_datatype_error(mock_tool_executor, mock_clean_input_int
 
 def test_validate_outputs_unexpected_output(mock_tool_executor):
 	"""Tests 'validate_outputs' when the tool returns an unexpected output variable."""
-	mock_tool_executor.tool_config['outputs'] = [{'endpointName': 'expected_output'}]
+	reconfigure(mock_tool_executor, {'outputs': [{'endpointName': 'expected_output'}]})
 	output_vars = {'unexpected_output': 'some_value'}
 	msg = "Tool returned outputs not defined in the config file: ['unexpected_output']"
 	with pytest.raises(ValueError, match=re.escape(msg)):
@@ -178,7 +184,7 @@ def test_validate_outputs_unexpected_output(mock_tool_executor):
 
 def test_validate_outputs_missing_value(mock_tool_executor):
 	"""Tests 'validate_outputs' when an expected output is set to None."""
-	mock_tool_executor.tool_config['outputs'] = [{'endpointName': 'valid_output'}]
+	reconfigure(mock_tool_executor, {'outputs': [{'endpointName': 'valid_output'}]})
 	output_vars = {'valid_output': None}
 	with pytest.raises(ValueError, match='Output value for valid_output is empty.'):
 		mock_tool_executor.validate_outputs(output_vars)
@@ -186,9 +192,10 @@ def test_validate_outputs_missing_value(mock_tool_executor):
 
 def test_validate_outputs_valid(mock_tool_executor):
 	"""Tests 'validate_outputs' with a valid output that matches the configuration."""
-	mock_tool_executor.tool_config['outputs'] = [
-		{'endpointName': 'valid_output', 'endpointDataType': 'String'}
-	]
+	reconfigure(
+		mock_tool_executor,
+		{'outputs': [{'endpointName': 'valid_output', 'endpointDataType': 'String'}]},
+	)
 	output_vars = {'valid_output': 'test_string'}
 	# Should not raise an exception
 	mock_tool_executor.validate_outputs(output_vars)
@@ -196,9 +203,9 @@ def test_validate_outputs_valid(mock_tool_executor):
 
 def test_validate_outputs_invalid_data_type(mock_tool_executor):
 	"""Tests 'validate_outputs' when output data type doesn't match the expected type."""
-	mock_tool_executor.tool_config['outputs'] = [
-		{'endpointName': 'x', 'endpointDataType': 'Integer'}
-	]
+	reconfigure(
+		mock_tool_executor, {'outputs': [{'endpointName': 'x', 'endpointDataType': 'Integer'}]}
+	)
 	output_vars = {'x': 'not_an_integer'}
 	with pytest.raises(ValueError, match='Expected Integer, but got str: not_an_integer'):
 		mock_tool_executor.validate_outputs(output_vars)
@@ -209,8 +216,7 @@ def test_validate_outputs_invalid_data_type(mock_tool_executor):
 # The following cases are tested:
 # - Running a simple Python script
 # - Running a Python script with a placeholder for the output variable
-# - Running a Python script with an import error
-# - Running a Python script with an import error that fails to import the module
+# - Running a Python script with an import error, which is not resolved during the request
 # - Running a Python script that raises an error itself
 
 
@@ -239,38 +245,26 @@ def test_execute_python_script_replace_output_placeholder(mock_tool_executor):
 	assert returned_value != {}
 
 
-def test_execute_python_script_import_error(mock_tool_executor):
+@patch('subprocess.run')
+def test_execute_python_script_import_error(mock_subprocess, mock_tool_executor):
 	"""Tests 'execute_python_script' method when an import error occurs."""
 	tool_dir = 'rest_rce/test/tools/root'
 	project_dir = mock_tool_executor.find_project_directory(os.getcwd())
-	script = (
-		'import emoji\r\n'
-		+ 'file = open("${dir:tool}/result.txt","r")\r\nroot = file.read()\r\n'
-		+ '${out:root} = float(root)'
-	)
-	mock_tool_executor.logger = MagicMock()
-	output_vars = {'k': 1}
-	mock_tool_executor.execute_python_script(
-		script=script, project_dir=project_dir, tool_dir=tool_dir, output_vars=output_vars
-	)
-	warning_msg = 'Missing dependency detected: emoji. Attempting to install it.'
-	mock_tool_executor.logger.warning.assert_called_with(warning_msg)
-
-
-def test_execute_python_script_import_error_failed_import(mock_tool_executor):
-	"""Tests if the correct error is raised if missing libraries could not be installed."""
-	tool_dir = 'rest_rce/test/tools/root'
-	project_dir = mock_tool_executor.find_project_directory(os.getcwd())
 	script = (
 		'import ThisIsNotARealModule\r\n'
 		+ 'file = open("${dir:tool}/result.txt","r")\r\nroot = file.read()\r\n'
 		+ '${out:root} = float(root)'
 	)
+	mock_tool_executor.logger = MagicMock()
 	output_vars = {'k': 1}
-	with pytest.raises(subprocess.CalledProcessError):
+	with pytest.raises(ImportError):
 		mock_tool_executor.execute_python_script(
 			script=script, project_dir=project_dir, tool_dir=tool_dir, output_vars=output_vars
 		)
+	error_msg = mock_tool_executor.logger.error.call_args[0][0]
+	assert 'Missing dependency ThisIsNotARealModule' in error_msg
+	# Nothing is installed while serving a request
+	mock_subprocess.assert_not_called()
 
 
 @patch('os.chdir')
@@ -336,3 +330,60 @@ def test_find_project_directory(mock_tool_executor, mock_project_dir):
 	with patch('os.path.exists', return_value=False):
 		project_dir = mock_tool_executor.find_project_directory(mock_project_dir)
 		assert project_dir is None
+
+
+# Test capturing of the command script output
+
+# The following cases are tested:
+# - Output below the capture limit is read completely
+# - Output above the capture limit is reduced to its head and tail
+# - Output is spilled to a file in the output directory
+# - Outputs are extracted from the complete spilled output if the captured output is truncated
+
+
+def test_read_captured_output_below_limit(tmp_path):
+	"""Tests if output below the capture limit is read completely."""
+	with open(tmp_path / 'stdout.log', 'w+b') as file:
+		file.write(b'line 1\r\nline 2\n')
+		assert ToolExecutor.read_captured_output(file, limit=100) == 'line 1\nline 2\n'
+
+
+def test_read_captured_output_above_limit(tmp_path):
+	"""Tests if only the head and tail of output above the capture limit are read."""
+	with open(tmp_path / 'stdout.log', 'w+b') as file:
+		file.write(b'head' + b'x' * 1000 + b'tail')
+		text = ToolExecutor.read_captured_output(file, limit=8)
+	assert text == 'head\n[... 1000 bytes truncated ...]\ntail'
+
+
+def test_capture_output_spilled_to_file(mock_tool_executor, tmp_path):
+	"""Tests if the full output is kept in a file in the output directory."""
+	mock_tool_executor.output_dir = str(tmp_path)
+	mock_tool_executor.capture_limit = 4
+	with mock_tool_executor.open_capture_file('stdout') as file:
+		file.write(b'0123456789')
+		text = mock_tool_executor.capture_output('stdout', file)
+	assert text == '01\n[... 6 bytes truncated ...]\n89'
+	captured = mock_tool_executor.captured_output['stdout']
+	assert captured == {'bytes': 10, 'truncated': True, 'path': str(tmp_path / 'stdout.log')}
+	assert (tmp_path / 'stdout.log').read_bytes() == b'0123456789'
+
+
+def test_extract_outputs_from_truncated_output(mock_tool_executor, tmp_path):
+	"""Tests if outputs are extracted from the spill file if the match is not in head or tail."""
+	mock_tool_executor.output_dir = str(tmp_path)
+	mock_tool_executor.capture_limit = 64
+	outputs = [
+		{
+			'endpointName': 'result',
+			'endpointDataType': 'Integer',
+			'extract': {'stream': 'stdout', 'regex': r'Result: (\d+)'},
+		}
+	]
+	reconfigure(mock_tool_executor, {'outputs': outputs})
+	with mock_tool_executor.open_capture_file('stdout') as file:
+		file.write(b'x\n' * 100000 + b'Result: 16\n' + b'y\n' * 100000)
+		stdout = mock_tool_executor.capture_output('stdout', file)
+	assert 'Result' not in stdout
+	outputs = mock_tool_executor.extract_outputs(stdout, '', str(tmp_path))
+	assert outputs == {'result': 16}
@@ -0,0 +1,108 @@
+import dataclasses
+import os
+
+import pytest
+
+from rest_rce.src.constants import CS_L, CS_W
+from rest_rce.src.tool_spec import ToolSpec
+
+
+@pytest.fixture
+def config():
+	return {
+		'toolName': 'Root',
+		CS_W: 'python root.py ${in:x}',
+		CS_L: 'python3 root.py ${in:x}',
+		'setToolDirAsWorkingDir': True,
+		'launchSettings': [{'toolDirectory': 'tools/root'}],
+		'preScript': 'pass',
+		'inputs': [{'endpointName': 'x', 'endpointDataType': 'Float'}],
+		'outputs': [{'endpointName': 'root', 'endpointDataType': 'Float'}],
+	}
+
+
+# Tests for 'ToolSpec'
+
+# The following cases are tested:
+# - All fields are derived from the configuration
+# - The spec and its maps cannot be modified
+# - The command script is only compiled without shell if requested
+# - The working directory is only set if enabled in the configuration
+# - The fingerprint only depends on the content of the configuration
+# - The instance limit is only set if enabled and must be a positive number
+# - Extractors are compiled for outputs with an extract spec, invalid specs are rejected
+# - The cleanup policy of working directories is derived from the deleteWorkingDirectories keys
+
+
+def test_from_config(config):
+	spec = ToolSpec.from_config(config)
+	assert spec.tool_name == 'Root'
+	assert spec.command_script == config[CS_W if os.name == 'nt' else CS_L]
+	assert spec.tool_directory == 'tools/root'
+	assert spec.pre_script == 'pass'
+	assert spec.post_script == ''
+	assert dict(spec.input_datatypes) == {'x': 'Float'}
+	assert dict(spec.output_datatypes) == {'root': 'Float'}
+	assert spec.config == config
+
+
+def test_immutable(config):
+	spec = ToolSpec.from_config(config)
+	with pytest.raises(dataclasses.FrozenInstanceError):
+		spec.tool_name = 'Other'
+	with pytest.raises(TypeError):
+		spec.input_datatypes['y'] = 'Integer'
+	# The spec is not affected by later changes of the configuration
+	config['toolName'] = 'Other'
+	assert spec.tool_name == 'Root'
+	assert spec.config['toolName'] == 'Root'
+
+
+def test_command_template(config):
+	assert ToolSpec.from_config(config).command_template is None
+	spec = ToolSpec.from_config(config, no_shell=True)
+	assert spec.command_template.input_names == {'x'}
+
+
+def test_working_directory(config):
+	assert ToolSpec.from_config(config).working_directory == 'tools/root'
+	config['setToolDirAsWorkingDir'] = False
+	assert ToolSpec.from_config(config).working_directory is None
+
+
+def test_fingerprint(config):
+	fingerprint = ToolSpec.from_config(config).fingerprint
+	assert ToolSpec.from_config(dict(reversed(config.items()))).fingerprint == fingerprint
+	config['toolName'] = 'Other'
+	assert ToolSpec.from_config(config).fingerprint != fingerprint
+
+
+def test_instance_limit(config):
+	assert ToolSpec.from_config(config).instance_limit is None
+	config['launchSettings'][0]['limitInstallationInstances'] = 'true'
+	config['launchSettings'][0]['limitInstallationInstancesNumber'] = '10'
+	assert ToolSpec.from_config(config).instance_limit == 10
+	config['launchSettings'][0]['limitInstallationInstances'] = 'false'
+	assert ToolSpec.from_config(config).instance_limit is None
+	config['launchSettings'][0]['limitInstallationInstances'] = True
+	config['launchSettings'][0]['limitInstallationInstancesNumber'] = 'ten'
+	with pytest.raises(ValueError):
+		ToolSpec.from_config(config)
+
+
+def test_output_extractors(config):
+	assert ToolSpec.from_config(config).output_extractors == {}
+	config['outputs'][0]['extract'] = {'regex': r'Result: (\S+)'}
+	extractors = ToolSpec.from_config(config).output_extractors
+	assert extractors['root'].extract('Result: 2', '', {}, '.') == 2.0
+	config['outputs'][0]['extract'] = {'regex': '('}
+	with pytest.raises(ValueError):
+		ToolSpec.from_config(config)
+
+
+def test_working_directory_policy(config):
+	assert ToolSpec.from_config(config).working_directory_policy == 'keep'
+	config['deleteWorkingDirectoriesAfterWorkflowExecution'] = True
+	assert ToolSpec.from_config(config).working_directory_policy == 'delete'
+	config['deleteWorkingDirectoriesNever'] = 'true'
+	assert ToolSpec.from_config(config).working_directory_policy == 'never'
@@ -0,0 +1,107 @@
+import asyncio
+import json
+
+import pytest
+
+from rest_rce.src.tracing import Tracer
+
+
+def load_trace(path):
+	"""Load a trace file the way the trace viewers do, adding the missing closing bracket."""
+	text = path.read_text().rstrip().rstrip(',')
+	return json.loads(text + ']')
+
+
+@pytest.fixture
+def tracer(tmp_path):
+	tracer = Tracer(str(tmp_path / 'trace.json'))
+	yield tracer
+	tracer.close()
+
+
+# Tests for 'Tracer'
+
+# The following cases are tested:
+# - Spans are written as complete events of the track of the request
+# - Spans recorded in a worker thread are drawn on the track of the request that started it
+# - The trace file is rotated and every rotated file can be loaded
+# - No file is written if tracing is disabled or the tracer was closed
+
+
+def test_span(tracer, tmp_path):
+	"""Test if spans are written as complete events of the track of the request."""
+	tracer.start_track('abc POST /execute-tool/')
+	with tracer.span('validation', execution_id='abc'):
+		pass
+	tracer.record('backoff', tracer.now(), 1500.0, attempt=1)
+
+	metadata, validation, backoff = load_trace(tmp_path / 'trace.json')
+	assert metadata['ph'] == 'M'
+	assert metadata['args'] == {'name': 'abc POST /execute-tool/'}
+	assert validation['name'] == 'validation'
+	assert validation['ph'] == 'X'
+	assert validation['dur'] >= 0
+	assert validation['args']['execution_id'] == 'abc'
+	assert validation['tid'] == backoff['tid'] == metadata['tid']
+	assert backoff['dur'] == 1500.0
+	assert backoff['ts'] >= validation['ts']
+
+
+@pytest.mark.asyncio
+async def test_span_in_worker_thread(tracer, tmp_path):
+	"""Test if spans recorded in a worker thread are drawn on the track of the request."""
+
+	def run_in_thread(name):
+		with tracer.span(name):
+			pass
+
+	async def traced_request(name):
+		tracer.start_track(name)
+		with tracer.span('attempt'):
+			await asyncio.to_thread(run_in_thread, f'subprocess {name}')
+
+	await asyncio.gather(traced_request('first'), traced_request('second'))
+
+	events = load_trace(tmp_path / 'trace.json')
+	tracks = {event['args']['name']: event['tid'] for event in events if event['ph'] == 'M'}
+	assert tracks['first'] != tracks['second']
+	for name in ('first', 'second'):
+		span = next(event for event in events if event['name'] == f'subprocess {name}')
+		assert span['tid'] == tracks[name]
+		assert span['args']['thread'] != 'MainThread'
+
+
+def test_rotation(tmp_path):
+	"""Test if the trace file is rotated and every rotated file can be loaded."""
+	tracer = Tracer(str(tmp_path / 'trace.json'), max_bytes=1000, backup_count=2)
+	for number in range(50):
+		with tracer.span('request', number=number):
+			pass
+	tracer.close()
+
+	assert sorted(path.name for path in tmp_path.iterdir()) == [
+		'trace.json',
+		'trace.json.1',
+		'trace.json.2',
+	]
+	numbers = []
+	for name in ('trace.json.2', 'trace.json.1', 'trace.json'):
+		assert (tmp_path / name).stat().st_size <= 1000
+		numbers += [event['args']['number'] for event in load_trace(tmp_path / name)]
+	assert numbers == sorted(numbers)
+	assert numbers[-1] == 49
+
+
+def test_disabled(tmp_path):
+	"""Test if no file is written if tracing is disabled or the tracer was closed."""
+	tracer = Tracer()
+	tracer.start_track('request')
+	with tracer.span('validation'):
+		pass
+	assert not tracer.enabled
+
+	closed = Tracer(str(tmp_path / 'trace.json'))
+	closed.close()
+	with closed.span('validation'):
+		pass
+	assert load_trace(tmp_path / 'trace.json') == []
@@ -0,0 +1,120 @@
+import os
+
+import pytest
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.testclient import TestClient
+
+from rest_rce.src.uploads import MultipartUpload, sanitize_relative_path
+
+INPUT_DATATYPES = {'mesh': 'FileReference', 'case': 'DirectoryReference', 'x': 'Float'}
+
+
+@pytest.fixture
+def upload_client(tmp_path):
+	app = FastAPI()
+
+	@app.post('/upload')
+	async def upload(request: Request):
+		inputs, uploaded_inputs = await MultipartUpload(tmp_path, INPUT_DATATYPES).parse(request)
+		return {'inputs': inputs, 'uploaded_inputs': sorted(uploaded_inputs)}
+
+	return TestClient(app)
+
+
+# Tests for 'sanitize_relative_path'
+
+
+@pytest.mark.parametrize(
+	'filename, expected',
+	[
+		('mesh.dat', 'mesh.dat'),
+		('../../etc/passwd', os.path.join('etc', 'passwd')),
+		('sub\\dir/file name.txt', os.path.join('sub', 'dir', 'file_name.txt')),
+	],
+	ids=['plain', 'parent_references', 'separators_and_spaces'],
+)
+def test_sanitize_relative_path(filename, expected):
+	assert sanitize_relative_path(filename) == expected
+
+
+def test_sanitize_relative_path_empty():
+	"""Test if a file name without any valid path component is rejected."""
+	with pytest.raises(HTTPException):
+		sanitize_relative_path('../..')
+
+
+# Tests for 'MultipartUpload'
+
+# The following cases are tested:
+# - File and directory uploads are written to disk and bound to the inputs
+# - Plain fields and the JSON 'inputs' field are parsed
+# - Files for inputs that are no file or directory inputs are rejected
+# - Requests that are no multipart requests are rejected
+# - Malformed multipart bodies are rejected
+# - Fields setting an uploaded input are rejected, also if they follow the file part
+
+
+def test_upload_files_and_directory(upload_client, tmp_path):
+	"""Test if uploaded files are written to disk and their paths bound to the inputs."""
+	files = [
+		('mesh', ('mesh.dat', b'0' * 200000)),
+		('case', ('case/a.txt', b'a')),
+		('case', ('case/sub/b.txt', b'b')),
+	]
+	response = upload_client.post('/upload', files=files, data={'inputs': '{"x": 2.5}'})
+	assert response.status_code == 200
+	inputs = response.json()['inputs']
+	assert inputs['x'] == 2.5
+	assert inputs['mesh'] == os.path.join(str(tmp_path), 'mesh', 'mesh.dat')
+	assert inputs['case'] == os.path.join(str(tmp_path), 'case')
+	assert response.json()['uploaded_inputs'] == ['case', 'mesh']
+	assert (tmp_path / 'mesh' / 'mesh.dat').read_bytes() == b'0' * 200000
+	assert (tmp_path / 'case' / 'case' / 'sub' / 'b.txt').read_bytes() == b'b'
+
+
+def test_upload_plain_field(upload_client):
+	"""Test if plain form fields are parsed as JSON values."""
+	response = upload_client.post('/upload', files=[('mesh', ('m.dat', b'1'))], data={'x': '3'})
+	assert response.json()['inputs']['x'] == 3
+
+
+def test_upload_for_non_file_input(upload_client):
+	"""Test if a file upload for an input that is no file or directory input is rejected."""
+	response = upload_client.post('/upload', files=[('x', ('x.txt', b'1'))])
+	assert response.status_code == 422
+
+
+def test_upload_no_multipart(upload_client):
+	"""Test if a request that is no multipart request is rejected."""
+	response = upload_client.post('/upload', json={'inputs': {}})
+	assert response.status_code == 415
+
+
+def test_upload_malformed_body(upload_client):
+	"""Test if a malformed multipart body is rejected as bad request."""
+	response = upload_client.post(
+		'/upload',
+		content=b'garbage without boundary',
+		headers={'Content-Type': 'multipart/form-data; boundary=abc'},
+	)
+	assert response.status_code == 400
+	assert 'Malformed multipart body' in response.json()['detail']
+
+
+@pytest.mark.parametrize('field', ['inputs', 'mesh'])
+def test_upload_field_overrides_file(upload_client, field):
+	"""Test if a field after the file part cannot replace the path of the uploaded input."""
+	value = '{"mesh": "/etc/shadow; id"}' if field == 'inputs' else '/etc/shadow; id'
+	body = (
+		'--abc\r\n'
+		'Content-Disposition: form-data; name="mesh"; filename="mesh.dat"\r\n\r\n0\r\n'
+		f'--abc\r\nContent-Disposition: form-data; name="{field}"\r\n\r\n{value}\r\n'
+		'--abc--\r\n'
+	)
+	response = upload_client.post(
+		'/upload',
+		content=body.encode(),
+		headers={'Content-Type': 'multipart/form-data; boundary=abc'},
+	)
+	assert response.status_code == 422
+	assert 'mesh' in response.json()['detail']
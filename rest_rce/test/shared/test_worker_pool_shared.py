@@ -0,0 +1,123 @@
+import subprocess
+import sys
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from rest_rce.src.tool_executor import ExecutionCancelledError, ToolExecutor
+from rest_rce.src.worker_pool import WorkerError, WorkerPool
+
+POLY_DIR = 'rest_rce/test/tools/poly'
+
+
+@pytest.fixture
+def worker_pool():
+	pool = WorkerPool(
+		[sys.executable, 'poly_worker.py'], POLY_DIR, size=1, logger=MagicMock(), max_requests=2
+	)
+	pool.start()
+	yield pool
+	pool.close()
+
+
+def idle_worker(pool):
+	"""Return the idle worker of a pool with a single worker, waiting for a replacement."""
+	worker = pool._idle.get(timeout=10)
+	pool._idle.put(worker)
+	return worker
+
+
+# Tests for 'WorkerPool'
+
+# The following cases are tested:
+# - Requests are answered by the same warm worker
+# - Workers are recycled after the maximum number of requests
+# - Workers are recycled after a failure
+# - A worker not answering within the timeout raises a TimeoutExpired exception
+# - Cancelling an execution kills and replaces its busy worker
+
+
+def test_worker_pool_reuses_worker(worker_pool):
+	"""Test if consecutive requests are handled by the same worker process."""
+	worker = idle_worker(worker_pool)
+	return_code, stdout, stderr = worker_pool.run({'x': 2, 'n': 3})
+	assert return_code == 0
+	assert 'Result: 8' in stdout
+	assert idle_worker(worker_pool) is worker
+
+
+def test_worker_pool_recycles_after_max_requests(worker_pool):
+	"""Test if a worker is replaced after it handled the maximum number of requests."""
+	worker = idle_worker(worker_pool)
+	worker_pool.run({'x': 2})
+	worker_pool.run({'x': 3})
+	assert idle_worker(worker_pool) is not worker
+	worker.process.wait(timeout=5)
+
+
+def test_worker_pool_recycles_after_failure(worker_pool):
+	"""Test if a crashed worker is replaced and the error is raised."""
+	with pytest.raises(WorkerError):
+		worker_pool.run({'crash': True})
+	return_code, stdout, stderr = worker_pool.run({'x': 2, 'n': 2})
+	assert 'Result: 4' in stdout
+
+
+def test_worker_pool_timeout(worker_pool):
+	"""Test if a worker that does not answer in time raises a TimeoutExpired exception."""
+	worker = idle_worker(worker_pool)
+	worker.process.stdin.write = MagicMock()
+	with pytest.raises(subprocess.TimeoutExpired):
+		worker_pool.run({'x': 2}, timeout=0.2)
+	assert idle_worker(worker_pool) is not worker
+
+
+def test_execute_tool_with_worker_pool(worker_pool):
+	"""Test if the tool executor hands the inputs to the worker pool."""
+	tool_config = {
+		'launchSettings': [{'toolDirectory': POLY_DIR}],
+		'setToolDirAsWorkingDir': True,
+		'outputs': [],
+	}
+	executor = ToolExecutor(tool_config, {'x': 2, 'n': 4}, MagicMock(), worker_pool=worker_pool)
+	return_code, stdout, stderr, tool_directory, command_script, output_vars = (
+		executor.execute_tool()
+	)
+	assert return_code == 0
+	assert stdout.endswith('Result: 16\n')
+	assert 'wall_seconds' in executor.resource_usage
+
+
+def test_execute_tool_with_worker_pool_cancelled(worker_pool):
+	"""Test if cancelling an execution kills its busy worker and replaces it."""
+	tool_config = {
+		'launchSettings': [{'toolDirectory': POLY_DIR}],
+		'setToolDirAsWorkingDir': True,
+		'outputs': [],
+	}
+	worker = idle_worker(worker_pool)
+	executor = ToolExecutor(
+		tool_config, {'x': 2, 'sleep': 30}, MagicMock(), worker_pool=worker_pool
+	)
+	errors = []
+
+	def run():
+		try:
+			executor.execute_tool()
+		except ExecutionCancelledError as e:
+			errors.append(e)
+
+	thread = threading.Thread(target=run)
+	thread.start()
+	while executor.cancel_worker_request is None:
+		time.sleep(0.01)
+	executor.cancel()
+	thread.join(timeout=10)
+	assert not thread.is_alive()
+	assert len(errors) == 1
+	assert worker.process.wait(timeout=5) != 0
+	assert idle_worker(worker_pool) is not worker
+	return_code, stdout, stderr = worker_pool.run({'x': 2, 'n': 2})
+	assert 'Result: 4' in stdout
@@ -0,0 +1,130 @@
+import os
+from unittest.mock import MagicMock
+
+import pytest
+
+from rest_rce.src.working_directories import (
+	DELETE,
+	KEEP,
+	NEVER_DELETE,
+	WorkingDirectoryManager,
+	directory_size,
+)
+
+# Directories named like execution IDs
+A, B, C = 'a' * 32, 'b' * 32, 'c' * 32
+
+
+class FakeClock:
+	def __init__(self):
+		self.now = 1000.0
+
+	def __call__(self):
+		return self.now
+
+
+def make_directory(root, name, size):
+	path = root / name
+	path.mkdir()
+	(path / 'stdout.log').write_bytes(b'x' * size)
+	return path
+
+
+@pytest.fixture
+def clock():
+	return FakeClock()
+
+
+# Tests for 'WorkingDirectoryManager'
+
+# The following cases are tested:
+# - Directories of tools configured to delete them are deleted after the retention period
+# - Directories are archived before they are deleted if an archive directory is set
+# - The least recently used directories of finished executions are evicted to meet the quota
+# - Directories in use, never to be deleted or not belonging to executions are not evicted
+# - Only executions in progress or waiting for the deletion of their directory are kept in memory
+# - The policy of a directory is respected after a restart
+
+
+def test_delete_after_retention(tmp_path, clock):
+	manager = WorkingDirectoryManager(str(tmp_path), MagicMock(), retention=60, clock=clock)
+	for name, policy in ((A, DELETE), (B, KEEP), (C, NEVER_DELETE)):
+		make_directory(tmp_path, name, 10)
+		manager.started(name)
+		manager.finished(name, policy)
+
+	assert manager.cleanup() == []
+	clock.now += 60
+	assert manager.cleanup() == [A]
+	assert sorted(os.listdir(tmp_path)) == [B, C]
+
+
+def test_archive(tmp_path, clock):
+	root, archive_dir = tmp_path / 'executions', tmp_path / 'archive'
+	root.mkdir()
+	make_directory(root, A, 10)
+	manager = WorkingDirectoryManager(
+		str(root), MagicMock(), archive_dir=str(archive_dir), retention=0, clock=clock
+	)
+	manager.finished(A, DELETE)
+	assert manager.cleanup() == [A]
+	assert os.listdir(archive_dir) == [f'{A}.tar.gz']
+	assert os.listdir(root) == []
+
+
+def test_quota_lru(tmp_path, clock):
+	manager = WorkingDirectoryManager(str(tmp_path), MagicMock(), quota=250, clock=clock)
+	for name in (A, B, C):
+		make_directory(tmp_path, name, 100)
+		manager.started(name)
+		manager.finished(name)
+		clock.now += 1
+	manager.touch(A)
+
+	assert manager.cleanup() == [B]
+	assert directory_size(str(tmp_path)) == 200
+
+
+def test_quota_protected(tmp_path, clock):
+	manager = WorkingDirectoryManager(str(tmp_path), MagicMock(), quota=0, clock=clock)
+	make_directory(tmp_path, A, 100)
+	make_directory(tmp_path, B, 100)
+	make_directory(tmp_path, C, 100)
+	make_directory(tmp_path, 'inputs', 100)
+	manager.started(A)
+	manager.finished(B, NEVER_DELETE)
+
+	# Directories of earlier server runs are evicted as well
+	assert manager.cleanup() == [C]
+	assert sorted(os.listdir(tmp_path)) == [A, B, 'inputs']
+
+
+def test_finished_not_kept_in_memory(tmp_path, clock):
+	manager = WorkingDirectoryManager(str(tmp_path), MagicMock(), clock=clock)
+	for name, policy in ((A, DELETE), (B, KEEP), (C, NEVER_DELETE)):
+		make_directory(tmp_path, name, 10)
+		manager.started(name)
+		manager.finished(name, policy)
+	assert list(manager._finished) == [A]
+	assert list(manager._last_used) == [A]
+
+	# The last use of other directories is their modification time
+	manager.touch(B)
+	assert os.stat(tmp_path / B).st_mtime == clock.now
+
+
+def test_policy_after_restart(tmp_path, clock):
+	manager = WorkingDirectoryManager(str(tmp_path), MagicMock(), retention=60, clock=clock)
+	for name, policy in ((A, DELETE), (B, KEEP), (C, NEVER_DELETE)):
+		make_directory(tmp_path, name, 100)
+		manager.started(name)
+		manager.finished(name, policy)
+		clock.now += 1
+
+	restarted = WorkingDirectoryManager(str(tmp_path), MagicMock(), retention=60, clock=clock)
+	assert restarted.cleanup() == []
+	clock.now += 60
+	assert restarted.cleanup() == [A]
+	restarted.quota = 0
+	assert restarted.cleanup() == [B]
+	assert os.listdir(tmp_path) == [C]
@@ -0,0 +1,17 @@
+"""Persistent worker variant of poly.sh answering requests as JSON lines over stdin/stdout."""
+
+import json
+import sys
+import time
+
+for line in sys.stdin:
+	inputs = json.loads(line)['inputs']
+	if inputs.get('crash'):
+		sys.exit(3)
+	time.sleep(inputs.get('sleep', 0))
+	x, n = inputs['x'], inputs.get('n', 2)
+	result = x**n
+	stdout = (
+		f'Calculating exp\nReceived parameter x={x}\nReceived parameter n={n}\nResult: {result}\n'
+	)
+	print(json.dumps({'return_code': 0, 'stdout': stdout, 'stderr': ''}), flush=True)
@@ -4,20 +4,15 @@ from unittest.mock import patch
 
 import pytest
 import requests
-from fastapi.testclient import TestClient
 from httpx import ASGITransport, AsyncClient
 
-from rest_rce.src.main import app, tool_config
+from rest_rce.src.main import activate_configuration, status_counts, tool_config
 from rest_rce.src.utils import assert_output_values
-from rest_rce.test.shared.test_main_shared import mock_get_running_processes  # noqa
-
-client = TestClient(app)
-request_limit = 10
 
 
 @pytest.fixture
 def mock_tool_config():
-	tool_config.update(
+	activate_configuration(
 		{
 			'enableCommandScriptWindows': True,
 			'commandScriptWindows': 'root.exe ${in:x}',
@@ -37,7 +32,7 @@ def mock_tool_config():
 	return tool_config
 
 
-def test_execute_tool_windows(mock_tool_config):
+def test_execute_tool_windows(mock_tool_config, client):
 	"""Test execution of the tool in Windows with a single input."""
 	test_input = {'inputs': {'x': 4}}
 	expected_output = {
@@ -53,7 +48,7 @@ def test_execute_tool_windows(mock_tool_config):
 	assert_output_values(response, expected_output)
 
 
-def test_execute_tool_windows_connection_error_unresolved(mock_tool_config):
+def test_execute_tool_windows_connection_error_unresolved(mock_tool_config, client):
 	"""Test execution of the tool in Windows, if a connection error cannot be resolved."""
 	test_input = {'inputs': {'x': 36}}
 
@@ -68,7 +63,7 @@ def test_execute_tool_windows_connection_error_unresolved(mock_tool_config):
 	assert response.status_code == 500
 
 
-def test_execute_tool_windows_connection_error_resolved(mock_tool_config):
+def test_execute_tool_windows_connection_error_resolved(mock_tool_config, client):
 	"""Test execution of the tool in Windows, if a connection error can be resolved."""
 	test_input = {'inputs': {'x': 36}}
 	expected_output = {
@@ -96,7 +91,7 @@ def test_execute_tool_windows_connection_error_resolved(mock_tool_config):
 
 
 @pytest.mark.asyncio
-async def test_parallel_tool_execution_windows(mock_tool_config):
+async def test_parallel_tool_execution_windows(mock_tool_config, app):
 	"""Test parallel execution of the tool with different inputs."""
 
 	# Define test inputs and expected outputs
@@ -131,17 +126,18 @@ async def test_parallel_tool_execution_windows(mock_tool_config):
 		assert_output_values(response, expected_output)
 
 
-def test_execute_tool_under_limit_windows(mock_get_running_processes, mock_tool_config):  # noqa: F811
+def test_execute_tool_under_limit_windows(mock_tool_config, client):
 	"""Test if execute_tool executes requests when request limit is not reached."""
-	mock_get_running_processes.return_value = ['task1', 'task2']
 	stdout_success_msg = 'Calculating square root...\nGot input x = 4\nWrote result 2 to file.\n'
 	expected_output = {
 		'command': 'root.exe 4',
 		'output_variables': {'root': 2},
 		'stdout': stdout_success_msg,
 	}
-	global request_limit
-	request_limit = 3
-	response = client.post('/execute-tool/', json={'inputs': {'x': 4}})
+	with (
+		patch('rest_rce.src.main.request_limit', 3),
+		patch.dict(status_counts, {'running': 2}),
+	):
+		response = client.post('/execute-tool/', json={'inputs': {'x': 4}})
 	assert response.status_code == 200
 	assert_output_values(response, expected_output)